@@ -4,15 +4,24 @@ AI Service - 统一的AI接口服务
 支持 DeepSeek 和 OpenAI API，提供统一的调用接口
 """
 
+import atexit
+import functools
+import importlib.util
 import os
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional
 from dataclasses import dataclass
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import DefaultHttpxClient, OpenAI
 
 # 加载环境变量
 load_dotenv()
 
+# 所有提供商共用的HTTP连接池：连续调用复用已建立的 TCP/TLS 连接，省去每次握手。
+# DefaultHttpxClient 沿用 SDK 默认的连接数与 keep-alive 设置；
+# 安装了 h2 时启用 HTTP/2（uv pip install 'httpx[http2]'），否则使用 HTTP/1.1 keep-alive
+_HTTP_CLIENT = DefaultHttpxClient(http2=importlib.util.find_spec("h2") is not None)
+atexit.register(_HTTP_CLIENT.close)
+
 
 @dataclass
 class AIConfig:
@@ -58,7 +67,8 @@ class AIService:
         return OpenAI(
             api_key=self.config.api_key,
             base_url=self.config.base_url,
-            timeout=self.config.timeout
+            timeout=self.config.timeout,
+            http_client=_HTTP_CLIENT
         )
 
     def chat_completion(self, messages: List[Dict[str, str]], **kwargs) -> Dict[str, Any]:
@@ -92,6 +102,61 @@ class AIService:
                 "provider": self.provider
             }
 
+    def chat_completion_stream(self, messages: List[Dict[str, str]],
+                               on_delta: Optional[Callable[[str], None]] = None,
+                               **kwargs) -> Dict[str, Any]:
+        """
+        流式聊天完成接口
+
+        每收到一段增量文本就调用 on_delta，调用方可以在生成结束前开始处理输出。
+        返回值格式与 chat_completion 一致。
+        """
+        try:
+            stream = self.client.chat.completions.create(
+                model=kwargs.get("model", self.config.model),
+                messages=messages,
+                max_tokens=kwargs.get("max_tokens", self.config.max_tokens),
+                temperature=kwargs.get("temperature", self.config.temperature),
+                stream=True,
+                stream_options={"include_usage": True},
+                **{k: v for k, v in kwargs.items()
+                   if k not in ["model", "max_tokens", "temperature", "stream", "stream_options"]}
+            )
+
+            content_parts = []
+            usage = None
+            model = self.config.model
+            for chunk in stream:
+                model = chunk.model or model
+                if chunk.usage:
+                    usage = {
+                        "prompt_tokens": chunk.usage.prompt_tokens,
+                        "completion_tokens": chunk.usage.completion_tokens,
+                        "total_tokens": chunk.usage.total_tokens
+                    }
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    content_parts.append(delta)
+                    if on_delta:
+                        on_delta(delta)
+
+            return {
+                "success": True,
+                "content": "".join(content_parts),
+                "usage": usage,
+                "model": model,
+                "provider": self.provider
+            }
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "provider": self.provider
+            }
+
     def analyze_document(self, content: str, analysis_type: str = "general") -> Dict[str, Any]:
         """文档分析接口"""
         prompts = {
@@ -262,15 +327,18 @@ class AIService:
         }
 
 
-# 全局AI服务实例
-_ai_service = None
+# 按提供商缓存的AI服务实例：交替使用不同提供商时不会反复重建客户端。
+# 客户端共用 _HTTP_CLIENT 连接池，可以在线程间共享；
+# 创建失败（如未设置 API Key）时抛出异常，不会被缓存
+@functools.lru_cache(maxsize=8)
+def _cached_ai_service(provider: str) -> AIService:
+    return AIService(provider)
+
 
 def get_ai_service(provider: str = "deepseek") -> AIService:
-    """获取AI服务实例（单例模式）"""
-    global _ai_service
-    if _ai_service is None or _ai_service.provider != provider:
-        _ai_service = AIService(provider)
-    return _ai_service
+    """获取AI服务实例（每个提供商一个实例）"""
+    # 统一按位置参数调用，get_ai_service() 与 get_ai_service("deepseek") 命中同一缓存项
+    return _cached_ai_service(provider)
 
 
 # 便捷函数
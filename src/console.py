@@ -0,0 +1,10 @@
+"""
+共享的 Rich Console
+
+各模块共用同一个 Console 实例：终端检测只做一次，
+不同模块的输出在 status / Live 等实时显示下也能按顺序正确渲染。
+"""
+
+from rich.console import Console
+
+console = Console()
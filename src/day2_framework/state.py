@@ -13,12 +13,13 @@ Agent 本质上是一个状态机，在"思考"、"执行工具"、"等待结果
 6. 默认值和字段验证逻辑
 """
 
-import json
+import functools
 import time
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 from enum import Enum
 from pydantic import BaseModel, Field
+from pydantic_core import from_json
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
@@ -536,7 +537,7 @@ class Agent:
             debug_mode=debug_mode
         )
         self.debugger = StateDebugger()
-        self.ai_service = get_ai_service(ai_provider)
+        self.ai_provider = ai_provider
 
         self.state.log(LogLevel.INFO, f"Agent 初始化完成", {
             "agent_id": self.state.agent_id,
@@ -544,6 +545,11 @@ class Agent:
             "debug_mode": debug_mode
         })
 
+    @functools.cached_property
+    def ai_service(self):
+        """AI 服务（懒加载，首次使用时创建）"""
+        return get_ai_service(self.ai_provider)
+
     def process_user_message(self, message: str) -> str:
         """处理用户消息的主要流程"""
         # 开始任务
@@ -802,9 +808,9 @@ class Agent:
     def save_state(self, filepath: str):
         """保存状态到文件"""
         try:
-            state_data = self.state.export_state()
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(state_data, f, ensure_ascii=False, indent=2, default=str)
+            # 直接用 Pydantic 的 Rust 序列化器输出 JSON 字节，跳过 model_dump + json.dump 的两次遍历
+            with open(filepath, 'wb') as f:
+                f.write(self.state.model_dump_json(indent=2, fallback=str).encode('utf-8'))
 
             self.state.log(LogLevel.INFO, f"状态已保存到: {filepath}")
 
@@ -815,8 +821,8 @@ class Agent:
     def load_state(self, filepath: str):
         """从文件加载状态"""
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                state_data = json.load(f)
+            with open(filepath, 'rb') as f:
+                state_data = from_json(f.read())
 
             self.state.import_state(state_data)
             self.state.log(LogLevel.INFO, f"状态已从文件加载: {filepath}")
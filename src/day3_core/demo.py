@@ -18,8 +18,10 @@ from rich.table import Table
 from rich.panel import Panel
 from rich.layout import Layout
 
-# 添加项目根目录到 Python 路径
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+# 添加项目根目录到 Python 路径（仅在直接运行脚本且尚未在路径中时）
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
 
 # 尝试导入，如果失败则显示错误
 try:
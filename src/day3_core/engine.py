@@ -13,22 +13,36 @@ ReAct 循环步骤：
 本质上就是：LLM 输出文本 → Python 解析文本 → Python 执行函数 → 把结果拼回 Prompt → 再发给 LLM
 """
 
+import functools
 import json
+import logging
 import re
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Dict, Any, List, Optional, Tuple
-from dataclasses import dataclass
-from rich.console import Console
+from dataclasses import dataclass, field
 from rich.table import Table
 from rich.panel import Panel
 
 # 导入工具和状态管理
-from .tools import ToolExecutor, get_tools_description, ToolResult
+from .tools import SIDE_EFFECT_FREE_TOOLS, ToolExecutor, get_tools_description, ToolResult
 try:
-    from ..day2_framework.state import Agent, AgentState, MessageRole
+    from ..day2_framework.state import Agent, AgentState, AgentStatus, MessageRole, ToolType
     from ..ai_service import get_ai_service
+    from ..console import console
 except ImportError:
+    from rich.console import Console
+    console = Console()
+
     # 如果导入失败，创建占位符
+    class ToolType:
+        CUSTOM = "custom"
+
+    class AgentStatus:
+        THINKING = "thinking"
+        TOOL_EXECUTION = "tool_execution"
+        PROCESSING_RESULT = "processing_result"
+
     def get_ai_service(provider="deepseek"):
         class MockAIService:
             def chat_completion(self, messages, **kwargs):
@@ -39,24 +53,296 @@ except ImportError:
                 }
         return MockAIService()
 
-console = Console()
+# JSON 编解码：优先使用 orjson（C 实现，快 3-10 倍），未安装时回退到标准库
+# 两种实现都输出紧凑格式，保证提示词文本与所用的后端无关
+try:
+    import orjson
+
+    def json_loads(text: str) -> Any:
+        return orjson.loads(text)
+
+    def json_dumps(obj: Any, indent: bool = False) -> str:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, option=option).decode("utf-8")
+except ImportError:
+    def json_loads(text: str) -> Any:
+        return json.loads(text)
+
+    def json_dumps(obj: Any, indent: bool = False) -> str:
+        if indent:
+            return json.dumps(obj, ensure_ascii=False, indent=2)
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+logger = logging.getLogger(__name__)
+
+
+def _noop(*args, **kwargs):
+    """debug_mode 关闭时替代 console.print"""
+
+
+# 单条观察结果的最大字符数，防止大块 JSON 撑爆上下文
+MAX_OBS_CHARS = 4000
+
+ACTION_INPUT_MARKER = "**Action Input**:"
+
+# ReAct 响应解析正则，模块导入时编译一次
+_THOUGHT_RE = re.compile(r'\*\*Thought\*\*:\s*(.+?)(?=\*\*(?:Action|Final Answer)\*\*)', re.DOTALL)
+_FINAL_ANSWER_RE = re.compile(r'\*\*Final Answer\*\*:\s*(.+)', re.DOTALL)
+_ACTION_RE = re.compile(r'\*\*Action\*\*:\s*(.+?)(?=\*\*Action Input\*\*)', re.DOTALL)
+_ACTION_INPUT_RE = re.compile(r'\*\*Action Input\*\*:\s*(.+)', re.DOTALL)
+
+# Action Input 的最大解析长度，超出后直接作为原始文本返回
+MAX_ACTION_INPUT_CHARS = 16384
+_QUOTE_TABLE = str.maketrans({"'": '"'})
+
+
+def _truncate(text: Optional[str], limit: int) -> Optional[str]:
+    """截断长文本用于展示，未超长时原样返回，不产生新的字符串"""
+    if text is None or len(text) <= limit:
+        return text
+    return text[:limit] + "…"
+
+
+class _JsonObjectScanner:
+    """
+    增量扫描 JSON 对象的闭合位置
+
+    流式输出逐段追加文本，扫描器保留上次停下的位置和括号/字符串状态，
+    每次只扫描新增的字符。
+    """
+
+    __slots__ = ("pos", "begin", "depth", "in_string", "escaped")
+
+    def __init__(self, start: int = 0):
+        self.pos = start
+        self.begin: Optional[int] = None
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, text: str) -> Optional[int]:
+        """继续扫描 text，返回对象闭合括号之后的位置；尚未闭合时返回 None"""
+        if self.begin is None:
+            begin = text.find("{", self.pos)
+            if begin == -1:
+                self.pos = len(text)
+                return None
+            self.begin = self.pos = begin
+
+        depth = self.depth
+        in_string = self.in_string
+        escaped = self.escaped
+        end = None
+        for i in range(self.pos, len(text)):
+            char = text[i]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == "\\":
+                    escaped = True
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char == "{":
+                depth += 1
+            elif char == "}":
+                depth -= 1
+                if depth == 0:
+                    end = i + 1
+                    break
+
+        self.pos = end if end is not None else len(text)
+        self.depth, self.in_string, self.escaped = depth, in_string, escaped
+        return end
+
+
+def _find_json_object_end(text: str, start: int) -> Optional[int]:
+    """
+    从 start 开始扫描第一个 JSON 对象，返回其闭合括号之后的位置
+
+    对象尚未闭合（流式输出还没生成完）时返回 None。
+    """
+    return _JsonObjectScanner(start).feed(text)
+
+
+# batch 元工具：一次调用并发执行多个相互独立的工具，减少 ReAct 往返次数
+BATCH_TOOL_NAME = "batch"
+BATCH_MAX_WORKERS = 4
+BATCH_TOOL_SCHEMA = {
+    "name": BATCH_TOOL_NAME,
+    "description": "批量工具调用，一次并发执行多个相互独立的工具调用并汇总结果。当需要同时查询多项互不依赖的信息时使用，每个子调用的成功或失败互不影响。",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "invocations": {
+                "type": "array",
+                "description": "子调用列表，每项包含 tool_name（工具名称）和 arguments（工具参数）",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "tool_name": {"type": "string"},
+                        "arguments": {"type": "object"}
+                    },
+                    "required": ["tool_name", "arguments"]
+                }
+            }
+        },
+        "required": ["invocations"]
+    },
+    "examples": [
+        {"invocations": [
+            {"tool_name": "get_weather", "arguments": {"city": "北京"}},
+            {"tool_name": "get_weather", "arguments": {"city": "上海"}}
+        ]}
+    ]
+}
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_react_response(response: str) -> Tuple[Optional[str], Optional[str], Optional[Dict[str, Any]], bool]:
+    """
+    解析 LLM 响应（按响应文本缓存）
+
+    重试或回放时相同的 LLM 输出直接命中缓存，跳过正则匹配和 JSON 解析。
+    返回的 action_input 在多次调用间共享，对外请通过 ReActEngine._parse_response 取副本。
+    """
+    # 查找 Thought
+    thought_match = _THOUGHT_RE.search(response)
+    thought = thought_match.group(1).strip() if thought_match else None
+
+    # 查找 Final Answer
+    final_answer_match = _FINAL_ANSWER_RE.search(response)
+    if final_answer_match:
+        return thought, None, None, True
+
+    # 查找 Action
+    action_match = _ACTION_RE.search(response)
+    action = action_match.group(1).strip() if action_match else None
+
+    # 查找 Action Input
+    action_input_match = _ACTION_INPUT_RE.search(response)
+    action_input = None
+    if action_input_match:
+        action_input_str = action_input_match.group(1).strip()
+        if len(action_input_str) > MAX_ACTION_INPUT_CHARS:
+            # 超长输入不做解析和修复，限制异常输出的最坏解析开销
+            return thought, action, {"raw_input": action_input_str[:MAX_ACTION_INPUT_CHARS]}, False
+
+        try:
+            action_input = json_loads(action_input_str)
+        except json.JSONDecodeError:
+            # 尝试修复常见的 JSON 格式问题：替换单引号为双引号
+            json_str = action_input_str.translate(_QUOTE_TABLE)
+            try:
+                action_input = json_loads(json_str)
+            except json.JSONDecodeError:
+                action_input = {"raw_input": json_str}
+
+    return thought, action, action_input, False
+
+
+@functools.lru_cache(maxsize=8)
+def _cached_system_prompt(tools_sig: Tuple[str, ...]) -> str:
+    """
+    按工具集签名缓存系统提示词
+
+    OpenAI 等服务的提示词缓存基于前缀匹配，
+    保证相同工具集得到字节完全一致的系统提示词才能命中缓存。
+    """
+    tools_desc = get_tools_description()
+    if BATCH_TOOL_NAME in tools_sig:
+        tools_desc += (f"\n\n- **{BATCH_TOOL_NAME}**: {BATCH_TOOL_SCHEMA['description']}"
+                       f"\n  示例: {json_dumps(BATCH_TOOL_SCHEMA['examples'][0])}")
+
+    return f"""你是一个具有推理和行动能力的 AI 助手。请使用 ReAct (Reasoning + Acting) 方法来回答用户的问题。
+
+## 可用工具：
+{tools_desc}
+
+## ReAct 工作流程：
+1. **Thought (思考)**：分析当前情况，确定需要什么信息或采取什么行动
+2. **Action (行动)**：选择并调用合适的工具
+3. **Observation (观察)**：分析工具返回的结果
+4. **循环**：重复直到能够给出最终答案
+5. **Final Answer (最终答案)**：基于所有观察结果给出完整回答
 
+## 回答格式要求：
+每个步骤必须严格按照以下格式：
+
+**Thought**: [你的思考过程]
+**Action**: [工具名称]
+**Action Input**: {{参数1: "值1", 参数2: "值2"}}
+
+当你认为可以回答用户问题时，使用：
+**Final Answer**: [最终答案]
 
-@dataclass
+## 重要提醒：
+- 每个 "Thought" 后面必须跟着 "Action" 或 "Final Answer"
+- "Action Input" 必须是有效的 JSON 格式
+- 工具名称必须完全匹配可用工具列表
+- **不要在响应中包含 Observation，Observation 会由系统提供**
+- 当有足够信息时，给出 "Final Answer"
+
+现在请开始回答用户的问题。"""
+
+
+@dataclass(slots=True)
 class ReActStep:
-    """ReAct 步骤记录"""
+    """ReAct 步骤记录（slots 布局，长时间运行时大量步骤对象不再各带一个 __dict__）"""
     step_number: int
     thought: str
     action: Optional[str] = None
     action_input: Optional[Dict[str, Any]] = None
     observation: Optional[str] = None
     tool_result: Optional[ToolResult] = None
-    timestamp: float = None
+    timestamp: Optional[float] = None  # time.time()，随步骤一起序列化
+
+    # 单调时钟读数，只在进程内用于计算步骤耗时，不写入 to_dict
+    _monotonic_ns: int = field(default_factory=time.monotonic_ns, init=False, repr=False, compare=False)
+    # 渲染后的上下文文本缓存，步骤加入历史后内容不再变化，每个步骤只渲染一次
+    _rendered: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    _rendered_compact: Optional[str] = field(default=None, init=False, repr=False, compare=False)
 
     def __post_init__(self):
         if self.timestamp is None:
             self.timestamp = time.time()
 
+    def duration_ns(self, prev_step: "ReActStep") -> int:
+        """距上一步骤经过的纳秒数（单调时钟，不受系统时间调整影响）"""
+        return self._monotonic_ns - prev_step._monotonic_ns
+
+    def render(self, compact: bool = False) -> str:
+        """
+        渲染为上下文提示词中的步骤文本
+
+        Args:
+            compact (bool): 为 True 时省略观察结果，只保留其长度
+        """
+        cached = self._rendered_compact if compact else self._rendered
+        if cached is not None:
+            return cached
+
+        step_text = f"步骤 {self.step_number}:\n"
+        step_text += f"Thought: {self.thought}\n"
+
+        if self.action:
+            step_text += f"Action: {self.action}\n"
+            step_text += f"Action Input: {json_dumps(self.action_input)}\n"
+
+        if self.observation:
+            if compact:
+                step_text += f"Observation: [已省略, 观察长度={len(self.observation)}]\n"
+            else:
+                step_text += f"Observation: {self.observation}\n"
+
+        if compact:
+            self._rendered_compact = step_text
+        else:
+            self._rendered = step_text
+        return step_text
+
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典格式"""
         return {
@@ -73,13 +359,28 @@ class ReActStep:
 class ReActEngine:
     """ReAct 引擎 - Agent 的核心大脑"""
 
-    def __init__(self, agent_id: str = None, ai_provider: str = "deepseek", max_steps: int = 10):
+    def __init__(self, agent_id: str = None, ai_provider: str = "deepseek", max_steps: int = 10,
+                 observation_window: int = 3, stream: bool = True, debug_mode: bool = True):
+        # 调试输出：关闭 debug_mode 时跳过 Rich 渲染，错误改走 logging
+        self.debug_mode = debug_mode
+        self._log = console.print if debug_mode else _noop
+
         # 初始化组件
         self.agent_id = agent_id or f"react_agent_{int(time.time())}"
-        self.ai_service = get_ai_service(ai_provider)
+        self.ai_provider = ai_provider
         self.tool_executor = ToolExecutor()
         self.max_steps = max_steps
 
+        # 上下文中保留完整观察结果的最近步骤数，更早的步骤只保留思考和行动
+        self.observation_window = observation_window
+
+        # 上下文 token 预算（按 4 字符/token 估算），超出后把窗口外的旧步骤压缩为摘要
+        self.context_token_budget = 6000
+
+        # 流式调用 LLM，Action Input 闭合后立即在后台执行工具
+        self.stream = stream
+        self._executor: Optional[ThreadPoolExecutor] = None
+
         # 状态管理
         self.state = None  # 将在集成 day2 时设置
 
@@ -89,159 +390,206 @@ class ReActEngine:
         self.is_complete = False
         self.final_answer = None
 
-        # 可用工具
-        self.available_tools = self.tool_executor.get_available_tools()
+        # 上下文摘要检查点：steps[:_summarized_upto] 在提示词中由 _context_summary 代替
+        self._context_summary: Optional[str] = None
+        self._summarized_upto = 0
+
+        # 可用工具（包含 batch 元工具）
+        self.available_tools = self.tool_executor.get_available_tools() + [BATCH_TOOL_NAME]
+        self._tool_set = frozenset(self.available_tools)
+        self._tools_csv = ", ".join(self.available_tools)
 
         # 构建系统提示词
         self.system_prompt = self._build_system_prompt()
 
-        console.print(f"🤖 ReAct 引擎已初始化", style="green")
-        console.print(f"Agent ID: {self.agent_id}")
-        console.print(f"可用工具数: {len(self.available_tools)}")
-
-    def _build_system_prompt(self) -> str:
-        """构建系统提示词"""
-        tools_desc = get_tools_description()
-
-        prompt = f"""你是一个具有推理和行动能力的 AI 助手。请使用 ReAct (Reasoning + Acting) 方法来回答用户的问题。
-
-## 可用工具：
-{tools_desc}
-
-## ReAct 工作流程：
-1. **Thought (思考)**：分析当前情况，确定需要什么信息或采取什么行动
-2. **Action (行动)**：选择并调用合适的工具
-3. **Observation (观察)**：分析工具返回的结果
-4. **循环**：重复直到能够给出最终答案
-5. **Final Answer (最终答案)**：基于所有观察结果给出完整回答
-
-## 回答格式要求：
-每个步骤必须严格按照以下格式：
-
-**Thought**: [你的思考过程]
-**Action**: [工具名称]
-**Action Input**: {{参数1: "值1", 参数2: "值2"}}
+        self._log(f"🤖 ReAct 引擎已初始化", style="green")
+        self._log(f"Agent ID: {self.agent_id}")
+        self._log(f"可用工具数: {len(self.available_tools)}")
 
-当你认为可以回答用户问题时，使用：
-**Final Answer**: [最终答案]
-
-## 重要提醒：
-- 每个 "Thought" 后面必须跟着 "Action" 或 "Final Answer"
-- "Action Input" 必须是有效的 JSON 格式
-- 工具名称必须完全匹配可用工具列表
-- **不要在响应中包含 Observation，Observation 会由系统提供**
-- 当有足够信息时，给出 "Final Answer"
+    @functools.cached_property
+    def ai_service(self):
+        """AI 服务，首次调用 LLM 时才创建客户端，只用到工具注册表的场景不付出初始化开销"""
+        return get_ai_service(self.ai_provider)
 
-现在请开始回答用户的问题。"""
+    def _log_error(self, message: str):
+        """输出错误信息：调试模式下打印到终端，否则写入日志"""
+        if self.debug_mode:
+            console.print(f"❌ {message}", style="red")
+        else:
+            logger.warning("%s", message)
 
-        return prompt
+    def _build_system_prompt(self) -> str:
+        """构建系统提示词（按工具集签名缓存，保证多个引擎实例间字节一致）"""
+        tools_sig = tuple(sorted(self.available_tools))
+        return _cached_system_prompt(tools_sig)
 
     def _parse_response(self, response: str) -> Tuple[Optional[str], Optional[str], Optional[Dict[str, Any]], bool]:
         """
         解析 LLM 响应，提取 Thought, Action, Action Input
 
         Returns:
-            Tuple[thought, action, action_input, is_final_answer]
+            Tuple[thought, action, action_input, is_final_answer]，
+            action_input 是缓存结果的副本，调用方可以自由修改
         """
         try:
-            # 查找 Thought
-            thought_match = re.search(r'\*\*Thought\*\*:\s*(.+?)(?=\*\*(?:Action|Final Answer)\*\*)', response, re.DOTALL)
-            thought = thought_match.group(1).strip() if thought_match else None
-
-            # 查找 Final Answer
-            final_answer_match = re.search(r'\*\*Final Answer\*\*:\s*(.+)', response, re.DOTALL)
-            if final_answer_match:
-                return thought, None, None, True
-
-            # 查找 Action
-            action_match = re.search(r'\*\*Action\*\*:\s*(.+?)(?=\*\*Action Input\*\*)', response, re.DOTALL)
-            action = action_match.group(1).strip() if action_match else None
-
-            # 查找 Action Input
-            action_input_match = re.search(r'\*\*Action Input\*\*:\s*(.+)', response, re.DOTALL)
-            action_input = None
-            if action_input_match:
-                try:
-                    action_input = json.loads(action_input_match.group(1).strip())
-                except json.JSONDecodeError:
-                    # 尝试修复常见的 JSON 格式问题
-                    json_str = action_input_match.group(1).strip()
-                    # 替换单引号为双引号
-                    json_str = json_str.replace("'", '"')
-                    try:
-                        action_input = json.loads(json_str)
-                    except:
-                        action_input = {"raw_input": json_str}
-
-            return thought, action, action_input, False
-
+            thought, action, action_input, is_final_answer = _parse_react_response(response)
+            if action_input is not None:
+                action_input = dict(action_input)
+            return thought, action, action_input, is_final_answer
         except Exception as e:
-            console.print(f"❌ 解析响应时出错: {str(e)}", style="red")
+            self._log_error(f"解析响应时出错: {str(e)}")
             return None, None, None, False
 
     def _build_context_prompt(self, user_query: str) -> str:
         """构建包含历史步骤的上下文提示词"""
         context_parts = [f"用户问题: {user_query}"]
 
-        if self.steps:
+        recent_steps = self.steps[self._summarized_upto:]
+        if self._context_summary or recent_steps:
             context_parts.append("\n之前的对话步骤:")
-            for step in self.steps:
-                step_text = f"步骤 {step.step_number}:\n"
-                step_text += f"Thought: {step.thought}\n"
-
-                if step.action:
-                    step_text += f"Action: {step.action}\n"
-                    step_text += f"Action Input: {json.dumps(step.action_input, ensure_ascii=False)}\n"
-
-                if step.observation:
-                    step_text += f"Observation: {step.observation}\n"
+            if self._context_summary:
+                context_parts.append(f"步骤 1-{self._summarized_upto} 摘要:\n{self._context_summary}\n")
 
-                context_parts.append(step_text)
+            window_start = len(recent_steps) - self.observation_window
+            for index, step in enumerate(recent_steps):
+                # 超出观察窗口的旧步骤只保留摘要，避免上下文随步数平方增长
+                context_parts.append(step.render(compact=index < window_start))
 
         return "\n".join(context_parts)
 
-    def _execute_tool_action(self, action: str, action_input: Dict[str, Any]) -> ToolResult:
-        """执行工具动作"""
-        if action not in self.available_tools:
-            return ToolResult(False, error=f"工具 '{action}' 不存在。可用工具: {', '.join(self.available_tools)}")
+    def _checkpoint_context(self, user_query: str) -> str:
+        """
+        构建上下文提示词，超出 token 预算时先生成摘要检查点
 
-        try:
-            console.print(f"🔧 执行工具: {action}", style="blue")
-            console.print(f"📥 参数: {action_input}", style="dim")
+        观察窗口之外的旧步骤由 LLM 压缩成一段摘要，之后的每次调用都只携带摘要，
+        长时间运行时每轮输入 token 不再随步数增长。执行轨迹 self.steps 保持完整。
+        """
+        context_prompt = self._build_context_prompt(user_query)
+        if len(context_prompt) // 4 <= self.context_token_budget:
+            return context_prompt
+
+        cutoff = len(self.steps) - self.observation_window
+        if cutoff <= self._summarized_upto:
+            return context_prompt
+
+        old_steps_text = "\n".join(step.render() for step in self.steps[self._summarized_upto:cutoff])
+        if self._context_summary:
+            old_steps_text = f"已有摘要:\n{self._context_summary}\n\n{old_steps_text}"
+
+        self._log("🗜️ 上下文超出预算，正在生成摘要...", style="blue")
+        response = self.ai_service.chat_completion(
+            [{"role": "user", "content": f"请用 3 个要点总结以下 ReAct 步骤，保留关键的观察结果和数据：\n\n{old_steps_text}"}],
+            temperature=0.1,
+            max_tokens=300
+        )
+        if not response.get("success"):
+            self._log_error(f"生成上下文摘要失败: {response.get('error')}")
+            return context_prompt
+
+        self._context_summary = response["content"].strip()
+        self._summarized_upto = cutoff
+        return self._build_context_prompt(user_query)
+
+    def _run_tool(self, action: str, action_input: Dict[str, Any]) -> ToolResult:
+        """
+        只执行工具，不记录状态
 
-            # 记录工具调用（如果状态管理可用）
-            if self.state:
-                from ..day2_framework.state import ToolType
-                self.state.add_tool_call(
-                    ToolType.CUSTOM,  # 使用自定义类型
-                    action,
-                    action_input
-                )
-                self.state.current_tool_call.start_execution()
+        流式投机执行在工作线程中调用；结果可能被丢弃，因此不能在这里修改 Agent 状态。
+        """
+        try:
+            self._log(f"🔧 执行工具: {action}", style="blue")
+            self._log(f"📥 参数: {action_input}", style="dim")
 
-            # 执行工具
-            result = self.tool_executor.execute(action, action_input)
+            if action == BATCH_TOOL_NAME:
+                result = self._execute_batch(action_input)
+            else:
+                result = self.tool_executor.execute(action, action_input)
 
-            # 完成工具调用记录
-            if self.state and self.state.current_tool_call:
-                self.state.current_tool_call.finish_execution(
-                    result=result.to_dict() if result.success else None,
-                    error=result.error if not result.success else None
-                )
-
-            console.print(f"📤 结果: {result.success}", style="green" if result.success else "red")
+            self._log(f"📤 结果: {result.success}", style="green" if result.success else "red")
             if not result.success and result.error:
-                console.print(f"❌ 错误: {result.error}", style="red")
+                self._log_error(f"错误: {result.error}")
 
             return result
 
         except Exception as e:
             error_msg = f"工具执行异常: {str(e)}"
-            console.print(f"❌ {error_msg}", style="red")
+            self._log_error(error_msg)
             return ToolResult(False, error=error_msg)
 
+    def _execute_tool_action(self, action: str, action_input: Dict[str, Any],
+                             result: Optional[ToolResult] = None) -> ToolResult:
+        """
+        执行工具动作并记录到状态管理
+
+        result 为投机执行得到的结果时不再重复执行，只补记这次工具调用。
+        """
+        if action not in self._tool_set:
+            return ToolResult(False, error=f"工具 '{action}' 不存在。可用工具: {self._tools_csv}")
+
+        # 记录工具调用（如果状态管理可用）
+        tool_call = None
+        if self.state:
+            tool_call = self.state.add_tool_call(
+                ToolType.CUSTOM,  # 使用自定义类型
+                action,
+                action_input
+            )
+            tool_call.start_execution()
+
+        if result is None:
+            result = self._run_tool(action, action_input)
+
+        # 完成工具调用记录
+        if tool_call is not None:
+            tool_call.finish_execution(
+                result=result.to_dict() if result.success else None,
+                error=result.error if not result.success else None
+            )
+
+        return result
+
+    def _execute_batch(self, action_input: Dict[str, Any]) -> ToolResult:
+        """
+        并发执行 batch 元工具中的子调用
+
+        子调用之间故障隔离：单个子调用失败只记录在对应结果中，不影响其他子调用。
+        整个 batch 在状态管理中记录为一次工具调用。
+        """
+        invocations = action_input.get("invocations")
+        if not isinstance(invocations, list) or not invocations:
+            return ToolResult(False, error="batch 参数错误: invocations 必须是非空列表")
+
+        calls = [
+            (invocation.get("tool_name"), invocation.get("arguments") or {})
+            if isinstance(invocation, dict) else (None, {})
+            for invocation in invocations
+        ]
+        # batch 不在工具注册表中，嵌套调用会作为未知工具失败
+        tool_results = self.tool_executor.execute_batch(calls, max_workers=BATCH_MAX_WORKERS)
+
+        results = []
+        for (tool_name, _), result in zip(calls, tool_results):
+            if result.success:
+                results.append({"tool_name": tool_name, "success": True, "data": result.data})
+            else:
+                results.append({"tool_name": tool_name, "success": False, "error": result.error})
+        succeeded = sum(1 for item in results if item["success"])
+
+        return ToolResult(True, data={
+            "results": results,
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded
+        })
+
     def _format_observation(self, result: ToolResult) -> str:
-        """格式化工具执行结果为观察文本"""
+        """格式化工具执行结果为观察文本（超过 MAX_OBS_CHARS 时截断）"""
+        observation = self._render_observation(result)
+        if len(observation) > MAX_OBS_CHARS:
+            observation = observation[:MAX_OBS_CHARS] + "…[truncated]"
+        return observation
+
+    def _render_observation(self, result: ToolResult) -> str:
+        """将工具执行结果渲染为观察文本"""
         if not result.success:
             return f"工具执行失败: {result.error}"
 
@@ -250,12 +598,84 @@ class ReActEngine:
             formatted_data = []
             for key, value in result.data.items():
                 if isinstance(value, (list, dict)):
-                    value = json.dumps(value, ensure_ascii=False, indent=2)
+                    value = json_dumps(value, indent=True)
                 formatted_data.append(f"{key}: {value}")
             return "工具执行成功:\n" + "\n".join(formatted_data)
         else:
             return f"工具执行成功: {result.data}"
 
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """懒加载工具执行线程池"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="react-tool")
+        return self._executor
+
+    def close(self):
+        """关闭工具执行线程池（之后再次投机执行时会重新创建）"""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def _call_llm(self, messages: List[Dict[str, str]]) -> Tuple[Dict[str, Any], Optional[Tuple[str, Dict[str, Any], Future]]]:
+        """
+        调用 LLM
+
+        流式模式下，一旦 Action Input 的 JSON 对象闭合就立即提交工具执行，
+        工具耗时与 LLM 的尾部生成重叠。最终解析结果可能与投机解析不同（结果被丢弃），
+        因此只投机执行没有副作用的工具。
+
+        Returns:
+            Tuple[llm_response, speculative]，speculative 为 (action, action_input, future) 或 None
+        """
+        if not self.stream or not hasattr(self.ai_service, "chat_completion_stream"):
+            return self.ai_service.chat_completion(messages, temperature=0.1, max_tokens=1000), None
+
+        # searched: 标记查找已覆盖的位置；scanner: 找到标记后的增量 JSON 扫描器
+        buffer = {"text": "", "searched": 0, "scanner": None}
+        speculative = []
+
+        def on_delta(delta: str):
+            buffer["text"] += delta
+            if speculative:
+                return
+
+            text = buffer["text"]
+            scanner = buffer["scanner"]
+            if scanner is None:
+                marker_pos = text.find(ACTION_INPUT_MARKER, buffer["searched"])
+                if marker_pos == -1:
+                    # 标记可能跨越两段增量，保留末尾不足一个标记长度的部分下次再查
+                    buffer["searched"] = max(len(text) - len(ACTION_INPUT_MARKER) + 1, 0)
+                    return
+                scanner = buffer["scanner"] = _JsonObjectScanner(marker_pos + len(ACTION_INPUT_MARKER))
+            end = scanner.feed(text)
+            if end is None:
+                return
+
+            thought, action, action_input, is_final_answer = self._parse_response(text[:end])
+            if is_final_answer or not action or not action_input:
+                return
+            if action not in SIDE_EFFECT_FREE_TOOLS:
+                # 有副作用的工具等完整解析后再执行；记一个占位，后续增量不再检测
+                speculative.append(None)
+                return
+            future = self._get_executor().submit(self._run_tool, action, action_input)
+            speculative.append((action, action_input, future))
+
+        llm_response = self.ai_service.chat_completion_stream(
+            messages, on_delta=on_delta, temperature=0.1, max_tokens=1000
+        )
+        return llm_response, (speculative[0] if speculative else None)
+
+    def reset(self):
+        """重置 ReAct 循环状态，引擎配置和系统提示词保持不变"""
+        self.current_step = 0
+        self.steps = []
+        self.is_complete = False
+        self.final_answer = None
+        self._context_summary = None
+        self._summarized_upto = 0
+
     def process(self, user_query: str) -> str:
         """
         处理用户查询的主要 ReAct 循环
@@ -266,14 +686,11 @@ class ReActEngine:
         Returns:
             str: 最终答案
         """
-        console.print(f"\n🚀 开始 ReAct 处理: {user_query}", style="bold blue")
-        console.print("=" * 80, style="blue")
+        self._log(f"\n🚀 开始 ReAct 处理: {user_query}", style="bold blue")
+        self._log("=" * 80, style="blue")
 
         # 重置状态
-        self.current_step = 0
-        self.steps = []
-        self.is_complete = False
-        self.final_answer = None
+        self.reset()
 
         # 记录开始（如果状态管理可用）
         if self.state:
@@ -284,11 +701,11 @@ class ReActEngine:
             while not self.is_complete and self.current_step < self.max_steps:
                 self.current_step += 1
 
-                console.print(f"\n📍 步骤 {self.current_step}", style="bold yellow")
-                console.print("-" * 60, style="yellow")
+                self._log(f"\n📍 步骤 {self.current_step}", style="bold yellow")
+                self._log("-" * 60, style="yellow")
 
                 # 构建当前步骤的提示词
-                context_prompt = self._build_context_prompt(user_query)
+                context_prompt = self._checkpoint_context(user_query)
                 messages = [
                     {"role": "system", "content": self.system_prompt},
                     {"role": "user", "content": context_prompt}
@@ -296,24 +713,36 @@ class ReActEngine:
 
                 # 记录思考状态
                 if self.state:
-                    self.state.update_status(getattr(self.state.status.__class__, 'THINKING', 'thinking'))
+                    self.state.update_status(AgentStatus.THINKING)
                     self.state.next_step(f"ReAct步骤{self.current_step} - 思考")
 
                 # 调用 LLM
-                console.print("🧠 正在思考...", style="blue")
-                llm_response = self.ai_service.chat_completion(messages, temperature=0.1, max_tokens=1000)
+                self._log("🧠 正在思考...", style="blue")
+                llm_response, speculative = self._call_llm(messages)
 
                 if not llm_response.get("success"):
+                    if speculative:
+                        speculative[2].result()
                     error_msg = f"LLM 调用失败: {llm_response.get('error')}"
-                    console.print(f"❌ {error_msg}", style="red")
+                    self._log_error(error_msg)
                     return f"抱歉，处理过程中遇到了问题: {error_msg}"
 
                 response_content = llm_response["content"]
-                console.print(f"💭 LLM 回复:\n{response_content}", style="dim")
+                self._log(f"💭 LLM 回复:\n{response_content}", style="dim")
 
                 # 解析响应
                 thought, action, action_input, is_final_answer = self._parse_response(response_content)
 
+                speculative_result = None
+                if speculative:
+                    spec_action, spec_input, future = speculative
+                    # 等待投机执行完成，避免与后续工具调用并发执行
+                    spec_result = future.result()
+                    if not is_final_answer and action == spec_action:
+                        # 投机解析的 JSON 边界更准确，不受尾部多余文本影响
+                        action_input = spec_input
+                        speculative_result = spec_result
+
                 # 创建步骤记录
                 step = ReActStep(
                     step_number=self.current_step,
@@ -326,7 +755,7 @@ class ReActEngine:
                     self.is_complete = True
                     step.observation = self.final_answer
 
-                    console.print(f"✅ 最终答案: {self.final_answer}", style="bold green")
+                    self._log(f"✅ 最终答案: {self.final_answer}", style="bold green")
 
                     # 记录完成状态
                     if self.state:
@@ -340,31 +769,30 @@ class ReActEngine:
 
                     # 记录行动状态
                     if self.state:
-                        from ..day2_framework.state import AgentStatus
                         self.state.update_status(AgentStatus.TOOL_EXECUTION)
 
-                    # 执行工具
-                    tool_result = self._execute_tool_action(action, action_input)
+                    # 执行工具（流式模式下可能已投机执行完毕）
+                    tool_result = self._execute_tool_action(action, action_input, speculative_result)
                     step.tool_result = tool_result
                     step.observation = self._format_observation(tool_result)
 
-                    console.print(f"👀 观察结果: {step.observation[:200]}...", style="cyan")
+                    self._log(f"👀 观察结果: {_truncate(step.observation, 200)}", style="cyan")
 
                     # 记录观察状态
                     if self.state:
                         self.state.update_status(AgentStatus.PROCESSING_RESULT)
-                        self.state.add_thought(f"观察工具结果: {step.observation[:100]}...")
+                        self.state.add_thought(f"观察工具结果: {_truncate(step.observation, 100)}")
 
                 else:
                     # 解析失败，尝试继续
-                    console.print("⚠️ 无法解析 LLM 响应，尝试继续...", style="yellow")
+                    self._log("⚠️ 无法解析 LLM 响应，尝试继续...", style="yellow")
                     step.observation = "响应解析失败，请重新思考"
 
                 self.steps.append(step)
 
             if not self.is_complete:
                 # 达到最大步数限制
-                console.print(f"⚠️ 达到最大步数限制 ({self.max_steps} 步)", style="yellow")
+                self._log(f"⚠️ 达到最大步数限制 ({self.max_steps} 步)", style="yellow")
                 return f"抱歉，无法在 {self.max_steps} 步内完成您的请求。当前进展：\n" + \
                        "\n".join([f"步骤{i}: {step.thought}" for i, step in enumerate(self.steps, 1)])
 
@@ -372,7 +800,7 @@ class ReActEngine:
 
         except Exception as e:
             error_msg = f"ReAct 处理过程中发生错误: {str(e)}"
-            console.print(f"❌ {error_msg}", style="red")
+            self._log_error(error_msg)
 
             if self.state:
                 self.state.complete_task(success=False)
@@ -408,9 +836,9 @@ class ReActEngine:
 
         for step in self.steps:
             # 截断长文本
-            thought = step.thought[:100] + "..." if len(step.thought) > 100 else step.thought
+            thought = _truncate(step.thought, 100)
             action = step.action or "N/A"
-            observation = step.observation[:100] + "..." if step.observation and len(step.observation) > 100 else (step.observation or "N/A")
+            observation = _truncate(step.observation, 100) or "N/A"
 
             table.add_row(
                 str(step.step_number),
@@ -427,12 +855,15 @@ class ReActEngine:
     def set_state_manager(self, state: AgentState):
         """设置状态管理器（集成 day2）"""
         self.state = state
-        console.print("🔗 已集成 Day2 状态管理系统", style="green")
+        self._log("🔗 已集成 Day2 状态管理系统", style="green")
 
 
-def create_react_engine(agent_id: str = None, ai_provider: str = "deepseek", max_steps: int = 10) -> ReActEngine:
+def create_react_engine(agent_id: str = None, ai_provider: str = "deepseek", max_steps: int = 10,
+                        observation_window: int = 3, stream: bool = True,
+                        debug_mode: bool = True) -> ReActEngine:
     """创建 ReAct 引擎实例"""
-    return ReActEngine(agent_id=agent_id, ai_provider=ai_provider, max_steps=max_steps)
+    return ReActEngine(agent_id=agent_id, ai_provider=ai_provider, max_steps=max_steps,
+                       observation_window=observation_window, stream=stream, debug_mode=debug_mode)
 
 
 if __name__ == "__main__":
@@ -4,16 +4,93 @@ ReAct Agent - 完整的 ReAct 智能代理
 集成 Day2 状态管理系统的 ReAct Agent，提供完整的 Agent 能力。
 """
 
+import atexit
 import os
-import sys
+import queue
+import threading
+from dataclasses import dataclass
+from pathlib import Path
 from typing import Dict, Any, Optional
 
-# 添加项目根目录到 Python 路径
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from ..day2_framework.state import Agent
+from .engine import ReActEngine, create_react_engine, json_dumps, BATCH_TOOL_NAME, BATCH_TOOL_SCHEMA
+from ..console import console
 
-from src.day2_framework.state import Agent
-from .engine import ReActEngine, create_react_engine
-from rich.console import Console
+
+@dataclass(frozen=True, slots=True)
+class AgentSnapshot:
+    """Agent 当前状态的轻量快照，只含计数和标量，不复制消息、思考和步骤列表"""
+    agent_id: str
+    status: str
+    thoughts_count: int
+    tool_calls_count: int
+    execution_time: Optional[float]
+    total_steps: int
+    is_complete: bool
+
+
+class _TraceWriter:
+    """
+    后台轨迹写入线程
+
+    save_state 只负责入队，序列化和写盘在后台线程完成；
+    同一路径的连续写入会被合并，只写最新的一份。
+    写入先落到临时文件再用 os.replace 原子替换，中途失败不会损坏已有文件。
+    """
+
+    def __init__(self):
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="react-trace-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, filepath: str, payload: Dict[str, Any]):
+        """提交写入任务"""
+        self._queue.put((filepath, payload))
+
+    def flush(self):
+        """阻塞直到所有已提交的写入完成"""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            filepath, payload = self._queue.get()
+            pending = {filepath: payload}
+            count = 1
+
+            # 合并队列中已积压的写入
+            while True:
+                try:
+                    filepath, payload = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                pending[filepath] = payload
+                count += 1
+
+            for filepath, payload in pending.items():
+                try:
+                    tmp_path = filepath + ".tmp"
+                    with open(tmp_path, 'w', encoding='utf-8') as f:
+                        f.write(json_dumps(payload, indent=True))
+                    os.replace(tmp_path, filepath)
+                except Exception as e:
+                    console.print(f"❌ ReAct 轨迹保存失败: {filepath}: {str(e)}", style="red")
+
+            for _ in range(count):
+                self._queue.task_done()
+
+
+_trace_writer: Optional[_TraceWriter] = None
+_trace_writer_lock = threading.Lock()
+
+
+def _get_trace_writer() -> _TraceWriter:
+    """获取全局轨迹写入线程（懒加载，进程退出前自动刷盘）"""
+    global _trace_writer
+    with _trace_writer_lock:
+        if _trace_writer is None:
+            _trace_writer = _TraceWriter()
+            atexit.register(_trace_writer.flush)
+        return _trace_writer
 
 
 class ReActAgent:
@@ -33,13 +110,14 @@ class ReActAgent:
         self.react_engine = create_react_engine(
             agent_id=agent_id,
             ai_provider=ai_provider,
-            max_steps=max_steps
+            max_steps=max_steps,
+            debug_mode=debug_mode
         )
 
         # 集成状态管理
         self.react_engine.set_state_manager(self.agent.state)
 
-        self.console = Console()
+        self.console = console
 
         self.console.print("🤖 ReAct Agent 已初始化", style="bold green")
         self.console.print(f"🆔 Agent ID: {self.agent.state.agent_id}")
@@ -64,12 +142,13 @@ class ReActAgent:
             # 使用 ReAct 引擎处理查询
             result = self.react_engine.process(user_query)
 
-            # 显示执行轨迹
-            self.react_engine.display_execution_trace()
+            if self.react_engine.debug_mode:
+                # 显示执行轨迹
+                self.react_engine.display_execution_trace()
 
-            # 显示状态摘要
-            self.console.print(f"\n📊 状态摘要:")
-            self.agent.debugger.display_state_summary(self.agent.state)
+                # 显示状态摘要
+                self.console.print(f"\n📊 状态摘要:")
+                self.agent.debugger.display_state_summary(self.agent.state)
 
             return result
 
@@ -82,6 +161,20 @@ class ReActAgent:
         """获取 Agent 状态"""
         return self.agent.state
 
+    def snapshot(self) -> AgentSnapshot:
+        """一次读取生成状态快照，不构建完整的执行摘要"""
+        state = self.agent.state
+        status = state.status
+        return AgentSnapshot(
+            agent_id=state.agent_id,
+            status=status.value if hasattr(status, 'value') else str(status),
+            thoughts_count=len(state.thoughts),
+            tool_calls_count=len(state.tool_calls),
+            execution_time=state.total_execution_time,
+            total_steps=len(self.react_engine.steps),
+            is_complete=self.react_engine.is_complete
+        )
+
     def get_execution_summary(self) -> Dict[str, Any]:
         """获取执行摘要"""
         react_summary = self.react_engine.get_execution_summary()
@@ -106,10 +199,9 @@ class ReActAgent:
     def reset(self):
         """重置 Agent 状态"""
         self.agent.reset_state()
-        self.react_engine.current_step = 0
-        self.react_engine.steps = []
-        self.react_engine.is_complete = False
-        self.react_engine.final_answer = None
+        self.react_engine.reset()
+        # reset_state 会创建新的状态对象，引擎需要指向它
+        self.react_engine.state = self.agent.state
 
         self.console.print("🔄 Agent 已重置", style="green")
 
@@ -117,14 +209,22 @@ class ReActAgent:
         """保存 Agent 状态到文件"""
         self.agent.save_state(filepath)
 
-        # 同时保存 ReAct 执行轨迹
-        import json
-        react_filepath = filepath.replace('.json', '_react.json')
-        with open(react_filepath, 'w', encoding='utf-8') as f:
-            json.dump(self.react_engine.get_execution_summary(), f, ensure_ascii=False, indent=2)
+        # 同时保存 ReAct 执行轨迹（后台线程异步写入，调用 flush_saves 等待完成）
+        path = Path(filepath)
+        react_filepath = str(path.with_name(f"{path.stem}_react{path.suffix}"))
+        _get_trace_writer().submit(react_filepath, self.react_engine.get_execution_summary())
 
         self.console.print(f"💾 状态已保存到: {filepath}")
-        self.console.print(f"💾 ReAct 轨迹已保存到: {react_filepath}")
+        self.console.print(f"💾 ReAct 轨迹将保存到: {react_filepath}")
+
+    def flush_saves(self):
+        """等待所有异步轨迹写入完成"""
+        if _trace_writer is not None:
+            _trace_writer.flush()
+
+    def close(self):
+        """释放 ReAct 引擎持有的工具执行线程"""
+        self.react_engine.close()
 
     def get_available_tools(self) -> list:
         """获取可用工具列表"""
@@ -132,6 +232,8 @@ class ReActAgent:
 
     def get_tool_info(self, tool_name: str) -> Optional[Dict[str, Any]]:
         """获取工具信息"""
+        if tool_name == BATCH_TOOL_NAME:
+            return BATCH_TOOL_SCHEMA
         return self.react_engine.tool_executor.get_tool_schema(tool_name)
 
 
@@ -147,8 +249,6 @@ def create_react_agent(agent_id: str = None, debug_mode: bool = True, ai_provide
 
 if __name__ == "__main__":
     # 测试 ReAct Agent
-    console = Console()
-
     console.print("🧪 测试 ReAct Agent", style="bold blue")
     console.print("=" * 60, style="blue")
 
@@ -5,25 +5,47 @@ ReAct Agent 测试套件
 全面测试 ReAct 引擎和工具系统的功能
 """
 
+import io
 import os
 import sys
 import json
 import tempfile
+import threading
+import time
 import unittest
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from pathlib import Path
+from typing import List, Tuple
+from uuid import uuid4
+from unittest.mock import patch
 
-# 添加项目根目录到 Python 路径
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+# 添加项目根目录到 Python 路径（仅在直接运行脚本且尚未在路径中时）
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
 
 from src.day3_core.tools import (
     ToolResult, calculator, web_search, get_weather,
-    text_analyzer, current_time, memory_store, ToolExecutor
+    text_analyzer, current_time, memory_store, ToolExecutor, get_tools_description, _evaluate_expression,
+    _compile_expression, _tool_concurrency_limit, MAX_EXPRESSION_CHARS
+)
+from src.day3_core.engine import (
+    ReActEngine, ReActStep, create_react_engine, MAX_OBS_CHARS, MAX_ACTION_INPUT_CHARS,
+    _find_json_object_end, _JsonObjectScanner, _parse_react_response
 )
-from src.day3_core.engine import ReActEngine, ReActStep, create_react_engine
 from src.day3_core.react_agent import create_react_agent
 from src.day2_framework.state import AgentState, AgentStatus, MessageRole
 
 
+def assert_tool_ok(tc: unittest.TestCase, r: ToolResult, /, **expected):
+    """断言工具执行成功，并逐项核对 data 中的期望字段"""
+    tc.assertTrue(r.success, r.error)
+    tc.assertIsNone(r.error)
+    for key, value in expected.items():
+        tc.assertEqual(r.data[key], value, key)
+
+
 class TestTools(unittest.TestCase):
     """测试工具系统"""
 
@@ -35,9 +57,45 @@ class TestTools(unittest.TestCase):
         """测试计算器成功情况"""
         result = calculator("123 + 456")
 
-        self.assertTrue(result.success)
-        self.assertEqual(result.data["result"], 579)
-        self.assertIsNone(result.error)
+        assert_tool_ok(self, result, result=579)
+
+    def test_tool_result_timestamp(self):
+        """测试结果时间戳在读取时由原始时间换算"""
+        before = datetime.now()
+        result = ToolResult(True, data={})
+
+        self.assertLess(abs((result.timestamp - before).total_seconds()), 1)
+        self.assertEqual(result.to_dict()["timestamp"], result.timestamp.isoformat())
+
+    def test_calculator_caches_repeated_expression(self):
+        """测试重复表达式命中结果缓存"""
+        calculator("7 * 8 + 1")
+        hits = _evaluate_expression.cache_info().hits
+
+        result = calculator("7 * 8 + 1")
+
+        self.assertEqual(result.data["result"], 57)
+        self.assertEqual(_evaluate_expression.cache_info().hits, hits + 1)
+
+    def test_calculator_reuses_compiled_failing_expression(self):
+        """测试计算出错的表达式不缓存结果，但复用已编译的代码对象"""
+        calculator("1 / 0")
+        hits = _compile_expression.cache_info().hits
+
+        result = calculator("1 / 0")
+
+        self.assertFalse(result.success)
+        self.assertEqual(_compile_expression.cache_info().hits, hits + 1)
+
+    def test_calculator_rejects_overlong_expression(self):
+        """测试超长表达式在编译前被拒绝"""
+        misses = _compile_expression.cache_info().misses
+
+        result = calculator("1+" * MAX_EXPRESSION_CHARS + "1")
+
+        self.assertFalse(result.success)
+        self.assertIn("表达式过长", result.error)
+        self.assertEqual(_compile_expression.cache_info().misses, misses)
 
     def test_calculator_invalid_expression(self):
         """测试计算器无效表达式"""
@@ -46,6 +104,16 @@ class TestTools(unittest.TestCase):
         self.assertFalse(result.success)
         self.assertIsNotNone(result.error)
 
+    def test_calculator_whitelist_by_token(self):
+        """测试白名单按词法单元校验，而不是按单个字符"""
+        for expression in ("c+o+s", "sinh(1)", "ab + 1", "__import__('os')"):
+            with self.subTest(expression=expression):
+                self.assertFalse(calculator(expression).success)
+
+        for expression, expected in (("sqrt(16) + abs(-2)", 6.0), ("log(100, 10)", 2.0), ("2e3 / 4", 500.0)):
+            with self.subTest(expression=expression):
+                assert_tool_ok(self, calculator(expression), result=expected)
+
     def test_get_weather_known_city(self):
         """测试天气查询已知城市"""
         result = get_weather("北京")
@@ -54,12 +122,18 @@ class TestTools(unittest.TestCase):
         self.assertIn("temperature", result.data)
         self.assertIn("weather", result.data)
 
+    def test_get_weather_update_time_format(self):
+        """测试天气更新时间使用秒级缓存的时间字符串"""
+        result = get_weather("北京")
+
+        parsed = datetime.strptime(result.data["update_time"], "%Y-%m-%d %H:%M:%S")
+        self.assertLess(abs((datetime.now() - parsed).total_seconds()), 2)
+
     def test_get_weather_unknown_city(self):
         """测试天气查询未知城市"""
         result = get_weather("未知城市")
 
-        self.assertTrue(result.success)
-        self.assertEqual(result.data["city"], "未知城市")
+        assert_tool_ok(self, result, city="未知城市")
 
     def test_text_analyzer_sentiment(self):
         """测试文本分析情感分析"""
@@ -69,6 +143,14 @@ class TestTools(unittest.TestCase):
         self.assertIn("sentiment", result.data)
         self.assertIn("confidence", result.data)
 
+    def test_text_analyzer_sentiment_counts(self):
+        """测试情感词统计按出现过的不同词计数"""
+        result = text_analyzer("Good product, GOOD price, 很棒，但是有个问题", "sentiment")
+
+        self.assertEqual(result.data["positive_words"], 2)
+        self.assertEqual(result.data["negative_words"], 1)
+        self.assertEqual(result.data["sentiment"], "positive")
+
     def test_text_analyzer_keywords(self):
         """测试文本分析关键词提取"""
         result = text_analyzer("Python编程语言很强大", "keywords")
@@ -76,6 +158,20 @@ class TestTools(unittest.TestCase):
         self.assertTrue(result.success)
         self.assertIn("keywords", result.data)
 
+    def test_text_analyzer_keyword_frequency(self):
+        """测试关键词按词频降序，停用词和短词被过滤"""
+        result = text_analyzer("python and the python agent, agent for python tools", "keywords")
+
+        keywords = [(kw["word"], kw["frequency"]) for kw in result.data["keywords"]]
+        self.assertEqual(keywords, [("python", 3), ("agent", 2), ("tools", 1)])
+        self.assertEqual(result.data["total_words"], 9)
+
+    def test_text_analyzer_length(self):
+        """测试文本长度统计"""
+        result = text_analyzer("Hello world. How are you?\nFine!", "length")
+
+        assert_tool_ok(self, result, character_count=31, word_count=6, line_count=2, sentence_count=4)
+
     def test_current_time(self):
         """测试时间查询"""
         result = current_time()
@@ -83,38 +179,29 @@ class TestTools(unittest.TestCase):
         self.assertTrue(result.success)
         self.assertIn("current_time", result.data)
 
-    def test_memory_store_set_get(self):
-        """测试内存存储设置和获取"""
-        # 设置值
-        set_result = memory_store("test_key", "test_value", "set")
-        self.assertTrue(set_result.success)
+    def test_memory_store_lifecycle(self):
+        """测试内存存储设置、获取、删除的完整流程"""
+        key = "test_key_lifecycle"
 
-        # 获取值
-        get_result = memory_store("test_key", "", "get")
-        self.assertTrue(get_result.success)
-        self.assertTrue(get_result.data["found"])
-        self.assertEqual(get_result.data["value"], "test_value")
+        with self.subTest(op="set"):
+            self.assertTrue(memory_store(key, "test_value", "set").success)
 
-    def test_memory_store_delete(self):
-        """测试内存存储删除"""
-        # 先设置值
-        memory_store("test_key_delete", "test_value", "set")
+        with self.subTest(op="get"):
+            get_result = memory_store(key, "", "get")
+            assert_tool_ok(self, get_result, found=True, value="test_value")
 
-        # 删除值
-        delete_result = memory_store("test_key_delete", "", "delete")
-        self.assertTrue(delete_result.success)
+        with self.subTest(op="delete"):
+            self.assertTrue(memory_store(key, "", "delete").success)
 
-        # 验证删除
-        get_result = memory_store("test_key_delete", "", "get")
-        self.assertTrue(get_result.success)
-        self.assertFalse(get_result.data["found"])
+        with self.subTest(op="get_after_delete"):
+            get_result = memory_store(key, "", "get")
+            assert_tool_ok(self, get_result, found=False)
 
     def test_tool_executor_execute_success(self):
         """测试工具执行器成功执行"""
         result = self.tool_executor.execute("calculator", {"expression": "10 * 5"})
 
-        self.assertTrue(result.success)
-        self.assertEqual(result.data["result"], 50)
+        assert_tool_ok(self, result, result=50)
 
     def test_tool_executor_execute_unknown_tool(self):
         """测试工具执行器未知工具"""
@@ -123,6 +210,18 @@ class TestTools(unittest.TestCase):
         self.assertFalse(result.success)
         self.assertIn("未知工具", result.error)
 
+    def test_tool_executor_execute_batch(self):
+        """测试批量执行保持顺序且故障隔离"""
+        results = self.tool_executor.execute_batch([
+            ("calculator", {"expression": "2 + 2"}),
+            ("unknown_tool", {}),
+            ("get_weather", {"city": "上海"}),
+        ], max_workers=3)
+
+        self.assertEqual(results[0].data["result"], 4)
+        self.assertFalse(results[1].success)
+        self.assertEqual(results[2].data["city"], "上海")
+
     def test_tool_executor_execute_invalid_params(self):
         """测试工具执行器无效参数"""
         result = self.tool_executor.execute("calculator", {})
@@ -130,13 +229,31 @@ class TestTools(unittest.TestCase):
         self.assertFalse(result.success)
         self.assertIn("参数错误", result.error)
 
+    def test_tool_executor_rejects_unexpected_params(self):
+        """测试多余参数在调用工具前被拒绝"""
+        result = self.tool_executor.execute("get_weather", {"city": "北京", "country": "中国"})
+
+        self.assertFalse(result.success)
+        self.assertEqual(result.error, "参数错误: 不支持的参数 country")
+
+    def test_tool_schema_and_description_lookup(self):
+        """测试工具 Schema 按名称查找，描述文本只构建一次"""
+        self.assertEqual(self.tool_executor.get_tool_schema("get_weather")["name"], "get_weather")
+        self.assertIsNone(self.tool_executor.get_tool_schema("unknown_tool"))
+        self.assertIs(get_tools_description(), get_tools_description())
+
 
 class TestReActEngine(unittest.TestCase):
     """测试 ReAct 引擎"""
 
+    @classmethod
+    def setUpClass(cls):
+        """整个测试类共享一个引擎，避免每个测试重复构建"""
+        cls.engine = create_react_engine("test_engine", max_steps=3)
+
     def setUp(self):
-        """测试前准备"""
-        self.engine = create_react_engine("test_engine", max_steps=3)
+        """测试前重置引擎循环状态"""
+        self.engine.reset()
 
     def test_engine_initialization(self):
         """测试引擎初始化"""
@@ -145,6 +262,12 @@ class TestReActEngine(unittest.TestCase):
         self.assertGreater(len(self.engine.available_tools), 0)
         self.assertIsNotNone(self.engine.system_prompt)
 
+    def test_system_prompt_cached_across_engines(self):
+        """测试相同工具集的引擎共享同一份系统提示词"""
+        other = create_react_engine("test_engine_2", max_steps=3)
+
+        self.assertIs(other.system_prompt, self.engine.system_prompt)
+
     def test_parse_response_with_final_answer(self):
         """测试解析包含最终答案的响应"""
         response = """**Thought**: 我已经计算完成
@@ -173,6 +296,34 @@ class TestReActEngine(unittest.TestCase):
         self.assertIsNotNone(action_input)
         self.assertFalse(is_final)
 
+    def test_parse_response_cached(self):
+        """测试相同响应只解析一次"""
+        response = """**Thought**: 需要计算
+
+**Action**: calculator
+
+**Action Input**: {"expression": "3 + 4"}"""
+
+        first = _parse_react_response(response)
+
+        self.assertIs(_parse_react_response(response), first)
+        self.assertEqual(self.engine._parse_response(response), first)
+
+    def test_parse_response_returns_copy_of_cached_input(self):
+        """测试修改解析结果不会污染缓存"""
+        response = """**Thought**: 需要计算
+
+**Action**: calculator
+
+**Action Input**: {"expression": "5 + 6"}"""
+
+        _, _, action_input, _ = self.engine._parse_response(response)
+        action_input["expression"] = "被修改"
+        action_input["extra"] = 1
+
+        _, _, reparsed, _ = self.engine._parse_response(response)
+        self.assertEqual(reparsed, {"expression": "5 + 6"})
+
     def test_parse_response_invalid_json(self):
         """测试解析包含无效 JSON 的响应"""
         response = """**Thought**: 需要计算
@@ -188,6 +339,17 @@ class TestReActEngine(unittest.TestCase):
         self.assertIsNotNone(action_input)
         self.assertFalse(is_final)
 
+    def test_parse_response_oversized_action_input(self):
+        """测试超长 Action Input 不做解析直接截断"""
+        payload = "{" + "x" * (MAX_ACTION_INPUT_CHARS * 2)
+        response = f"**Thought**: 需要计算\n**Action**: calculator\n**Action Input**: {payload}"
+
+        thought, action, action_input, is_final = self.engine._parse_response(response)
+
+        self.assertEqual(action, "calculator")
+        self.assertEqual(len(action_input["raw_input"]), MAX_ACTION_INPUT_CHARS)
+        self.assertFalse(is_final)
+
     def test_build_context_prompt_empty_history(self):
         """测试构建空历史记录的上下文提示"""
         user_query = "测试查询"
@@ -209,6 +371,98 @@ class TestReActEngine(unittest.TestCase):
         self.assertIn("之前的对话步骤", context)
         self.assertIn("测试思考", context)
 
+    def test_build_context_prompt_observation_window(self):
+        """测试超出观察窗口的旧步骤省略观察结果"""
+        for i in range(1, 6):
+            self.engine.steps.append(
+                ReActStep(i, f"思考{i}", "calculator", {"expression": "1+1"}, f"观察{i}")
+            )
+
+        context = self.engine._build_context_prompt("测试查询")
+
+        self.assertIn("思考1", context)
+        self.assertNotIn("观察1", context)
+        self.assertNotIn("观察2", context)
+        self.assertIn("[已省略, 观察长度=3]", context)
+        for i in range(3, 6):
+            self.assertIn(f"观察{i}", context)
+
+    def test_checkpoint_context_summarizes_old_steps(self):
+        """测试上下文超出预算时旧步骤被压缩为摘要"""
+        class FakeSummaryService:
+            def chat_completion(self, messages, **kwargs):
+                return {"success": True, "content": "- 已完成前两步计算"}
+
+        engine = create_react_engine("summary_test", max_steps=3)
+        engine.ai_service = FakeSummaryService()
+        engine.context_token_budget = 10
+        for i in range(1, 6):
+            engine.steps.append(
+                ReActStep(i, f"思考{i}", "calculator", {"expression": "1+1"}, f"观察{i}")
+            )
+
+        context = engine._checkpoint_context("测试查询")
+
+        self.assertIn("步骤 1-2 摘要", context)
+        self.assertIn("已完成前两步计算", context)
+        self.assertNotIn("思考1", context)
+        self.assertIn("思考3", context)
+        self.assertEqual(len(engine.steps), 5)
+
+    def test_step_timestamps_monotonic(self):
+        """测试步骤耗时按单调时钟计算，序列化的时间戳仍为 Unix 时间"""
+        first = ReActStep(1, "第一步")
+        second = ReActStep(2, "第二步")
+
+        self.assertGreaterEqual(second.duration_ns(first), 0)
+        self.assertLess(abs(first.timestamp - time.time()), 5)
+        self.assertEqual(first.to_dict()["timestamp"], first.timestamp)
+        self.assertNotIn("_monotonic_ns", first.to_dict())
+
+    def test_step_render_cached(self):
+        """测试步骤文本只渲染一次"""
+        step = ReActStep(1, "测试思考", "calculator", {"expression": "1+1"}, "结果: 2")
+
+        rendered = step.render()
+        self.assertIs(step.render(), rendered)
+        self.assertIn('Action Input: {"expression":"1+1"}', rendered)
+        self.assertIn("[已省略, 观察长度=5]", step.render(compact=True))
+
+    def test_format_observation_truncated(self):
+        """测试过长观察结果被截断"""
+        tool_result = ToolResult(True, "x" * (MAX_OBS_CHARS * 2))
+        observation = self.engine._format_observation(tool_result)
+
+        self.assertEqual(len(observation), MAX_OBS_CHARS + len("…[truncated]"))
+        self.assertTrue(observation.endswith("…[truncated]"))
+
+    def test_execute_batch_tool(self):
+        """测试 batch 元工具并发执行且故障隔离"""
+        result = self.engine._execute_tool_action("batch", {"invocations": [
+            {"tool_name": "calculator", "arguments": {"expression": "2 * 3"}},
+            {"tool_name": "unknown_tool", "arguments": {}},
+            {"tool_name": "get_weather", "arguments": {"city": "北京"}},
+        ]})
+
+        assert_tool_ok(self, result, succeeded=2, failed=1)
+        self.assertEqual(result.data["results"][0]["data"]["result"], 6)
+        self.assertIn("未知工具", result.data["results"][1]["error"])
+        self.assertIn("batch", self.engine.system_prompt)
+
+    def test_batch_example_in_system_prompt_is_json(self):
+        """测试系统提示词中的 batch 示例是合法 JSON"""
+        prompt = self.engine.system_prompt
+        batch_desc = prompt[prompt.index("- **batch**"):]
+        example = batch_desc[batch_desc.index("示例:") + len("示例:"):].split("\n", 1)[0]
+
+        self.assertEqual(json.loads(example)["invocations"][0]["tool_name"], "get_weather")
+
+    def test_execute_batch_tool_invalid_input(self):
+        """测试 batch 元工具参数校验"""
+        result = self.engine._execute_tool_action("batch", {"invocations": []})
+
+        self.assertFalse(result.success)
+
     def test_format_observation_success(self):
         """测试格式化成功观察结果"""
         tool_result = ToolResult(True, {"result": 42, "unit": "items"})
@@ -225,6 +479,153 @@ class TestReActEngine(unittest.TestCase):
         self.assertIn("工具执行失败", observation)
         self.assertIn("计算错误", observation)
 
+    def test_find_json_object_end(self):
+        """测试流式输出中 JSON 对象闭合检测"""
+        text = '**Action Input**: {"expression": "{1}", "x": {"y": 1}} 尾部文本'
+
+        self.assertIsNone(_find_json_object_end(text[:30], 0))
+        end = _find_json_object_end(text, 0)
+        self.assertEqual(text[:end], '**Action Input**: {"expression": "{1}", "x": {"y": 1}}')
+
+    def test_json_scanner_resumes_across_deltas(self):
+        """测试增量扫描器跨增量保留状态，每次只扫描新增字符"""
+        text = '**Action Input**: {"expression": "a\\"}{", "x": {"y": 1}} 尾部文本'
+        scanner = _JsonObjectScanner(0)
+
+        end = None
+        prefix = ""
+        for i in range(0, len(text), 3):
+            prefix = text[:i + 3]
+            end = scanner.feed(prefix)
+            if end is not None:
+                break
+            # 未闭合时扫描位置推进到当前文本末尾，下次从这里继续
+            self.assertEqual(scanner.pos, len(prefix))
+
+        self.assertEqual(end, _find_json_object_end(text, 0))
+        self.assertEqual(text[:end], '**Action Input**: {"expression": "a\\"}{", "x": {"y": 1}}')
+
+    def test_process_streaming_speculative_tool(self):
+        """测试流式模式下 Action Input 闭合后投机执行工具"""
+        executed = []
+
+        class FakeStreamService:
+            def __init__(self):
+                self.responses = [
+                    '**Thought**: 需要计算\n**Action**: calculator\n'
+                    '**Action Input**: {"expression": "6 * 7"}\n多余的尾部文本',
+                    '**Thought**: 计算完成\n**Final Answer**: 42',
+                ]
+
+            def chat_completion_stream(self, messages, on_delta=None, **kwargs):
+                content = self.responses.pop(0)
+                for i in range(0, len(content), 5):
+                    on_delta(content[i:i + 5])
+                return {"success": True, "content": content}
+
+        engine = create_react_engine("stream_test", max_steps=3)
+        engine.ai_service = FakeStreamService()
+        engine.stream = True
+        engine.state = AgentState()
+        original_run = engine._run_tool
+
+        def tracking_run(action, action_input):
+            executed.append((action, action_input))
+            return original_run(action, action_input)
+
+        engine._run_tool = tracking_run
+
+        engine.process("6 乘以 7")
+
+        self.assertTrue(engine.is_complete)
+        self.assertEqual(executed, [("calculator", {"expression": "6 * 7"})])
+        self.assertEqual(engine.steps[0].tool_result.data["result"], 42)
+        # 采用的投机结果在主线程补记为一次工具调用
+        self.assertEqual([call.tool_name for call in engine.state.tool_calls], ["calculator"])
+
+    def test_close_shuts_down_tool_thread(self):
+        """测试 close 关闭投机执行使用的工具线程，之后仍可重新创建"""
+        engine = create_react_engine("close_test", max_steps=3, debug_mode=False)
+        executor = engine._get_executor()
+        executor.submit(lambda: None).result()
+
+        engine.close()
+
+        self.assertIsNone(engine._executor)
+        with self.assertRaises(RuntimeError):
+            executor.submit(lambda: None)
+        self.assertIsNot(engine._get_executor(), executor)
+        engine.close()
+
+    def test_streaming_discarded_speculation_not_recorded(self):
+        """测试同一回复中先给出 Action 又给出 Final Answer 时，投机执行不记入工具调用"""
+        class FakeStreamService:
+            def chat_completion_stream(self, messages, on_delta=None, **kwargs):
+                content = ('**Thought**: 先算一下\n**Action**: calculator\n'
+                           '**Action Input**: {"expression": "6 * 7"}\n'
+                           '**Final Answer**: 42')
+                for i in range(0, len(content), 5):
+                    on_delta(content[i:i + 5])
+                return {"success": True, "content": content}
+
+        engine = create_react_engine("stream_discard", max_steps=3, debug_mode=False)
+        engine.ai_service = FakeStreamService()
+        engine.stream = True
+        engine.state = AgentState()
+
+        engine.process("6 乘以 7")
+
+        self.assertTrue(engine.is_complete)
+        self.assertEqual(engine.state.tool_calls, [])
+        self.assertTrue(all(step.action is None for step in engine.steps))
+
+    def test_streaming_does_not_speculate_side_effect_tools(self):
+        """测试流式模式下有副作用的工具不投机执行，只在完整解析后执行一次"""
+        streaming = {"active": False}
+        executed = []
+
+        class FakeStreamService:
+            def __init__(self):
+                self.responses = [
+                    '**Thought**: 记住名字\n**Action**: memory_store\n'
+                    '**Action Input**: {"key": "spec_name", "value": "张三"}\n尾部',
+                    '**Thought**: 已记住\n**Final Answer**: 好的',
+                ]
+
+            def chat_completion_stream(self, messages, on_delta=None, **kwargs):
+                content = self.responses.pop(0)
+                streaming["active"] = True
+                for i in range(0, len(content), 5):
+                    on_delta(content[i:i + 5])
+                streaming["active"] = False
+                return {"success": True, "content": content}
+
+        engine = create_react_engine("stream_side_effect", max_steps=3)
+        engine.ai_service = FakeStreamService()
+        engine.stream = True
+        original_run = engine._run_tool
+
+        def tracking_run(action, action_input):
+            executed.append((action, streaming["active"]))
+            return original_run(action, action_input)
+
+        engine._run_tool = tracking_run
+        try:
+            engine.process("记住我叫张三")
+        finally:
+            memory_store("spec_name", operation="delete")
+
+        self.assertEqual(executed, [("memory_store", False)])
+
+    def test_debug_mode_off_skips_console_output(self):
+        """测试关闭调试模式后不再输出诊断信息"""
+        engine = create_react_engine("quiet_engine", max_steps=3, debug_mode=False)
+
+        with patch("src.day3_core.engine.console.print") as mock_print:
+            engine._execute_tool_action("calculator", {"expression": "1 + 1"})
+
+        mock_print.assert_not_called()
+
     def test_get_execution_summary(self):
         """测试获取执行摘要"""
         # 添加一个步骤
@@ -243,9 +644,21 @@ class TestReActEngine(unittest.TestCase):
 class TestReActAgent(unittest.TestCase):
     """测试 ReAct Agent"""
 
+    @classmethod
+    def setUpClass(cls):
+        """整个测试类共享一个 Agent，避免每个测试重复构建"""
+        cls.agent = create_react_agent("test_agent", debug_mode=True, max_steps=2)
+        # 类级临时目录，测试文件随目录统一清理
+        cls._tmp = tempfile.TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.agent.flush_saves()
+        cls._tmp.cleanup()
+
     def setUp(self):
-        """测试前准备"""
-        self.agent = create_react_agent("test_agent", debug_mode=True, max_steps=2)
+        """测试前重置 Agent 状态"""
+        self.agent.reset()
 
     def test_agent_initialization(self):
         """测试 Agent 初始化"""
@@ -254,6 +667,16 @@ class TestReActAgent(unittest.TestCase):
         self.assertTrue(self.agent.agent.state.debug_mode)
         self.assertEqual(self.agent.react_engine.max_steps, 2)
 
+    def test_ai_service_created_lazily(self):
+        """测试只读取工具信息时不创建 AI 服务"""
+        agent = create_react_agent("lazy_agent", debug_mode=False, max_steps=2)
+
+        agent.get_available_tools()
+        agent.get_tool_info("calculator")
+
+        self.assertNotIn("ai_service", agent.react_engine.__dict__)
+        self.assertNotIn("ai_service", agent.agent.__dict__)
+
     def test_get_available_tools(self):
         """测试获取可用工具"""
         tools = self.agent.get_available_tools()
@@ -271,6 +694,19 @@ class TestReActAgent(unittest.TestCase):
         self.assertIn("description", info)
         self.assertIn("parameters", info)
 
+    def test_snapshot_counts(self):
+        """测试状态快照与 Agent 状态和引擎步骤一致"""
+        self.agent.agent.state.add_thought("快照思考")
+        self.agent.react_engine.steps.append(ReActStep(step_number=1, thought="t"))
+
+        snap = self.agent.snapshot()
+
+        self.assertEqual(snap.agent_id, "test_agent")
+        self.assertEqual(snap.thoughts_count, len(self.agent.agent.state.thoughts))
+        self.assertEqual(snap.total_steps, 1)
+        self.assertFalse(snap.is_complete)
+        self.assertIsInstance(snap.status, str)
+
     def test_get_tool_info_unknown(self):
         """测试获取未知工具信息"""
         info = self.agent.get_tool_info("unknown_tool")
@@ -302,31 +738,28 @@ class TestReActAgent(unittest.TestCase):
         self.assertEqual(self.agent.react_engine.current_step, 0)
         self.assertEqual(len(self.agent.react_engine.steps), 0)
         self.assertFalse(self.agent.react_engine.is_complete)
+        self.assertIs(self.agent.react_engine.state, self.agent.agent.state)
 
     def test_save_state(self):
         """测试保存状态"""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-            temp_file = f.name
-
-        try:
-            # 添加一些状态
-            self.agent.agent.state.add_thought("测试思考")
+        temp_file = os.path.join(self._tmp.name, f"state_{uuid4().hex}.json")
 
-            # 保存状态
-            self.agent.save_state(temp_file)
+        # 添加一些状态
+        self.agent.agent.state.add_thought("测试思考")
 
-            # 验证文件存在
-            self.assertTrue(os.path.exists(temp_file))
+        # 保存状态（ReAct 轨迹异步写入，需等待完成）
+        self.agent.save_state(temp_file)
+        self.agent.flush_saves()
 
-            # 验证 ReAct 状态文件
-            react_file = temp_file.replace('.json', '_react.json')
-            self.assertTrue(os.path.exists(react_file))
+        # 验证文件存在
+        self.assertTrue(os.path.exists(temp_file))
 
-        finally:
-            # 清理文件
-            for file_path in [temp_file, temp_file.replace('.json', '_react.json')]:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
+        # 验证 ReAct 状态文件
+        base = Path(temp_file)
+        react_file = base.with_name(f"{base.stem}_react.json")
+        self.assertTrue(os.path.exists(react_file))
+        with open(react_file, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)["agent_id"], "test_agent")
 
 
 class TestReActIntegration(unittest.TestCase):
@@ -374,6 +807,38 @@ class TestReActIntegration(unittest.TestCase):
         self.assertIsNotNone(engine.final_answer)
         self.assertIn("面积", engine.final_answer)
 
+    def test_batch_independent_tools_concurrently(self):
+        """测试相互独立的工具调用并发执行"""
+        engine = create_react_engine("batch_test", max_steps=5)
+        calls = [
+            ("web_search", {"query": "Python", "num_results": 1}),
+            ("web_search", {"query": "ReAct", "num_results": 1}),
+        ]
+        # 两个调用都到达屏障后才能继续：顺序执行时第一个调用会等待超时而失败
+        barrier = threading.Barrier(len(calls), timeout=5)
+
+        def fake_execute(tool_name, parameters):
+            barrier.wait()
+            return ToolResult(True, data=parameters["query"])
+
+        with patch.object(ToolExecutor, "execute", side_effect=fake_execute):
+            results = engine.tool_executor.execute_batch(calls, max_workers=2)
+
+        self.assertTrue(all(result.success for result in results))
+        self.assertEqual([result.data for result in results], ["Python", "ReAct"])
+
+    def test_batch_concurrency_limit_from_env(self):
+        """测试 TOOL_CONCURRENCY_LIMIT 无效时按顺序执行而不抛出异常"""
+        calls = [("calculator", {"expression": "1 + 1"}), ("calculator", {"expression": "2 + 2"})]
+        for value in ("abc", "0", "-3", ""):
+            with self.subTest(value=value), patch.dict(os.environ, {"TOOL_CONCURRENCY_LIMIT": value}):
+                self.assertEqual(_tool_concurrency_limit(), 1)
+                results = ToolExecutor.execute_batch(calls)
+                self.assertEqual([result.data["result"] for result in results], [2, 4])
+
+        with patch.dict(os.environ, {"TOOL_CONCURRENCY_LIMIT": "4"}):
+            self.assertEqual(_tool_concurrency_limit(), 4)
+
     def test_complex_multi_step_react(self):
         """测试复杂多步骤 ReAct 过程"""
         engine = create_react_engine("complex_test", max_steps=5)
@@ -426,33 +891,71 @@ class TestReActIntegration(unittest.TestCase):
         self.assertIn("20000", engine.final_answer)
 
 
-def run_comprehensive_test():
-    """运行综合测试"""
+class _AggregatedResult:
+    """汇总多个子进程的测试结果，提供与 unittest.TestResult 相同的摘要属性"""
+
+    def __init__(self):
+        self.testsRun = 0
+        self.failures: List[str] = []
+        self.errors: List[str] = []
+        self.skipped: List[str] = []
+
+    def add(self, tests_run: int, failures: List[str], errors: List[str], skipped: List[str]):
+        self.testsRun += tests_run
+        self.failures.extend(failures)
+        self.errors.extend(errors)
+        self.skipped.extend(skipped)
+
+    def wasSuccessful(self) -> bool:
+        return not self.failures and not self.errors
+
+
+_LOADER = unittest.TestLoader()
+
+
+def _run_test_class(class_name: str) -> Tuple[int, List[str], List[str], List[str], str]:
+    """在子进程中运行单个测试类，返回可 pickle 的结果摘要和输出"""
+    suite = _LOADER.loadTestsFromTestCase(globals()[class_name])
+
+    stream = io.StringIO()
+    result = unittest.TextTestRunner(stream=stream, verbosity=2, buffer=True, warnings="ignore").run(suite)
+
+    return (
+        result.testsRun,
+        [f"{test.id()}\n{trace}" for test, trace in result.failures],
+        [f"{test.id()}\n{trace}" for test, trace in result.errors],
+        [f"{test.id()}: {reason}" for test, reason in result.skipped],
+        stream.getvalue()
+    )
+
+
+def run_comprehensive_test(verbose: bool = False):
+    """运行综合测试（各测试类互不共享状态，按类并行到多个进程）
+
+    每个测试的输出都先写入内存缓冲区，只有 verbose 时才打印逐条结果。
+    """
     from rich.console import Console
     console = Console()
 
     console.print("🧪 开始 ReAct Agent 综合测试", style="bold blue")
     console.print("=" * 60, style="blue")
 
-    # 创建测试套件
-    loader = unittest.TestLoader()
-    suite = unittest.TestSuite()
-
-    # 添加测试类
-    test_classes = [
-        TestTools,
-        TestReActEngine,
-        TestReActAgent,
-        TestReActIntegration
+    # 一次扫描模块收集全部测试类，新增的 TestCase 无需手动登记
+    module_suite = _LOADER.loadTestsFromModule(sys.modules[__name__])
+    class_names = [
+        type(next(iter(class_suite))).__name__
+        for class_suite in module_suite
+        if class_suite.countTestCases()
     ]
 
-    for test_class in test_classes:
-        tests = loader.loadTestsFromTestCase(test_class)
-        suite.addTests(tests)
-
-    # 运行测试
-    runner = unittest.TextTestRunner(verbosity=2)
-    result = runner.run(suite)
+    # 每个测试类一个进程并行运行
+    result = _AggregatedResult()
+    with ProcessPoolExecutor(max_workers=len(class_names)) as executor:
+        outputs = executor.map(_run_test_class, class_names)
+        for tests_run, failures, errors, skipped, output in outputs:
+            if verbose:
+                console.print(output, markup=False, highlight=False)
+            result.add(tests_run, failures, errors, skipped)
 
     # 输出结果摘要
     console.print(f"\n📊 测试结果摘要:")
@@ -471,5 +974,5 @@ def run_comprehensive_test():
 
 
 if __name__ == "__main__":
-    success = run_comprehensive_test()
+    success = run_comprehensive_test(verbose="--verbose" in sys.argv[1:])
     sys.exit(0 if success else 1)
\ No newline at end of file
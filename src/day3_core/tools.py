@@ -8,29 +8,62 @@ ReAct Tools - Agent 的"手"
 LLM 就不知道什么时候用这个策略。
 """
 
+import functools
+import inspect
 import json
+import os
 import time
 import math
 import re
-from typing import Dict, Any, Callable, List, Optional
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from types import CodeType, MappingProxyType
+from typing import Dict, Any, Callable, List, Mapping, Optional, Tuple
 from datetime import datetime
-from rich.console import Console
 
 # 注释掉 requests，因为在这个演示中没有实际使用
 # import requests
 
-console = Console()
+try:
+    from ..console import console
+except ImportError:
+    # 作为脚本直接运行时没有上层包
+    from rich.console import Console
+    console = Console()
+
+
+# 秒级时间字符串缓存：(秒数, 格式化结果)，整体替换保证线程间读到一致的二元组
+_now_str_cache = (-1, "")
+
+
+def _now_str() -> str:
+    """当前本地时间的 "%Y-%m-%d %H:%M:%S" 字符串，同一秒内只格式化一次"""
+    global _now_str_cache
+    sec = time.time_ns() // 1_000_000_000
+    cached_sec, cached_str = _now_str_cache
+    if sec != cached_sec:
+        cached_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(sec))
+        _now_str_cache = (sec, cached_str)
+    return cached_str
 
 
 # 基础工具类型定义
 class ToolResult:
     """工具执行结果"""
+    __slots__ = ("success", "data", "error", "metadata", "_ts")
+
     def __init__(self, success: bool, data: Any = None, error: str = None, metadata: Dict[str, Any] = None):
         self.success = success
         self.data = data
         self.error = error
         self.metadata = metadata or {}
-        self.timestamp = datetime.now()
+        # 只记录原始时间戳，大多数结果用完即弃，datetime 对象在读取时才创建
+        self._ts = time.time()
+
+    @property
+    def timestamp(self) -> datetime:
+        """结果创建时间"""
+        return datetime.fromtimestamp(self._ts)
 
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典格式"""
@@ -43,6 +76,54 @@ class ToolResult:
         }
 
 
+# 计算器使用的安全命名空间
+_CALCULATOR_NAMESPACE = {
+    '__builtins__': {},
+    'sin': math.sin,
+    'cos': math.cos,
+    'tan': math.tan,
+    'log': math.log,
+    'sqrt': math.sqrt,
+    'exp': math.exp,
+    'abs': abs,
+    'pi': math.pi,
+    'e': math.e
+}
+
+
+# 计算器表达式白名单：按词法单元（数字、运算符、允许的函数名和常量）整串匹配，
+# 原子组 + 占有量词保证匹配失败时不回溯，整体一次线性扫描
+_CALC_EXPR_RE = re.compile(r"""
+    (?:\s*(?>
+        \d+(?:\.\d*)?(?:[eE][+-]?\d+)?    # 整数、小数、科学计数法
+      | \.\d+(?:[eE][+-]?\d+)?
+      | [-+*/(),\[\]{}]                  # 运算符和括号
+      | (?:sqrt|sin|cos|tan|log|exp|abs|pi|e)(?!\w)
+    ))*+\s*
+""", re.VERBOSE)
+
+# 表达式长度上限，超长输入直接拒绝，不进入编译和缓存
+MAX_EXPRESSION_CHARS = 512
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_expression(expression: str) -> CodeType:
+    """编译表达式为代码对象并缓存，结果缓存未命中时（如上次计算出错）跳过解析和编译"""
+    return compile(expression, "<calc>", "eval")
+
+
+@functools.lru_cache(maxsize=1024)
+def _evaluate_expression(expression: str) -> Any:
+    """
+    计算表达式的值，按表达式字符串缓存结果
+
+    表达式只含数字、运算符和纯数学函数，结果是确定的，
+    ReAct 循环中重复出现的表达式直接命中缓存。计算出错时异常不会被缓存。
+    """
+    # 使用 eval 进行计算（注意：生产环境中应该用更安全的方式）
+    return eval(_compile_expression(expression), _CALCULATOR_NAMESPACE, {})
+
+
 # 工具函数定义
 def calculator(expression: str) -> ToolResult:
     """
@@ -55,28 +136,15 @@ def calculator(expression: str) -> ToolResult:
         ToolResult: 计算结果或错误信息
     """
     try:
+        if len(expression) > MAX_EXPRESSION_CHARS:
+            return ToolResult(False, error=f"表达式过长（超过 {MAX_EXPRESSION_CHARS} 个字符）")
+
         # 安全的数学表达式评估
         # 只允许数字、基本运算符和数学函数
-        allowed_chars = set('0123456789+-*/.()[]{}sincostanlogsqrtexpabs')
-        if not all(c in allowed_chars or c.isspace() for c in expression):
+        if not _CALC_EXPR_RE.fullmatch(expression):
             return ToolResult(False, error="表达式包含不允许的字符")
 
-        # 使用 eval 进行计算（注意：生产环境中应该用更安全的方式）
-        # 创建安全的命名空间
-        safe_dict = {
-            '__builtins__': {},
-            'sin': math.sin,
-            'cos': math.cos,
-            'tan': math.tan,
-            'log': math.log,
-            'sqrt': math.sqrt,
-            'exp': math.exp,
-            'abs': abs,
-            'pi': math.pi,
-            'e': math.e
-        }
-
-        result = eval(expression, safe_dict, {})
+        result = _evaluate_expression(expression)
 
         return ToolResult(True, data={
             "expression": expression,
@@ -128,6 +196,22 @@ def web_search(query: str, num_results: int = 5) -> ToolResult:
         return ToolResult(False, error=f"搜索失败: {str(e)}")
 
 
+# 模拟天气数据（只读，导入时构建一次）
+_WEATHER_DATA: Mapping[str, Mapping[str, Any]] = MappingProxyType({
+    "北京": {"temp": 25, "weather": "晴天", "humidity": 45, "wind": "北风3级"},
+    "上海": {"temp": 28, "weather": "多云", "humidity": 65, "wind": "东南风2级"},
+    "广州": {"temp": 32, "weather": "阵雨", "humidity": 78, "wind": "南风2级"},
+    "深圳": {"temp": 30, "weather": "晴天", "humidity": 70, "wind": "东风3级"},
+    "成都": {"temp": 22, "weather": "阴天", "humidity": 80, "wind": "无风"},
+})
+_DEFAULT_WEATHER: Mapping[str, Any] = MappingProxyType({
+    "temp": 20,
+    "weather": "未知",
+    "humidity": 50,
+    "wind": "未知"
+})
+
+
 def get_weather(city: str) -> ToolResult:
     """
     天气查询工具（模拟实现）
@@ -139,25 +223,8 @@ def get_weather(city: str) -> ToolResult:
         ToolResult: 天气信息
     """
     try:
-        # 模拟天气数据
-        weather_data = {
-            "北京": {"temp": 25, "weather": "晴天", "humidity": 45, "wind": "北风3级"},
-            "上海": {"temp": 28, "weather": "多云", "humidity": 65, "wind": "东南风2级"},
-            "广州": {"temp": 32, "weather": "阵雨", "humidity": 78, "wind": "南风2级"},
-            "深圳": {"temp": 30, "weather": "晴天", "humidity": 70, "wind": "东风3级"},
-            "成都": {"temp": 22, "weather": "阴天", "humidity": 80, "wind": "无风"},
-        }
-
-        if city not in weather_data:
-            # 返回默认天气数据
-            weather_data[city] = {
-                "temp": 20,
-                "weather": "未知",
-                "humidity": 50,
-                "wind": "未知"
-            }
-
-        city_weather = weather_data[city]
+        # 未知城市返回默认天气数据
+        city_weather = _WEATHER_DATA.get(city, _DEFAULT_WEATHER)
 
         return ToolResult(True, data={
             "city": city,
@@ -165,13 +232,27 @@ def get_weather(city: str) -> ToolResult:
             "weather": city_weather["weather"],
             "humidity": city_weather["humidity"],
             "wind": city_weather["wind"],
-            "update_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            "update_time": _now_str()
         })
 
     except Exception as e:
         return ToolResult(False, error=f"天气查询失败: {str(e)}")
 
 
+# 情感词典，在模块导入时编译为单个忽略大小写的正则（长词优先），
+# 分析时直接扫描原文一遍，不必先复制一份小写文本
+_POSITIVE_WORDS = frozenset(["好", "棒", "优秀", "喜欢", "开心", "满意", "完美", "amazing", "good", "great"])
+_NEGATIVE_WORDS = frozenset(["差", "糟糕", "失败", "讨厌", "失望", "问题", "错误", "bad", "terrible", "awful"])
+_SENTIMENT_RE = re.compile("|".join(
+    re.escape(word) for word in sorted(_POSITIVE_WORDS | _NEGATIVE_WORDS, key=len, reverse=True)
+), re.IGNORECASE)
+
+# 关键词提取的分词正则和停用词（简单实现），以及长度统计的分句正则
+_WORD_RE = re.compile(r'\b\w+\b')
+_SENT_SPLIT_RE = re.compile(r'[.!?]+')
+_STOP_WORDS = frozenset({"the", "a", "an", "and", "or", "but", "in", "on", "at", "to", "for", "of", "with", "by", "的", "了", "在", "是", "我", "有", "和"})
+
+
 def text_analyzer(text: str, analysis_type: str = "sentiment") -> ToolResult:
     """
     文本分析工具
@@ -185,13 +266,10 @@ def text_analyzer(text: str, analysis_type: str = "sentiment") -> ToolResult:
     """
     try:
         if analysis_type == "sentiment":
-            # 简单的情感分析（基于关键词）
-            positive_words = ["好", "棒", "优秀", "喜欢", "开心", "满意", "完美", "amazing", "good", "great"]
-            negative_words = ["差", "糟糕", "失败", "讨厌", "失望", "问题", "错误", "bad", "terrible", "awful"]
-
-            text_lower = text.lower()
-            positive_count = sum(1 for word in positive_words if word in text_lower)
-            negative_count = sum(1 for word in negative_words if word in text_lower)
+            # 简单的情感分析（基于关键词），一次正则扫描找出出现过的情感词
+            matched = {word.lower() for word in _SENTIMENT_RE.findall(text)}
+            positive_count = len(matched & _POSITIVE_WORDS)
+            negative_count = len(matched & _NEGATIVE_WORDS)
 
             if positive_count > negative_count:
                 sentiment = "positive"
@@ -214,18 +292,11 @@ def text_analyzer(text: str, analysis_type: str = "sentiment") -> ToolResult:
         elif analysis_type == "keywords":
             # 简单的关键词提取
             # 移除标点符号并分割单词
-            words = re.findall(r'\b\w+\b', text.lower())
-            # 过滤停用词（简单实现）
-            stop_words = {"the", "a", "an", "and", "or", "but", "in", "on", "at", "to", "for", "of", "with", "by", "的", "了", "在", "是", "我", "有", "和"}
-            filtered_words = [word for word in words if word not in stop_words and len(word) > 2]
+            words = _WORD_RE.findall(text.lower())
 
-            # 统计词频
-            word_freq = {}
-            for word in filtered_words:
-                word_freq[word] = word_freq.get(word, 0) + 1
-
-            # 取前10个高频词
-            keywords = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:10]
+            # 过滤停用词后统计词频，取前10个高频词
+            word_freq = Counter(word for word in words if len(word) > 2 and word not in _STOP_WORDS)
+            keywords = word_freq.most_common(10)
 
             return ToolResult(True, data={
                 "text": text,
@@ -239,8 +310,8 @@ def text_analyzer(text: str, analysis_type: str = "sentiment") -> ToolResult:
                 "text": text,
                 "character_count": len(text),
                 "word_count": len(text.split()),
-                "line_count": len(text.split('\n')),
-                "sentence_count": len(re.split(r'[.!?]+', text))
+                "line_count": text.count('\n') + 1,
+                "sentence_count": len(_SENT_SPLIT_RE.split(text))
             })
 
         else:
@@ -286,6 +357,13 @@ def current_time(timezone: str = "local") -> ToolResult:
         return ToolResult(False, error=f"时间查询失败: {str(e)}")
 
 
+# memory_store 使用的模块级字典（在实际应用中，应该使用数据库或文件系统）
+_MEMORY_STORE: Dict[str, str] = {}
+
+# memory_store 查找时区分“键不存在”的哨兵
+_MISSING = object()
+
+
 def memory_store(key: str, value: str = "", operation: str = "set") -> ToolResult:
     """
     内存存储工具（简单实现，在会话期间有效）
@@ -299,62 +377,67 @@ def memory_store(key: str, value: str = "", operation: str = "set") -> ToolResul
         ToolResult: 操作结果
     """
     try:
-        # 这里使用一个全局字典来存储数据
-        # 在实际应用中，应该使用数据库或文件系统
-        global _memory_store
-
-        if '_memory_store' not in globals():
-            _memory_store = {}
-
-        if operation == "set":
-            _memory_store[key] = value
-            return ToolResult(True, data={
-                "operation": "set",
-                "key": key,
-                "value": value,
-                "message": f"已存储: {key} = {value}"
-            })
-        elif operation == "get":
-            if key in _memory_store:
-                return ToolResult(True, data={
-                    "operation": "get",
-                    "key": key,
-                    "value": _memory_store[key],
-                    "found": True
-                })
-            else:
-                return ToolResult(True, data={
-                    "operation": "get",
-                    "key": key,
-                    "found": False,
-                    "message": f"键 '{key}' 不存在"
-                })
-        elif operation == "delete":
-            if key in _memory_store:
-                del _memory_store[key]
+        match operation:
+            case "set":
+                _MEMORY_STORE[key] = value
                 return ToolResult(True, data={
-                    "operation": "delete",
+                    "operation": "set",
                     "key": key,
-                    "message": f"已删除键: {key}"
+                    "value": value,
+                    "message": f"已存储: {key} = {value}"
                 })
-            else:
-                return ToolResult(False, error=f"键 '{key}' 不存在")
-        else:
-            return ToolResult(False, error=f"不支持的操作类型: {operation}")
+            case "get":
+                # 单次哈希查找，用哨兵区分“不存在”和存储的空值
+                stored = _MEMORY_STORE.get(key, _MISSING)
+                if stored is not _MISSING:
+                    return ToolResult(True, data={
+                        "operation": "get",
+                        "key": key,
+                        "value": stored,
+                        "found": True
+                    })
+                else:
+                    return ToolResult(True, data={
+                        "operation": "get",
+                        "key": key,
+                        "found": False,
+                        "message": f"键 '{key}' 不存在"
+                    })
+            case "delete":
+                if _MEMORY_STORE.pop(key, _MISSING) is not _MISSING:
+                    return ToolResult(True, data={
+                        "operation": "delete",
+                        "key": key,
+                        "message": f"已删除键: {key}"
+                    })
+                else:
+                    return ToolResult(False, error=f"键 '{key}' 不存在")
+            case _:
+                return ToolResult(False, error=f"不支持的操作类型: {operation}")
 
     except Exception as e:
         return ToolResult(False, error=f"内存操作失败: {str(e)}")
 
 
-# 工具注册表
-TOOLS: Dict[str, Callable] = {
+# 工具注册表（只读视图，导入后不可修改）
+TOOLS: Mapping[str, Callable] = MappingProxyType({
     "calculator": calculator,
     "web_search": web_search,
     "get_weather": get_weather,
     "text_analyzer": text_analyzer,
     "current_time": current_time,
     "memory_store": memory_store,
-}
+})
+
+# 没有副作用的工具：重复执行或执行后丢弃结果都不影响状态，可以提前（投机）执行。
+# memory_store 会修改存储，不在其中
+SIDE_EFFECT_FREE_TOOLS = frozenset({
+    "calculator",
+    "web_search",
+    "get_weather",
+    "text_analyzer",
+    "current_time",
+})
 
 
 # 工具 Schema - 这是给 LLM 看的"说明书"
@@ -498,6 +581,33 @@ TOOLS_SCHEMA = [
 ]
 
 
+# 按名称索引的工具 Schema，查找时不必线性扫描 TOOLS_SCHEMA
+_SCHEMA_BY_NAME: Mapping[str, Dict[str, Any]] = MappingProxyType({
+    tool["name"]: tool for tool in TOOLS_SCHEMA
+})
+
+
+# 每个工具的必需参数，执行前检查，缺参时不必等到函数调用抛出 TypeError
+_TOOL_REQUIRED_PARAMS: Mapping[str, frozenset] = MappingProxyType({
+    tool["name"]: frozenset(tool["parameters"].get("required", []))
+    for tool in TOOLS_SCHEMA
+})
+
+# 每个工具函数接受的参数名，导入时由函数签名一次性得出，多余参数在调用前即可拒绝
+_TOOL_ACCEPTED_PARAMS: Mapping[str, frozenset] = MappingProxyType({
+    name: frozenset(inspect.signature(func).parameters)
+    for name, func in TOOLS.items()
+})
+
+
+def _tool_concurrency_limit() -> int:
+    """读取 TOOL_CONCURRENCY_LIMIT 环境变量，缺失或无效时按 1（顺序执行）处理"""
+    try:
+        return max(int(os.getenv("TOOL_CONCURRENCY_LIMIT", "1")), 1)
+    except ValueError:
+        return 1
+
+
 # 工具执行器
 class ToolExecutor:
     """工具执行器"""
@@ -514,11 +624,19 @@ class ToolExecutor:
         Returns:
             ToolResult: 执行结果
         """
-        if tool_name not in TOOLS:
+        tool_func = TOOLS.get(tool_name)
+        if tool_func is None:
             return ToolResult(False, error=f"未知工具: {tool_name}")
 
         try:
-            tool_func = TOOLS[tool_name]
+            missing = _TOOL_REQUIRED_PARAMS.get(tool_name, frozenset()).difference(parameters)
+            if missing:
+                return ToolResult(False, error=f"参数错误: 缺少必需参数 {', '.join(sorted(missing))}")
+
+            unexpected = set(parameters).difference(_TOOL_ACCEPTED_PARAMS[tool_name])
+            if unexpected:
+                return ToolResult(False, error=f"参数错误: 不支持的参数 {', '.join(sorted(unexpected))}")
+
             result = tool_func(**parameters)
             return result
         except TypeError as e:
@@ -526,6 +644,34 @@ class ToolExecutor:
         except Exception as e:
             return ToolResult(False, error=f"工具执行失败: {str(e)}")
 
+    @staticmethod
+    def execute_batch(calls: List[Tuple[str, Dict[str, Any]]], max_workers: int = None) -> List[ToolResult]:
+        """
+        批量执行相互独立的工具调用
+
+        Args:
+            calls (List[Tuple[str, Dict[str, Any]]]): (工具名称, 工具参数) 列表
+            max_workers (int): 并发数，默认读取 TOOL_CONCURRENCY_LIMIT 环境变量（默认 1，即顺序执行）
+
+        Returns:
+            List[ToolResult]: 与 calls 顺序一致的执行结果，单个调用失败不影响其他调用
+        """
+        if max_workers is None:
+            max_workers = _tool_concurrency_limit()
+
+        def run(call: Tuple[str, Dict[str, Any]]) -> ToolResult:
+            try:
+                tool_name, parameters = call
+                return ToolExecutor.execute(tool_name, parameters)
+            except Exception as e:
+                return ToolResult(False, error=f"工具执行失败: {str(e)}")
+
+        if max_workers <= 1 or len(calls) <= 1:
+            return [run(call) for call in calls]
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(calls))) as executor:
+            return list(executor.map(run, calls))
+
     @staticmethod
     def get_available_tools() -> List[str]:
         """获取可用工具列表"""
@@ -534,15 +680,13 @@ class ToolExecutor:
     @staticmethod
     def get_tool_schema(tool_name: str) -> Optional[Dict[str, Any]]:
         """获取工具的 schema 信息"""
-        for tool in TOOLS_SCHEMA:
-            if tool["name"] == tool_name:
-                return tool
-        return None
+        return _SCHEMA_BY_NAME.get(tool_name)
 
 
 # 便捷函数
+@functools.lru_cache(maxsize=1)
 def get_tools_description() -> str:
-    """获取所有工具的描述信息，用于 prompt"""
+    """获取所有工具的描述信息，用于 prompt（TOOLS_SCHEMA 在进程内不变，只构建一次）"""
     descriptions = []
     for tool in TOOLS_SCHEMA:
         desc = f"- **{tool['name']}**: {tool['description']}"
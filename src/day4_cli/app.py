@@ -4,33 +4,49 @@ Personal Assistant CLI Application
 Day 4-5: Final personal assistant with CLI interface using ReAct mode.
 """
 
+import functools
+import itertools
+import json
 import os
 import sys
-from typing import Optional
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from typing import Dict, Iterable, Iterator, Optional, Tuple
 from pathlib import Path
 
 # 添加项目根目录到 Python 路径
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
-from rich.console import Console
 import typer
 
 # 导入我们的模块
+# Agent、聊天管理和界面组件会间接导入 LLM SDK，推迟到真正需要时导入，
+# version / config 等子命令不必承担这部分启动开销
 from src.day4_cli.config import get_config, CLIConfig
-from src.day4_cli.chat_manager import ChatManager
-from src.day4_cli.commands import CommandRegistry
-from src.day4_cli.cli_interface import CLIInterface
-from src.day3_core.react_agent import create_react_agent
+from src.console import console
 
-console = Console()
+
+def _iter_prompts(input_file: str) -> Iterator[str]:
+    """逐行产出批处理输入中的非空查询"""
+    # 1MB 读缓冲：大输入文件按块读取，减少读系统调用次数
+    with open(input_file, 'r', encoding='utf-8', buffering=1 << 20) as f:
+        for line in f:
+            prompt = line.strip()
+            if prompt:
+                yield prompt
 
 
 class AssistantApp:
     """主应用程序类"""
 
     def __init__(self, config: Optional[CLIConfig] = None):
+        from src.day4_cli.chat_manager import ChatManager
+        from src.day4_cli.commands import CommandRegistry
+        from src.day4_cli.cli_interface import CLIInterface
+        from src.day3_core.react_agent import create_react_agent
+
         self.config = config or get_config()
-        self.console = Console()
+        self.console = console
 
         # 初始化核心组件
         self.chat_manager = ChatManager()
@@ -50,16 +66,33 @@ class AssistantApp:
 
         console.print(f"🚀 {self.config.app_name} 已初始化", style="bold green")
 
+    @functools.cached_property
+    def _query_executor(self) -> ThreadPoolExecutor:
+        """
+        交互模式下执行查询的后台线程
+
+        主线程只等待结果，Ctrl+C 可以放弃当前这一轮而不退出程序。
+        单线程保证同一个 Agent 上的查询依次执行。
+        """
+        return ThreadPoolExecutor(max_workers=1, thread_name_prefix="assistant-query")
+
     def _handle_user_message(self, user_input: str):
         """处理用户消息的回调函数"""
         try:
             # 显示加载状态
-            with self.console.status("🤖 AI 正在思考...", spinner="dots"):
+            with self.console.status("🤖 AI 正在思考... (Ctrl+C 取消)", spinner="dots"):
                 # 使用 ReAct Agent 处理用户消息
-                response = self.react_agent.process_query(user_input)
-
-            # 显示助手回复
-            metadata = self._get_response_metadata()
+                future = self._query_executor.submit(self.react_agent.process_query, user_input)
+                try:
+                    response = future.result()
+                except KeyboardInterrupt:
+                    # 已开始的 LLM 请求无法中止，后台线程执行完毕后丢弃其结果
+                    future.cancel()
+                    self.console.print("⏹️ 已取消本轮回答", style="yellow")
+                    return
+
+            # 显示助手回复（元数据只在需要显示或调试时收集）
+            metadata = self._get_response_metadata() if self._collect_metadata() else None
             self.cli_interface.display_assistant_message(response, metadata)
 
             # 保存助手回复到聊天历史
@@ -72,31 +105,26 @@ class AssistantApp:
             error_message = f"处理失败: {str(e)}"
             self.chat_manager.add_assistant_message(error_message)
 
+    def _collect_metadata(self) -> bool:
+        """是否需要收集响应元数据（配置可在运行时通过 /config 修改，每轮重新判断）"""
+        return self.config.show_tool_calls or self.config.debug_mode
+
     def _get_response_metadata(self) -> dict:
         """获取响应元数据"""
         try:
-            # 从 ReAct Agent 获取状态信息
-            agent_state = self.react_agent.get_agent_state()
-            execution_summary = self.react_agent.get_execution_summary()
-
-            metadata = {
-                "agent_id": agent_state.agent_id,
-                "status": agent_state.status.value if hasattr(agent_state.status, 'value') else str(agent_state.status),
-                "total_thoughts": len(agent_state.thoughts),
-                "total_tool_calls": len(agent_state.tool_calls),
-                "execution_time": f"{agent_state.total_execution_time:.2f}s" if agent_state.total_execution_time else "0s"
+            # 从 ReAct Agent 一次读取状态快照，不必构建包含全部步骤的执行摘要
+            snap = self.react_agent.snapshot()
+
+            return {
+                "agent_id": snap.agent_id,
+                "status": snap.status,
+                "total_thoughts": snap.thoughts_count,
+                "total_tool_calls": snap.tool_calls_count,
+                "execution_time": f"{snap.execution_time:.2f}s" if snap.execution_time else "0s",
+                "total_steps": snap.total_steps,
+                "is_complete": snap.is_complete
             }
 
-            # 添加执行摘要信息
-            if execution_summary and "react_engine" in execution_summary:
-                react_summary = execution_summary["react_engine"]
-                metadata.update({
-                    "total_steps": react_summary.get("total_steps", 0),
-                    "is_complete": react_summary.get("is_complete", False)
-                })
-
-            return metadata
-
         except Exception:
             return {}
 
@@ -113,70 +141,146 @@ class AssistantApp:
         finally:
             self._cleanup()
 
-    def run_batch_mode(self, input_file: str, output_file: Optional[str] = None):
-        """运行批处理模式"""
+    def run_batch_mode(self, input_file: str, output_file: Optional[str] = None, jsonl: bool = False):
+        """
+        运行批处理模式
+
+        jsonl 为 True 时，每完成一条查询就向输出文件追加一行 JSON 记录（按完成顺序，带行号），
+        内存中不保留全部结果，批处理中途中断时已完成的结果也不会丢失。
+        否则在全部完成后按输入顺序写出一个 JSON 数组。
+        """
         self.console.print("📁 启动批处理模式", style="bold blue")
 
         try:
-            # 读取输入文件
-            with open(input_file, 'r', encoding='utf-8') as f:
-                lines = [line.strip() for line in f if line.strip()]
-
-            if not lines:
+            # 逐行读取输入文件，读到第一行即可开始处理
+            prompts = _iter_prompts(input_file)
+            first = next(prompts, None)
+            if first is None:
                 self.console.print("⚠️ 输入文件为空", style="yellow")
                 return
+            prompts = itertools.chain([first], prompts)
 
-            results = []
-
-            # 处理每一行
-            for i, line in enumerate(lines, 1):
-                self.console.print(f"📝 处理第 {i} 行: {line}")
+            total = success = 0
 
-                try:
-                    with self.console.status("🤖 处理中...", spinner="dots"):
-                        response = self.react_agent.process_query(line)
-
-                    results.append({
-                        "input": line,
-                        "output": response,
-                        "success": True
-                    })
-
-                    self.console.print(f"✅ 完成: {response[:100]}...", style="green")
-
-                except Exception as e:
-                    results.append({
-                        "input": line,
-                        "output": f"错误: {str(e)}",
-                        "success": False
-                    })
-                    self.console.print(f"❌ 失败: {str(e)}", style="red")
-
-            # 保存结果
-            if output_file:
-                import json
+            if jsonl and output_file:
                 with open(output_file, 'w', encoding='utf-8') as f:
-                    json.dump(results, f, ensure_ascii=False, indent=2)
+                    for i, record in self._iter_batch_results(prompts):
+                        f.write(json.dumps({"line": i, **record}, ensure_ascii=False) + "\n")
+                        f.flush()
+                        total += 1
+                        success += record["success"]
                 self.console.print(f"💾 结果已保存到: {output_file}", style="green")
+            else:
+                results: Dict[int, dict] = {}
+                for i, record in self._iter_batch_results(prompts):
+                    results[i] = record
+                    total += 1
+                    success += record["success"]
+
+                # 保存结果（按输入顺序）
+                if output_file:
+                    with open(output_file, 'w', encoding='utf-8') as f:
+                        json.dump([results[i] for i in sorted(results)], f, ensure_ascii=False, indent=2)
+                    self.console.print(f"💾 结果已保存到: {output_file}", style="green")
 
             # 显示统计
-            total = len(results)
-            success = sum(1 for r in results if r["success"])
             self.console.print(f"📊 处理完成: {total} 行，成功 {success} 行", style="blue")
 
         except Exception as e:
             self.console.print(f"❌ 批处理失败: {e}", style="red")
 
+    def _iter_batch_results(self, prompts: Iterable[str]) -> Iterator[Tuple[int, dict]]:
+        """
+        处理批处理输入，按完成顺序逐条产出 (行号, 结果)
+
+        每个查询主要耗时在 LLM API 往返上，按 config.batch_concurrency 并发执行。
+        ReActAgent 持有会话状态，不能跨线程共享，每个工作线程使用各自的 Agent。
+        输入按需读取，同时在途的查询不超过并发数的两倍，内存占用与输入文件大小无关。
+        """
+        concurrency = max(self.config.batch_concurrency, 1)
+
+        if concurrency == 1:
+            for i, line in enumerate(prompts, 1):
+                self.console.print(f"📝 处理第 {i} 行: {line}")
+                with self.console.status("🤖 处理中...", spinner="dots"):
+                    record = self._run_batch_query(self.react_agent, i, line)
+                yield i, record
+            return
+
+        from src.day3_core.react_agent import create_react_agent
+
+        local = threading.local()
+        # 各工作线程创建的 Agent，批处理结束后统一释放其工具执行线程
+        agents = []
+        # 工作线程读取同一份只读快照，批处理期间配置被修改也不会出现前后不一致的 Agent
+        config = self.config.freeze()
+
+        def process(i: int, line: str) -> dict:
+            agent = getattr(local, "agent", None)
+            if agent is None:
+                agent = local.agent = create_react_agent(
+                    agent_id=f"{config.agent_id or 'cli_assistant'}_batch",
+                    debug_mode=config.debug_mode,
+                    ai_provider=config.ai_provider,
+                    max_steps=config.max_steps
+                )
+                agents.append(agent)
+            return self._run_batch_query(agent, i, line)
+
+        self.console.print(f"⚡ 并发处理（并发数 {concurrency}）")
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                pending: Dict[Future, int] = {}
+                for i, line in enumerate(prompts, 1):
+                    if len(pending) >= concurrency * 2:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            yield pending.pop(future), future.result()
+                    pending[executor.submit(process, i, line)] = i
+
+                for future in as_completed(pending):
+                    yield pending[future], future.result()
+        finally:
+            for agent in agents:
+                agent.close()
+
+    def _run_batch_query(self, agent, i: int, line: str) -> dict:
+        """执行单条批处理查询，失败时记录错误而不中断整个批处理"""
+        try:
+            response = agent.process_query(line)
+            self.console.print(f"✅ 第 {i} 行完成: {response[:100]}...", style="green")
+            return {
+                "input": line,
+                "output": response,
+                "success": True
+            }
+        except Exception as e:
+            self.console.print(f"❌ 第 {i} 行失败: {str(e)}", style="red")
+            return {
+                "input": line,
+                "output": f"错误: {str(e)}",
+                "success": False
+            }
+
     def _cleanup(self):
         """清理资源"""
         try:
+            # 停止查询线程，不再执行排队中的查询；
+            # 同时移除缓存的线程池，应用实例被再次运行时重新创建
+            executor = self.__dict__.pop("_query_executor", None)
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+            # 停止 Agent 的工具执行线程
+            self.react_agent.close()
+
             # 保存配置
             self.config.save_to_file()
 
             # 保存聊天会话
             if self.chat_manager:
-                # 聊天管理器会自动保存
-                pass
+                # 写入延迟保存中的会话
+                self.chat_manager.flush_saves()
 
             self.console.print("🧹 资源清理完成", style="green")
 
@@ -184,6 +288,22 @@ class AssistantApp:
             self.console.print(f"⚠️ 清理资源时出错: {e}", style="yellow")
 
 
+# 按 Agent 相关配置缓存的应用实例，同一进程内多次调用子命令时不重复创建 Agent
+_APP_CACHE: Dict[Tuple[Optional[str], str, int, bool], AssistantApp] = {}
+
+
+def _get_app(config: CLIConfig) -> AssistantApp:
+    """获取（必要时创建）与配置对应的应用实例"""
+    key = (config.agent_id, config.ai_provider, config.max_steps, config.debug_mode)
+    assistant = _APP_CACHE.get(key)
+    if assistant is None:
+        assistant = _APP_CACHE[key] = AssistantApp(config)
+    else:
+        # 复用 Agent，但其余配置（显示选项、批处理并发数、退出时保存的配置）以本次为准
+        assistant.config = config
+    return assistant
+
+
 # 创建 Typer 应用
 app = typer.Typer(
     name="ai-assistant",
@@ -198,6 +318,7 @@ def run(
     config_file: Optional[str] = typer.Option(None, "--config", "-c", help="配置文件路径"),
     batch_file: Optional[str] = typer.Option(None, "--batch", "-b", help="批处理输入文件"),
     output_file: Optional[str] = typer.Option(None, "--output", "-o", help="批处理输出文件"),
+    jsonl: bool = typer.Option(False, "--jsonl", help="批处理结果逐条写出为 JSON Lines"),
 ):
     """运行 AI 助手应用"""
 
@@ -213,11 +334,11 @@ def run(
             config.debug_mode = True
 
         # 创建应用实例
-        assistant = AssistantApp(config)
+        assistant = _get_app(config)
 
         if batch_file:
             # 批处理模式
-            assistant.run_batch_mode(batch_file, output_file)
+            assistant.run_batch_mode(batch_file, output_file, jsonl=jsonl)
         else:
             # 交互模式
             assistant.run_interactive_mode()
@@ -311,7 +432,7 @@ def demo():
 
     try:
         # 创建临时应用实例
-        app = AssistantApp()
+        app = _get_app(get_config())
 
         # 演示对话
         demo_queries = [
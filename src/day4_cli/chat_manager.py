@@ -4,32 +4,122 @@
 管理聊天会话、历史记录和消息存储。
 """
 
+import atexit
+import itertools
 import json
-import uuid
+import os
+import queue
+import random
+import re
+import threading
+import weakref
+from bisect import bisect_left, insort
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from pathlib import Path
-from pydantic import BaseModel, Field
-from rich.console import Console
+from rich.console import Console, Group
 from rich.table import Table
 from rich.panel import Panel
+from rich.text import Text
 
 from .config import get_config
+from ..console import console
 
+# JSON 编解码：优先使用 orjson（C 实现，直接输出 UTF-8 并原生支持 datetime），
+# 未安装时回退到标准库，两种实现写出的文件格式一致
+try:
+    import orjson
 
-class ChatMessage(BaseModel):
-    """聊天消息"""
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    timestamp: datetime = Field(default_factory=datetime.now)
+    def _json_dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+    def _json_loads(data: bytes) -> Any:
+        return orjson.loads(data)
+except ImportError:
+    def _json_default(obj: Any) -> Any:
+        if isinstance(obj, datetime):
+            return obj.isoformat()
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"),
+                          default=_json_default).encode("utf-8")
+
+    def _json_loads(data: bytes) -> Any:
+        return json.loads(data)
+
+
+# 启动时并发读取会话文件的线程数上限
+_LOAD_WORKERS = 8
+
+# 会话修改后延迟保存的时间窗口（秒），窗口内的多次修改合并为一次写入
+SAVE_DEBOUNCE_SECONDS = 0.25
+
+# 问候、致谢、确认等低信息量消息：只保留在内存中供当前对话使用，不写入磁盘
+_LOW_SIGNAL = re.compile(r"^\s*(hi|hello|你好|谢谢|thanks|ok|好的)\s*[.!?。！？]?\s*$", re.IGNORECASE)
+
+# 与上一条消息角色和内容完全相同的短消息（如重复输出的错误或工具结果）不再追加
+_DEDUP_MAX_CHARS = 200
+
+# 会话/消息 ID：用系统熵初始化一次的随机数生成器产生 128 位随机数，
+# 比每次 uuid.uuid4() 少一次 os.urandom 调用和 UUID 对象构造
+_id_bits = random.Random(os.urandom(16)).getrandbits
+
+
+def _new_id() -> str:
+    """生成 32 位十六进制随机 ID"""
+    return f"{_id_bits(128):032x}"
+
+
+# 消息 ID：进程级 64 位随机前缀 + 64 位递增序号，生成时不再消耗随机数。
+# 会话 ID 仍然完全随机，因为 /switch、/delete 按 ID 前缀查找会话，需要前缀互不相同
+_message_seq = itertools.count()
+_message_id_prefix = f"{_id_bits(64):016x}"
+
+
+def _reseed_ids():
+    """fork 出的子进程重新播种随机数生成器并换用新的消息前缀和序号，避免与父进程生成重复的 ID"""
+    global _id_bits, _message_seq, _message_id_prefix
+    _id_bits = random.Random(os.urandom(16)).getrandbits
+    _message_seq = itertools.count()
+    _message_id_prefix = f"{_id_bits(64):016x}"
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reseed_ids)
+
+
+def _new_message_id() -> str:
+    """生成 32 位十六进制消息 ID（同一进程内按创建顺序递增）"""
+    return f"{_message_id_prefix}{next(_message_seq):016x}"
+
+
+@dataclass(slots=True, kw_only=True)
+class ChatMessage:
+    """聊天消息（slots 数据类，创建时不经过 Pydantic 校验）"""
     role: str  # "user" or "assistant"
     content: str
-    metadata: Dict[str, Any] = Field(default_factory=dict)
+    id: str = field(default_factory=_new_message_id)
+    timestamp: datetime = field(default_factory=datetime.now)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    # False 表示只保留在内存中（问候、致谢等低信息量消息），不写入消息日志
+    persist: bool = field(default=True, repr=False, compare=False)
+    _ts_hms: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def time_hms(self) -> str:
+        """消息时间的 HH:MM:SS 形式（首次访问时格式化并缓存，重绘历史时不再重复 strftime）"""
+        if self._ts_hms is None:
+            self._ts_hms = self.timestamp.strftime("%H:%M:%S")
+        return self._ts_hms
 
     def to_dict(self) -> Dict[str, Any]:
-        """转换为字典"""
+        """转换为字典（时间保留为 datetime，由 JSON 编码器直接序列化）"""
         return {
             "id": self.id,
-            "timestamp": self.timestamp.isoformat(),
+            "timestamp": self.timestamp,
             "role": self.role,
             "content": self.content,
             "metadata": self.metadata
@@ -44,21 +134,56 @@ class ChatMessage(BaseModel):
         return cls(**data)
 
 
-class ChatSession(BaseModel):
+@dataclass(slots=True, kw_only=True)
+class ChatSession:
     """聊天会话"""
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
-    created_at: datetime = Field(default_factory=datetime.now)
-    updated_at: datetime = Field(default_factory=datetime.now)
-    messages: List[ChatMessage] = Field(default_factory=list)
-    metadata: Dict[str, Any] = Field(default_factory=dict)
-
-    def add_message(self, role: str, content: str, metadata: Optional[Dict[str, Any]] = None):
-        """添加消息"""
+    id: str = field(default_factory=_new_id)
+    created_at: datetime = field(default_factory=datetime.now)
+    updated_at: datetime = field(default_factory=datetime.now)
+    messages: List[ChatMessage] = field(default_factory=list)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    # 持久化状态（仅由后台写入线程维护）：已写入消息日志的消息数，
+    # 以及消息日志对应的清空代数；clear_messages 会递增代数，强制下次重写日志
+    _persisted_count: int = field(default=0, init=False, repr=False, compare=False)
+    # 消息日志中的行数（不写入日志的消息不计入），写入会话头的 message_count
+    _journal_lines: int = field(default=0, init=False, repr=False, compare=False)
+    _generation: int = field(default=0, init=False, repr=False, compare=False)
+    _persisted_generation: int = field(default=-1, init=False, repr=False, compare=False)
+    # 延迟加载：从磁盘加载时只读会话头，消息在首次访问时才从消息日志解析
+    _journal_file: Optional[Path] = field(default=None, init=False, repr=False, compare=False)
+    _stored_count: int = field(default=0, init=False, repr=False, compare=False)
+
+    @property
+    def message_count(self) -> int:
+        """消息数（消息尚未加载时取会话头中记录的数量）"""
+        if self._journal_file is not None:
+            return self._stored_count
+        return len(self.messages)
+
+    def ensure_loaded(self):
+        """按需从消息日志加载消息"""
+        journal_file = self._journal_file
+        if journal_file is None:
+            return
+        self.messages = _read_journal(journal_file)
+        self._persisted_count = self._journal_lines = len(self.messages)
+        self._journal_file = None
+
+    def add_message(self, role: str, content: str, metadata: Optional[Dict[str, Any]] = None,
+                    persist: bool = True):
+        """添加消息（与上一条完全相同的短消息不重复追加，直接返回上一条）"""
+        self.ensure_loaded()
+        if self.messages and len(content) < _DEDUP_MAX_CHARS:
+            last = self.messages[-1]
+            if last.content == content and last.role == role:
+                return last
         message = ChatMessage(
             role=role,
             content=content,
-            metadata=metadata or {}
+            metadata=metadata or {},
+            persist=persist
         )
         self.messages.append(message)
         self.updated_at = datetime.now()
@@ -66,23 +191,29 @@ class ChatSession(BaseModel):
 
     def get_last_messages(self, count: int = 10) -> List[ChatMessage]:
         """获取最后几条消息"""
+        self.ensure_loaded()
         return self.messages[-count:] if self.messages else []
 
     def clear_messages(self):
         """清空消息"""
+        self._journal_file = None
         self.messages = []
+        self._generation += 1
         self.updated_at = datetime.now()
 
-    def to_dict(self) -> Dict[str, Any]:
-        """转换为字典"""
-        return {
+    def to_dict(self, with_messages: bool = True) -> Dict[str, Any]:
+        """转换为字典（时间保留为 datetime，由 JSON 编码器直接序列化）"""
+        data = {
             "id": self.id,
             "name": self.name,
-            "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat(),
-            "messages": [msg.to_dict() for msg in self.messages],
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
             "metadata": self.metadata
         }
+        if with_messages:
+            self.ensure_loaded()
+            data["messages"] = [msg.to_dict() for msg in self.messages]
+        return data
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "ChatSession":
@@ -100,14 +231,210 @@ class ChatSession(BaseModel):
         return cls(**data)
 
 
+def _journal_path(session_file: Path) -> Path:
+    """会话对应的消息日志文件（{session_id}.log）"""
+    return session_file.with_suffix(".log")
+
+
+def _write_atomic(path: Path, data: bytes):
+    """先写临时文件再用 os.replace 原子替换，中途失败不会损坏已有文件"""
+    tmp_file = path.with_name(path.name + ".tmp")
+    tmp_file.write_bytes(data)
+    os.replace(tmp_file, path)
+
+
+def _read_journal(journal_file: Path) -> List[ChatMessage]:
+    """解析消息日志（每行一条 JSON 消息）"""
+    try:
+        lines = journal_file.read_bytes().splitlines()
+    except FileNotFoundError:
+        return []
+
+    messages = []
+    for line in lines:
+        try:
+            messages.append(ChatMessage.from_dict(_json_loads(line)))
+        except Exception:
+            # 最后一行可能在写入中途被打断，跳过不完整的记录
+            continue
+    return messages
+
+
+def _persist_session(session_file: Path, session: ChatSession):
+    """
+    持久化会话
+
+    会话头（不含消息，附带消息数）写入 {id}.json，消息以 NDJSON 写入 {id}.log。
+    新增消息只追加新行，单条消息的写入量与会话长度无关；
+    新会话、清空后或从旧格式迁移时才整体重写消息日志。
+    """
+    # 先读代数再取消息：期间发生的清空会在下一次写入时被发现
+    generation = session._generation
+    messages = session.messages
+    end = len(messages)
+    journal_file = _journal_path(session_file)
+
+    if generation != session._persisted_generation:
+        lines = [_json_dumps(msg.to_dict()) + b"\n" for msg in messages[:end] if msg.persist]
+        _write_atomic(journal_file, b"".join(lines))
+        session._persisted_generation = generation
+        session._journal_lines = len(lines)
+    elif end > session._persisted_count:
+        lines = [
+            _json_dumps(msg.to_dict()) + b"\n"
+            for msg in messages[session._persisted_count:end] if msg.persist
+        ]
+        if lines:
+            with open(journal_file, "ab") as f:
+                f.write(b"".join(lines))
+            session._journal_lines += len(lines)
+    session._persisted_count = end
+
+    # 会话头只供程序读取，不缩进
+    header = session.to_dict(with_messages=False)
+    header["message_count"] = session._journal_lines
+    _write_atomic(session_file, _json_dumps(header) + b"\n")
+
+
+def _load_session(session_file: Path) -> ChatSession:
+    """读取会话头；消息留到首次访问时再从消息日志加载"""
+    data = _json_loads(session_file.read_bytes())
+    journal_file = _journal_path(session_file)
+
+    if "messages" not in data:
+        stored_count = data.pop("message_count", 0)
+        session = ChatSession.from_dict(data)
+        session._journal_file = journal_file
+        session._stored_count = session._journal_lines = stored_count
+        session._persisted_generation = session._generation
+        return session
+
+    # 旧格式：快照内含全部消息，日志（若存在）是快照之后追加的消息，按消息 ID 去重；
+    # 保留 _persisted_generation 的初始值，下次保存时整体迁移为新格式
+    session = ChatSession.from_dict(data)
+    seen = {msg.id for msg in session.messages}
+    for message in _read_journal(journal_file):
+        if message.id in seen:
+            continue
+        seen.add(message.id)
+        session.messages.append(message)
+        if message.timestamp > session.updated_at:
+            session.updated_at = message.timestamp
+    return session
+
+
+class _SessionWriter:
+    """
+    后台会话写入线程
+
+    保存会话只负责入队，序列化和写盘在后台线程完成，不阻塞交互输入；
+    同一会话文件的连续写入会被合并，只写最新的状态（见 _persist_session）。
+    队列使用 queue.SimpleQueue，flush 通过入队一个 Event 等待它之前的写入完成。
+    """
+
+    def __init__(self):
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="chat-session-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, session_file: Path, session: "ChatSession"):
+        """提交写入任务"""
+        self._queue.put((session_file, session))
+
+    def flush(self):
+        """阻塞直到所有已提交的写入完成"""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+
+            # 合并队列中已积压的写入
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            pending: Dict[Path, ChatSession] = {}
+            waiters: List[threading.Event] = []
+            for item in items:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    session_file, session = item
+                    pending[session_file] = session
+
+            for session_file, session in pending.items():
+                try:
+                    _persist_session(session_file, session)
+                except Exception as e:
+                    console.print(f"❌ 会话保存失败: {session_file}: {str(e)}", style="red")
+
+            for done in waiters:
+                done.set()
+
+
+_session_writer: Optional[_SessionWriter] = None
+_session_writer_lock = threading.Lock()
+
+
+def _get_session_writer() -> _SessionWriter:
+    """获取全局会话写入线程（懒加载）"""
+    global _session_writer
+    with _session_writer_lock:
+        if _session_writer is None:
+            _session_writer = _SessionWriter()
+        return _session_writer
+
+
+# 进程中存活的聊天管理器，退出前统一写入它们待保存的会话
+_live_managers: "weakref.WeakSet[ChatManager]" = weakref.WeakSet()
+
+
+def _flush_all_managers():
+    """写入所有聊天管理器中待保存的会话，并等待写入完成"""
+    for manager in list(_live_managers):
+        manager.flush_saves()
+    if _session_writer is not None:
+        _session_writer.flush()
+
+
+def _flush_at_exit():
+    """进程退出前写入所有待保存的会话（此时已不能启动新线程，待保存的会话直接在当前线程写入）"""
+    if _session_writer is not None:
+        _session_writer.flush()
+    for manager in list(_live_managers):
+        manager._flush_dirty(inline=True)
+
+
+atexit.register(_flush_at_exit)
+
+
 class ChatManager:
     """聊天管理器"""
 
     def __init__(self):
         self.config = get_config()
-        self.console = Console()
+        self.console = console
         self.sessions: Dict[str, ChatSession] = {}
-        self.current_session_id: Optional[str] = None
+        # 会话 ID 按最近更新时间从旧到新排列（dict 保持插入顺序，更新时移到末尾）
+        self._recent: Dict[str, None] = {}
+        # 会话查找索引：排序的会话 ID（按前缀二分查找）和名称到 ID 的映射
+        self._sorted_ids: List[str] = []
+        self._ids_by_name: Dict[str, str] = {}
+        # 所有会话的消息总数，随消息增删增量维护，统计时无需遍历全部会话
+        self._total_messages = 0
+        # 当前会话对象的直接引用，避免每次按 ID 查表
+        self._current_session: Optional[ChatSession] = None
+
+        # 待保存的会话，由定时器在 SAVE_DEBOUNCE_SECONDS 后统一提交给写入线程
+        self._dirty: Dict[str, ChatSession] = {}
+        self._dirty_lock = threading.Lock()
+        self._flush_timer: Optional[threading.Timer] = None
+        _live_managers.add(self)
 
         # 确保会话目录存在
         self.sessions_dir = self.config.sessions_dir_path
@@ -118,14 +445,30 @@ class ChatManager:
 
     def _load_sessions(self):
         """加载现有会话"""
-        for session_file in self.sessions_dir.glob("*.json"):
-            try:
-                with open(session_file, 'r', encoding='utf-8') as f:
-                    session_data = json.load(f)
-                session = ChatSession.from_dict(session_data)
-                self.sessions[session.id] = session
-            except Exception as e:
-                self.console.print(f"⚠️ 加载会话失败 {session_file}: {e}", style="yellow")
+        # 等待本进程中尚未落盘的会话写入，保证读到最新内容
+        _flush_all_managers()
+
+        session_files = list(self.sessions_dir.glob("*.json"))
+        if not session_files:
+            return
+
+        # 多个会话文件并发读取，磁盘读等待可以相互重叠；结果按文件顺序收集
+        with ThreadPoolExecutor(max_workers=min(_LOAD_WORKERS, len(session_files))) as pool:
+            futures = [(session_file, pool.submit(_load_session, session_file))
+                       for session_file in session_files]
+            for session_file, future in futures:
+                try:
+                    session = future.result()
+                    self.sessions[session.id] = session
+                except Exception as e:
+                    self.console.print(f"⚠️ 加载会话失败 {session_file}: {e}", style="yellow")
+
+        for session in sorted(self.sessions.values(), key=lambda s: s.updated_at):
+            self._recent[session.id] = None
+        self._sorted_ids = sorted(self.sessions)
+        for session in self.sessions.values():
+            self._ids_by_name.setdefault(session.name, session.id)
+            self._total_messages += session.message_count
 
         if self.sessions:
             self.console.print(f"📚 已加载 {len(self.sessions)} 个历史会话", style="green")
@@ -139,26 +482,43 @@ class ChatManager:
 
         session = ChatSession(name=name)
         self.sessions[session.id] = session
-        self.current_session_id = session.id
+        self._touch(session.id)
+        insort(self._sorted_ids, session.id)
+        self._ids_by_name.setdefault(name, session.id)
+        self._current_session = session
 
         # 保存会话
-        self._save_session(session)
+        self._mark_dirty(session)
 
         self.console.print(f"✅ 创建新会话: {name}", style="green")
         return session
 
+    @property
+    def current_session_id(self) -> Optional[str]:
+        """当前会话 ID"""
+        session = self._current_session
+        return session.id if session is not None else None
+
+    @current_session_id.setter
+    def current_session_id(self, session_id: Optional[str]):
+        self._current_session = self.sessions.get(session_id) if session_id is not None else None
+
     def get_current_session(self) -> Optional[ChatSession]:
         """获取当前会话"""
-        if self.current_session_id is None:
+        if self._current_session is None:
             # 如果没有当前会话，创建一个
             self.create_session()
-        return self.sessions.get(self.current_session_id)
+        return self._current_session
 
     def switch_session(self, session_id: str) -> bool:
         """切换会话"""
         if session_id in self.sessions:
-            self.current_session_id = session_id
             session = self.sessions[session_id]
+            # 离开当前会话时不再等定时器，把待保存的会话直接交给写入线程
+            self._flush_dirty()
+            self._current_session = session
+            # 切换到的会话即将被读写，此时再加载它的消息
+            session.ensure_loaded()
             self.console.print(f"🔄 切换到会话: {session.name}", style="blue")
             return True
         else:
@@ -173,21 +533,24 @@ class ChatManager:
 
         session = self.sessions[session_id]
 
-        # 删除文件
+        # 删除文件（先等待排队中的写入，避免删除后又被写回）
+        self.flush_saves()
         session_file = self.sessions_dir / f"{session_id}.json"
-        if session_file.exists():
-            session_file.unlink()
+        session_file.unlink(missing_ok=True)
+        _journal_path(session_file).unlink(missing_ok=True)
 
         # 从内存中删除
         del self.sessions[session_id]
+        self._recent.pop(session_id, None)
+        self._total_messages -= session.message_count
+        self._unindex_session(session)
 
         # 如果删除的是当前会话，切换到其他会话
-        if self.current_session_id == session_id:
-            self.current_session_id = None
+        if self._current_session is session:
+            self._current_session = None
             if self.sessions:
                 # 切换到第一个会话
-                first_session_id = next(iter(self.sessions))
-                self.current_session_id = first_session_id
+                self._current_session = next(iter(self.sessions.values()))
 
         self.console.print(f"🗑️ 删除会话: {session.name}", style="yellow")
         return True
@@ -196,20 +559,47 @@ class ChatManager:
         """添加用户消息"""
         session = self.get_current_session()
         if session:
-            message = session.add_message("user", content)
-            self._save_session(session)
-            return message
+            return self._append_message(session, "user", content)
         return None
 
     def add_assistant_message(self, content: str, metadata: Optional[Dict[str, Any]] = None) -> Optional[ChatMessage]:
         """添加助手消息"""
         session = self.get_current_session()
         if session:
-            message = session.add_message("assistant", content, metadata)
-            self._save_session(session)
-            return message
+            return self._append_message(session, "assistant", content, metadata)
         return None
 
+    def begin_assistant_stream(self) -> Tuple[Callable[[str], None], Callable[..., ChatMessage]]:
+        """
+        开始流式接收助手回复
+
+        返回 (append, finish)：每收到一段增量文本调用 append(chunk)，结束时调用一次
+        finish(metadata=None)，把所有片段一次性拼接成完整内容并保存为一条助手消息。
+        消息写入开始时的当前会话，期间切换会话不影响归属。
+        """
+        session = self.get_current_session()
+        parts: List[str] = []
+
+        def finish(metadata: Optional[Dict[str, Any]] = None) -> ChatMessage:
+            return self._append_message(session, "assistant", "".join(parts), metadata)
+
+        return parts.append, finish
+
+    def _append_message(self, session: ChatSession, role: str, content: str,
+                        metadata: Optional[Dict[str, Any]] = None) -> ChatMessage:
+        """向会话追加消息并标记待保存（低信息量消息只保留在内存中，不触发保存）"""
+        count = session.message_count
+        message = session.add_message(role, content, metadata,
+                                      persist=_LOW_SIGNAL.match(content) is None)
+        if session.message_count == count:
+            # 与上一条消息重复，会话没有变化
+            return message
+        self._total_messages += 1
+        self._touch(session.id)
+        if message.persist:
+            self._mark_dirty(session)
+        return message
+
     def get_session_history(self, session_id: Optional[str] = None, count: int = 10) -> List[ChatMessage]:
         """获取会话历史"""
         if session_id is None:
@@ -222,8 +612,44 @@ class ChatManager:
         return []
 
     def list_sessions(self) -> List[ChatSession]:
-        """列出所有会话"""
-        return sorted(self.sessions.values(), key=lambda s: s.updated_at, reverse=True)
+        """列出所有会话（最近更新的在前，顺序随更新维护，无需每次排序）"""
+        return [self.sessions[session_id] for session_id in reversed(self._recent)]
+
+    def find_session(self, target: str) -> Optional[ChatSession]:
+        """
+        按 ID 前缀或名称查找会话
+
+        ID 前缀唯一时直接命中，否则按名称精确匹配；
+        前缀匹配多个会话且没有同名会话时，返回 ID 最小的那个。
+        """
+        ids = self._sorted_ids
+        index = bisect_left(ids, target)
+        if index < len(ids) and ids[index].startswith(target):
+            unique = index + 1 == len(ids) or not ids[index + 1].startswith(target)
+            if unique or target not in self._ids_by_name:
+                return self.sessions[ids[index]]
+
+        session_id = self._ids_by_name.get(target)
+        return self.sessions[session_id] if session_id is not None else None
+
+    def _unindex_session(self, session: ChatSession):
+        """从查找索引中移除会话"""
+        index = bisect_left(self._sorted_ids, session.id)
+        if index < len(self._sorted_ids) and self._sorted_ids[index] == session.id:
+            del self._sorted_ids[index]
+
+        if self._ids_by_name.get(session.name) == session.id:
+            del self._ids_by_name[session.name]
+            # 还有同名会话时，名称改为指向其中最早的一个
+            for other in self.sessions.values():
+                if other.name == session.name:
+                    self._ids_by_name[session.name] = other.id
+                    break
+
+    def _touch(self, session_id: str):
+        """把会话移到最近更新顺序的末尾"""
+        self._recent.pop(session_id, None)
+        self._recent[session_id] = None
 
     def display_sessions(self):
         """显示所有会话"""
@@ -240,12 +666,13 @@ class ChatManager:
         table.add_column("创建时间", style="blue")
         table.add_column("当前", style="yellow", justify="center")
 
+        current_session = self._current_session
         for session in sessions:
-            is_current = "✅" if session.id == self.current_session_id else "❌"
+            is_current = "✅" if session is current_session else "❌"
             table.add_row(
                 session.id[:8],
                 session.name,
-                str(len(session.messages)),
+                str(session.message_count),
                 session.created_at.strftime("%Y-%m-%d %H:%M"),
                 is_current
             )
@@ -260,17 +687,20 @@ class ChatManager:
             self.console.print("📝 暂无消息历史", style="yellow")
             return
 
+        # 整段历史组合成一个 Group 一次性输出，只经过一次渲染和终端写入
+        lines = []
         session = self.get_current_session()
         if session:
-            self.console.print(f"💬 会话: {session.name}", style="bold blue")
-            self.console.print("=" * 60, style="blue")
+            lines.append(Text(f"💬 会话: {session.name}", style="bold blue"))
+            lines.append(Text("=" * 60, style="blue"))
 
         for message in messages:
-            timestamp = message.timestamp.strftime("%H:%M:%S")
             if message.role == "user":
-                self.console.print(f"[{timestamp}] 👤 用户: {message.content}", style="green")
+                lines.append(Text(f"[{message.time_hms}] 👤 用户: {message.content}", style="green"))
             else:
-                self.console.print(f"[{timestamp}] 🤖 助手: {message.content}", style="cyan")
+                lines.append(Text(f"[{message.time_hms}] 🤖 助手: {message.content}", style="cyan"))
+
+        self.console.print(Group(*lines))
 
     def export_session(self, session_id: Optional[str] = None, file_path: Optional[str] = None) -> str:
         """导出会话"""
@@ -286,44 +716,77 @@ class ChatManager:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             file_path = f"chat_export_{timestamp}.json"
 
-        export_data = {
-            "session": session.to_dict(),
-            "exported_at": datetime.now().isoformat(),
-            "app_version": "1.0.0"
-        }
+        session.ensure_loaded()
+        header = _json_dumps(session.to_dict(with_messages=False))
+        footer = _json_dumps({"exported_at": datetime.now(), "app_version": "1.0.0"})
 
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(export_data, f, ensure_ascii=False, indent=2)
+        # 逐条编码消息直接写入文件，不在内存中拼出整个导出文档；每条消息占一行便于阅读
+        with open(file_path, "wb") as f:
+            f.write(b'{"session":' + header[:-1] + b',"messages":[')
+            for i, message in enumerate(session.messages):
+                f.write(b"\n" if i == 0 else b",\n")
+                f.write(_json_dumps(message.to_dict()))
+            f.write(b"\n]}," + footer[1:] + b"\n")
 
         self.console.print(f"📤 会话已导出到: {file_path}", style="green")
         return file_path
 
-    def _save_session(self, session: ChatSession):
-        """保存会话到文件"""
-        session_file = self.sessions_dir / f"{session.id}.json"
+    def _mark_dirty(self, session: ChatSession):
+        """标记会话待保存（延迟合并后由后台线程写入，调用 flush_saves 立即写入并等待完成）"""
+        with self._dirty_lock:
+            self._dirty[session.id] = session
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(SAVE_DEBOUNCE_SECONDS, self._flush_dirty)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def _flush_dirty(self, inline: bool = False):
+        """把所有待保存的会话提交给写入线程（inline=True 时直接在当前线程写入）"""
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, {}
+            timer, self._flush_timer = self._flush_timer, None
+        if timer is not None:
+            timer.cancel()
+
+        if not dirty:
+            return
+        if inline:
+            for session in dirty.values():
+                session_file = self.sessions_dir / f"{session.id}.json"
+                try:
+                    _persist_session(session_file, session)
+                except Exception as e:
+                    console.print(f"❌ 会话保存失败: {session_file}: {str(e)}", style="red")
+            return
 
-        with open(session_file, 'w', encoding='utf-8') as f:
-            json.dump(session.to_dict(), f, ensure_ascii=False, indent=2)
+        writer = _get_session_writer()
+        for session in dirty.values():
+            writer.submit(self.sessions_dir / f"{session.id}.json", session)
+
+    def flush_saves(self):
+        """立即写入待保存的会话，并等待所有异步会话写入完成"""
+        self._flush_dirty()
+        if _session_writer is not None:
+            _session_writer.flush()
 
     def clear_current_session(self):
         """清空当前会话"""
         session = self.get_current_session()
         if session:
+            self._total_messages -= session.message_count
             session.clear_messages()
-            self._save_session(session)
+            self._touch(session.id)
+            self._mark_dirty(session)
             self.console.print(f"🗑️ 已清空会话: {session.name}", style="yellow")
 
     def get_statistics(self) -> Dict[str, Any]:
         """获取统计信息"""
-        total_sessions = len(self.sessions)
-        total_messages = sum(len(session.messages) for session in self.sessions.values())
-
         current_session = self.get_current_session()
-        current_messages = len(current_session.messages) if current_session else 0
+        current_messages = current_session.message_count if current_session else 0
 
         return {
-            "total_sessions": total_sessions,
-            "total_messages": total_messages,
+            "total_sessions": len(self.sessions),
+            "total_messages": self._total_messages,
             "current_session_messages": current_messages,
             "current_session_name": current_session.name if current_session else None
         }
@@ -8,6 +8,8 @@ import sys
 import readline
 import threading
 import time
+from functools import partial
+from bisect import bisect_left
 from typing import Optional, Callable, Any
 from rich.console import Console
 from rich.panel import Panel
@@ -23,6 +25,15 @@ from rich.status import Status
 from .config import get_config
 from .commands import CommandRegistry
 from .chat_manager import ChatManager
+from ..console import console
+
+# 各类消息面板的固定样式，显示时只需传入内容（和动态标题）
+_USER_PANEL = partial(Panel, border_style="green", padding=(0, 1))
+_ASSISTANT_PANEL = partial(Panel, title="🤖 AI 助手", border_style="cyan", padding=(0, 1))
+_THINKING_PANEL = partial(Panel, title="🧠 思考过程", border_style="yellow", padding=(0, 1))
+_TOOL_PANEL = partial(Panel, title="🛠️ 工具执行", border_style="magenta", padding=(0, 1))
+_ERROR_PANEL = partial(Panel, title="❌ 错误", border_style="red", padding=(0, 1))
+_SUCCESS_PANEL = partial(Panel, title="✅ 成功", border_style="green", padding=(0, 1))
 
 
 class CLIInterface:
@@ -30,7 +41,7 @@ class CLIInterface:
 
     def __init__(self):
         self.config = get_config()
-        self.console = Console()
+        self.console = console
         self.command_registry = CommandRegistry()
         self.chat_manager = ChatManager()
         self.is_running = False
@@ -41,25 +52,25 @@ class CLIInterface:
 
     def _setup_readline(self):
         """设置 readline 自动补全"""
+        # 获取所有命令名用于补全，排序后按前缀二分查找
+        self._completion_words = [f"/{name}" for name in self.command_registry.complete("")]
+
         try:
-            # 获取所有命令名用于补全
-            commands = [f"/{cmd.name}" for cmd in self.command_registry.get_all_commands()]
-            commands.extend([f"/{alias}" for cmd in self.command_registry.get_all_commands() for alias in cmd.aliases])
-
-            def completer(text, state):
-                options = [cmd for cmd in commands if cmd.startswith(text)]
-                if state < len(options):
-                    return options[state]
-                else:
-                    return None
-
-            readline.set_completer(completer)
+            readline.set_completer(self._complete)
             readline.parse_and_bind("tab: complete")
             readline.set_completer_delims(' \t\n')
         except Exception:
             # 如果 readline 设置失败，忽略错误
             pass
 
+    def _complete(self, text: str, state: int) -> Optional[str]:
+        """readline 补全回调：返回第 state 个以 text 开头的命令"""
+        words = self._completion_words
+        index = bisect_left(words, text) + state
+        if index < len(words) and words[index].startswith(text):
+            return words[index]
+        return None
+
     def display_welcome(self):
         """显示欢迎信息"""
         config = self.config
@@ -104,28 +115,14 @@ class CLIInterface:
         session_name = session.name if session else "新会话"
 
         if self.config.colored_output:
-            # 创建用户消息面板
-            user_panel = Panel(
-                content,
-                title=f"👤 用户 ({session_name})",
-                border_style="green",
-                padding=(0, 1)
-            )
-            self.console.print(user_panel)
+            self.console.print(_USER_PANEL(content, title=f"👤 用户 ({session_name})"))
         else:
             self.console.print(f"👤 用户: {content}")
 
     def display_assistant_message(self, content: str, metadata: Optional[dict] = None):
         """显示助手消息"""
         if self.config.colored_output:
-            # 创建助手消息面板
-            assistant_panel = Panel(
-                content,
-                title="🤖 AI 助手",
-                border_style="cyan",
-                padding=(0, 1)
-            )
-            self.console.print(assistant_panel)
+            self.console.print(_ASSISTANT_PANEL(content))
         else:
             self.console.print(f"🤖 AI 助手: {content}")
 
@@ -152,13 +149,7 @@ class CLIInterface:
         """显示思考过程"""
         if self.config.show_thinking_process:
             if self.config.colored_output:
-                thinking_panel = Panel(
-                    text,
-                    title="🧠 思考过程",
-                    border_style="yellow",
-                    padding=(0, 1)
-                )
-                self.console.print(thinking_panel)
+                self.console.print(_THINKING_PANEL(text))
             else:
                 self.console.print(f"🧠 思考: {text}")
 
@@ -170,13 +161,7 @@ class CLIInterface:
         if self.config.colored_output:
             # 工具调用信息
             tool_info = f"🔧 工具: {tool_name}\n📥 参数: {parameters}\n📤 结果: {result}"
-            tool_panel = Panel(
-                tool_info,
-                title=f"🛠️ 工具执行",
-                border_style="magenta",
-                padding=(0, 1)
-            )
-            self.console.print(tool_panel)
+            self.console.print(_TOOL_PANEL(tool_info))
         else:
             self.console.print(f"🔧 调用工具 {tool_name}: {parameters} -> {result}")
 
@@ -187,13 +172,7 @@ class CLIInterface:
             if details:
                 error_content += f"\n\n详细信息: {details}"
 
-            error_panel = Panel(
-                error_content,
-                title="❌ 错误",
-                border_style="red",
-                padding=(0, 1)
-            )
-            self.console.print(error_panel)
+            self.console.print(_ERROR_PANEL(error_content))
         else:
             self.console.print(f"❌ 错误: {error}")
             if details:
@@ -202,13 +181,7 @@ class CLIInterface:
     def display_success(self, message: str):
         """显示成功信息"""
         if self.config.colored_output:
-            success_panel = Panel(
-                message,
-                title="✅ 成功",
-                border_style="green",
-                padding=(0, 1)
-            )
-            self.console.print(success_panel)
+            self.console.print(_SUCCESS_PANEL(message))
         else:
             self.console.print(f"✅ {message}")
 
@@ -250,7 +223,7 @@ class CLIInterface:
         info_table.add_column("值", style="white")
 
         info_table.add_row("会话名称", session.name)
-        info_table.add_row("消息数量", str(len(session.messages)))
+        info_table.add_row("消息数量", str(session.message_count))
         info_table.add_row("创建时间", session.created_at.strftime("%Y-%m-%d %H:%M:%S"))
         info_table.add_row("最后更新", session.updated_at.strftime("%Y-%m-%d %H:%M:%S"))
         info_table.add_row("总会话数", str(stats["total_sessions"]))
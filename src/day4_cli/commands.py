@@ -6,14 +6,13 @@ CLI 命令处理系统
 
 import sys
 import argparse
-from typing import Dict, List, Callable, Optional, Any
-from rich.console import Console
-from rich.table import Table
-from rich.panel import Panel
-from rich.text import Text
-from rich.markdown import Markdown
-
-from .config import get_config
+from bisect import bisect_left, insort
+from typing import Dict, FrozenSet, List, Callable, NamedTuple, Optional, Any, Sequence, Tuple
+
+from ..console import console
+from .config import (
+    CONFIG_FIELDS, FALSE_VALUES, TRUE_VALUES, flush_config_save, get_config, schedule_config_save
+)
 from .chat_manager import ChatManager
 
 
@@ -28,22 +27,33 @@ class CommandResult:
         return self.success
 
 
+# 命令执行函数：(参数文本, 聊天管理器) -> 执行结果
+CommandHandler = Callable[[str, ChatManager], CommandResult]
+
+
+def first_arg(args: str) -> str:
+    """返回参数文本中的第一个参数（没有参数时返回空字符串）"""
+    return args.split(None, 1)[0] if args else ""
+
+
 class CLICommand:
-    """CLI 命令基类"""
-    def __init__(self, name: str, description: str, usage: str = "", examples: List[str] = None):
+    """CLI 命令：执行逻辑由 handler 提供，或由子类重写 execute"""
+    def __init__(self, name: str, description: str, usage: str = "", examples: List[str] = None,
+                 aliases: Sequence[str] = (), handler: Optional[CommandHandler] = None):
         self.name = name
         self.description = description
         self.usage = usage
         self.examples = examples or []
-        self.aliases: List[str] = []
-
-    def add_alias(self, alias: str):
-        """添加别名"""
-        self.aliases.append(alias)
+        self.aliases: FrozenSet[str] = frozenset(aliases)
+        # 帮助信息中展示的别名文本，构造时拼接一次
+        self._aliases_display = ", ".join(sorted(self.aliases))
+        self._handler = handler
 
-    def execute(self, args: List[str], chat_manager: ChatManager) -> CommandResult:
-        """执行命令（子类实现）"""
-        raise NotImplementedError
+    def execute(self, args: str, chat_manager: ChatManager) -> CommandResult:
+        """执行命令"""
+        if self._handler is None:
+            raise NotImplementedError
+        return self._handler(args, chat_manager)
 
     def get_help(self) -> str:
         """获取帮助信息"""
@@ -51,7 +61,7 @@ class CLICommand:
         if self.usage:
             help_text += f"用法: {self.usage}\n"
         if self.aliases:
-            help_text += f"别名: {', '.join(self.aliases)}\n"
+            help_text += f"别名: {self._aliases_display}\n"
         if self.examples:
             help_text += "示例:\n"
             for example in self.examples:
@@ -73,14 +83,16 @@ class HelpCommand(CLICommand):
             ]
         )
         self.command_registry = command_registry
+        # (注册表版本, 命令表格)，注册表未变化时复用已构建的表格
+        self._table_cache: Optional[Tuple[int, Any]] = None
 
-    def execute(self, args: List[str], chat_manager: ChatManager) -> CommandResult:
+    def execute(self, args: str, chat_manager: ChatManager) -> CommandResult:
         if not args:
             # 显示所有命令列表
             return self._show_all_commands()
         else:
             # 显示特定命令的帮助
-            command_name = args[0].lstrip('/')
+            command_name = first_arg(args).lstrip('/')
             command = self.command_registry.get_command(command_name)
             if command:
                 return CommandResult(True, command.get_help())
@@ -89,380 +101,310 @@ class HelpCommand(CLICommand):
 
     def _show_all_commands(self) -> CommandResult:
         """显示所有命令"""
-        console = Console()
-        console.print("📚 可用命令列表:", style="bold blue")
-        console.print("=" * 60, style="blue")
-
-        table = Table()
-        table.add_column("命令", style="cyan", width=15)
-        table.add_column("描述", style="white", width=40)
-        table.add_column("别名", style="green", width=15)
-
-        commands = sorted(self.command_registry.commands.values(), key=lambda c: c.name)
-
-        for command in commands:
-            aliases = ", ".join(command.aliases) if command.aliases else "-"
-            table.add_row(f"/{command.name}", command.description, aliases)
-
-        console.print(table)
-        console.print("\n💡 使用 '/help <command_name>' 查看具体命令的详细帮助")
+        from rich.console import Group
+        from rich.table import Table  # 只有 /help 用到表格，推迟导入
+        from rich.text import Text
+
+        version = self.command_registry._version
+        if self._table_cache is None or self._table_cache[0] != version:
+            table = Table()
+            table.add_column("命令", style="cyan", width=15)
+            table.add_column("描述", style="white", width=40)
+            table.add_column("别名", style="green", width=15)
+
+            for command in self.command_registry.get_all_commands():
+                table.add_row(f"/{command.name}", command.description, command._aliases_display or "-")
+
+            self._table_cache = (version, table)
+        table = self._table_cache[1]
+
+        # 纯文本行用 Text 输出，不经过标记解析和高亮
+        console.print(Group(
+            Text("📚 可用命令列表:", style="bold blue"),
+            Text("=" * 60, style="blue"),
+            table,
+            Text("\n💡 使用 '/help <command_name>' 查看具体命令的详细帮助"),
+        ))
 
         return CommandResult(True)
 
 
-class NewCommand(CLICommand):
-    """新建会话命令"""
-    def __init__(self):
-        super().__init__(
-            name="new",
-            description="创建新的聊天会话",
-            usage="/new [session_name]",
-            examples=[
-                "/new",
-                "/new 工作助手",
-                "/new 学习笔记"
-            ]
-        )
-        self.add_alias("create")
-
-    def execute(self, args: List[str], chat_manager: ChatManager) -> CommandResult:
-        session_name = " ".join(args) if args else None
-        session = chat_manager.create_session(session_name)
-        return CommandResult(True, f"已创建新会话: {session.name}")
-
-
-class SwitchCommand(CLICommand):
-    """切换会话命令"""
-    def __init__(self):
-        super().__init__(
-            name="switch",
-            description="切换到指定的聊天会话",
-            usage="/switch <session_id|session_name>",
-            examples=[
-                "/switch 1",
-                "/switch 工作助手"
-            ]
-        )
-        self.add_alias("use")
+def _new_session(args: str, chat_manager: ChatManager) -> CommandResult:
+    """新建会话"""
+    session_name = " ".join(args.split()) if args else None
+    session = chat_manager.create_session(session_name)
+    return CommandResult(True, f"已创建新会话: {session.name}")
 
-    def execute(self, args: List[str], chat_manager: ChatManager) -> CommandResult:
-        if not args:
-            return CommandResult(False, "请指定会话ID或名称")
 
-        target = args[0]
+def _switch_session(args: str, chat_manager: ChatManager) -> CommandResult:
+    """切换会话"""
+    if not args:
+        return CommandResult(False, "请指定会话ID或名称")
 
-        # 尝试按ID查找
-        for session_id, session in chat_manager.sessions.items():
-            if session_id.startswith(target) or session.name == target:
-                if chat_manager.switch_session(session_id):
-                    return CommandResult(True, f"已切换到会话: {session.name}")
-                else:
-                    return CommandResult(False, "切换失败")
+    target = first_arg(args)
 
+    # 按ID前缀或名称查找
+    session = chat_manager.find_session(target)
+    if session is None:
         return CommandResult(False, f"找不到会话: {target}")
 
+    if chat_manager.switch_session(session.id):
+        return CommandResult(True, f"已切换到会话: {session.name}")
+    else:
+        return CommandResult(False, "切换失败")
 
-class ListCommand(CLICommand):
-    """列会话命令"""
-    def __init__(self):
-        super().__init__(
-            name="list",
-            description="列出所有聊天会话",
-            usage="/list",
-            examples=[
-                "/list",
-                "/sessions"
-            ]
-        )
-        self.add_alias("sessions")
 
-    def execute(self, args: List[str], chat_manager: ChatManager) -> CommandResult:
-        chat_manager.display_sessions()
-        return CommandResult(True)
+def _list_sessions(args: str, chat_manager: ChatManager) -> CommandResult:
+    """列出会话"""
+    chat_manager.display_sessions()
+    return CommandResult(True)
 
 
-class HistoryCommand(CLICommand):
-    """历史命令"""
-    def __init__(self):
-        super().__init__(
-            name="history",
-            description="显示聊天历史记录",
-            usage="/history [count]",
-            examples=[
-                "/history",
-                "/history 10",
-                "/history 50"
-            ]
-        )
-        self.add_alias("hist")
-
-    def execute(self, args: List[str], chat_manager: ChatManager) -> CommandResult:
-        try:
-            count = int(args[0]) if args else 20
-            count = min(max(count, 1), 100)  # 限制在1-100之间
-        except (ValueError, IndexError):
-            count = 20
-
-        chat_manager.display_session_history(count=count)
-        return CommandResult(True)
-
-
-class ClearCommand(CLICommand):
-    """清空命令"""
-    def __init__(self):
-        super().__init__(
-            name="clear",
-            description="清空当前会话的消息历史",
-            usage="/clear",
-            examples=[
-                "/clear",
-                "/cls"
-            ]
-        )
-        self.add_alias("cls")
+def _show_history(args: str, chat_manager: ChatManager) -> CommandResult:
+    """显示聊天历史"""
+    try:
+        count = int(first_arg(args)) if args else 20
+        count = min(max(count, 1), 100)  # 限制在1-100之间
+    except (ValueError, IndexError):
+        count = 20
 
-    def execute(self, args: List[str], chat_manager: ChatManager) -> CommandResult:
-        chat_manager.clear_current_session()
-        return CommandResult(True, "已清空当前会话")
+    chat_manager.display_session_history(count=count)
+    return CommandResult(True)
 
 
-class DeleteCommand(CLICommand):
-    """删除会话命令"""
-    def __init__(self):
-        super().__init__(
-            name="delete",
-            description="删除指定的聊天会话",
-            usage="/delete <session_id|session_name>",
-            examples=[
-                "/delete 1",
-                "/delete 旧的会话"
-            ]
-        )
-        self.add_alias("rm")
-        self.add_alias("del")
+def _clear_session(args: str, chat_manager: ChatManager) -> CommandResult:
+    """清空当前会话"""
+    chat_manager.clear_current_session()
+    return CommandResult(True, "已清空当前会话")
 
-    def execute(self, args: List[str], chat_manager: ChatManager) -> CommandResult:
-        if not args:
-            return CommandResult(False, "请指定要删除的会话ID或名称")
 
-        target = args[0]
+def _delete_session(args: str, chat_manager: ChatManager) -> CommandResult:
+    """删除会话"""
+    if not args:
+        return CommandResult(False, "请指定要删除的会话ID或名称")
 
-        # 尝试按ID查找
-        for session_id, session in chat_manager.sessions.items():
-            if session_id.startswith(target) or session.name == target:
-                if chat_manager.delete_session(session_id):
-                    return CommandResult(True, f"已删除会话: {session.name}")
-                else:
-                    return CommandResult(False, "删除失败")
+    target = first_arg(args)
 
+    # 按ID前缀或名称查找
+    session = chat_manager.find_session(target)
+    if session is None:
         return CommandResult(False, f"找不到会话: {target}")
 
+    if chat_manager.delete_session(session.id):
+        return CommandResult(True, f"已删除会话: {session.name}")
+    else:
+        return CommandResult(False, "删除失败")
 
-class ExportCommand(CLICommand):
-    """导出命令"""
-    def __init__(self):
-        super().__init__(
-            name="export",
-            description="导出当前会话到文件",
-            usage="/export [file_path]",
-            examples=[
-                "/export",
-                "/export chat_backup.json",
-                "/export /path/to/export.json"
-            ]
-        )
-        self.add_alias("save")
 
-    def execute(self, args: List[str], chat_manager: ChatManager) -> CommandResult:
-        try:
-            file_path = args[0] if args else None
-            export_path = chat_manager.export_session(file_path=file_path)
-            return CommandResult(True, f"会话已导出到: {export_path}")
-        except Exception as e:
-            return CommandResult(False, f"导出失败: {str(e)}")
+def _export_session(args: str, chat_manager: ChatManager) -> CommandResult:
+    """导出当前会话"""
+    try:
+        file_path = first_arg(args) or None
+        export_path = chat_manager.export_session(file_path=file_path)
+        return CommandResult(True, f"会话已导出到: {export_path}")
+    except Exception as e:
+        return CommandResult(False, f"导出失败: {str(e)}")
 
 
-class ConfigCommand(CLICommand):
-    """配置命令"""
-    def __init__(self):
-        super().__init__(
-            name="config",
-            description="查看或修改配置",
-            usage="/config [key] [value]",
-            examples=[
-                "/config",
-                "/config debug_mode",
-                "/config debug_mode true",
-                "/config max_steps 15"
-            ]
-        )
-        self.add_alias("cfg")
-        self.add_alias("settings")
-
-    def execute(self, args: List[str], chat_manager: ChatManager) -> CommandResult:
-        config = get_config()
-
-        if not args:
-            # 显示所有配置
-            config.display()
-            return CommandResult(True)
-
-        if len(args) == 1:
-            # 显示特定配置
-            key = args[0]
-            if hasattr(config, key):
-                value = getattr(config, key)
-                return CommandResult(True, f"{key}: {value}")
-            else:
-                return CommandResult(False, f"未知配置项: {key}")
-
-        if len(args) >= 2:
-            # 修改配置
-            key = args[0]
-            value = " ".join(args[1:])
-
-            if not hasattr(config, key):
-                return CommandResult(False, f"未知配置项: {key}")
-
-            # 类型转换
-            current_value = getattr(config, key)
-            if isinstance(current_value, bool):
-                if value.lower() in ('true', '1', 'yes', 'on'):
-                    value = True
-                elif value.lower() in ('false', '0', 'no', 'off'):
-                    value = False
-                else:
-                    return CommandResult(False, f"布尔值必须是 true/false, yes/no, on/off, 1/0")
-            elif isinstance(current_value, int):
-                try:
-                    value = int(value)
-                except ValueError:
-                    return CommandResult(False, f"整数值格式错误: {value}")
-            elif isinstance(current_value, float):
-                try:
-                    value = float(value)
-                except ValueError:
-                    return CommandResult(False, f"数值格式错误: {value}")
-
-            # 更新配置
-            setattr(config, key, value)
-            config.save_to_file()
-
-            return CommandResult(True, f"配置已更新: {key} = {value}")
-
-        return CommandResult(False, "参数错误")
-
-
-class StatsCommand(CLICommand):
-    """统计命令"""
-    def __init__(self):
-        super().__init__(
-            name="stats",
-            description="显示使用统计信息",
-            usage="/stats",
-            examples=[
-                "/stats",
-                "/statistics"
-            ]
-        )
-        self.add_alias("statistics")
-        self.add_alias("info")
-
-    def execute(self, args: List[str], chat_manager: ChatManager) -> CommandResult:
-        stats = chat_manager.get_statistics()
-        config = get_config()
-
-        console = Console()
-        console.print("📊 使用统计信息:", style="bold blue")
-        console.print("=" * 40, style="blue")
-        console.print(f"总会话数: {stats['total_sessions']}")
-        console.print(f"总消息数: {stats['total_messages']}")
-        console.print(f"当前会话: {stats['current_session_name'] or 'None'}")
-        console.print(f"当前消息数: {stats['current_session_messages']}")
-        console.print(f"调试模式: {'开启' if config.debug_mode else '关闭'}")
-        console.print(f"最大步数: {config.max_steps}")
+def _config(args: str, chat_manager: ChatManager) -> CommandResult:
+    """查看或修改配置"""
+    config = get_config()
 
+    if not args:
+        # 显示所有配置
+        config.display()
         return CommandResult(True)
 
-
-class QuitCommand(CLICommand):
-    """退出命令"""
-    def __init__(self):
-        super().__init__(
-            name="quit",
-            description="退出程序",
-            usage="/quit",
-            examples=[
-                "/quit",
-                "/exit",
-                "/q"
-            ]
-        )
-        self.add_alias("exit")
-        self.add_alias("q")
-
-    def execute(self, args: List[str], chat_manager: ChatManager) -> CommandResult:
-        console = Console()
-        console.print("👋 再见!", style="bold green")
-        sys.exit(0)
+    # 配置值取键名之后的原始文本，保留其中的空白
+    _, key, value = args.partition(first_arg(args))
+    value = value.strip()
+    if key == "save" and not value:
+        # 立即写入延迟保存的修改
+        flush_config_save()
+        return CommandResult(True, "配置已保存")
+    if not value:
+        # 显示特定配置
+        if key in CONFIG_FIELDS:
+            value = getattr(config, key)
+            return CommandResult(True, f"{key}: {value}")
+        else:
+            return CommandResult(False, f"未知配置项: {key}")
+
+    # 修改配置
+    if key not in CONFIG_FIELDS:
+        return CommandResult(False, f"未知配置项: {key}")
+
+    # 类型转换
+    current_value = getattr(config, key)
+    if isinstance(current_value, bool):
+        if value.lower() in TRUE_VALUES:
+            value = True
+        elif value.lower() in FALSE_VALUES:
+            value = False
+        else:
+            return CommandResult(False, f"布尔值必须是 true/false, yes/no, on/off, 1/0")
+    elif isinstance(current_value, int):
+        try:
+            value = int(value)
+        except ValueError:
+            return CommandResult(False, f"整数值格式错误: {value}")
+    elif isinstance(current_value, float):
+        try:
+            value = float(value)
+        except ValueError:
+            return CommandResult(False, f"数值格式错误: {value}")
+
+    # 更新配置
+    setattr(config, key, value)
+    schedule_config_save(config)
+
+    return CommandResult(True, f"配置已更新: {key} = {value}（稍后自动保存，/config save 立即保存）")
+
+
+def _show_stats(args: str, chat_manager: ChatManager) -> CommandResult:
+    """显示使用统计"""
+    stats = chat_manager.get_statistics()
+    config = get_config()
+
+    from rich.console import Group
+    from rich.text import Text
+
+    # 纯文本行用 Text 输出，不经过标记解析和高亮
+    console.print(Group(
+        Text("📊 使用统计信息:", style="bold blue"),
+        Text("=" * 40, style="blue"),
+        Text(f"总会话数: {stats['total_sessions']}"),
+        Text(f"总消息数: {stats['total_messages']}"),
+        Text(f"当前会话: {stats['current_session_name'] or 'None'}"),
+        Text(f"当前消息数: {stats['current_session_messages']}"),
+        Text(f"调试模式: {'开启' if config.debug_mode else '关闭'}"),
+        Text(f"最大步数: {config.max_steps}"),
+    ))
+
+    return CommandResult(True)
+
+
+def _quit(args: str, chat_manager: ChatManager) -> CommandResult:
+    """退出程序"""
+    console.print("👋 再见!", style="bold green")
+    sys.exit(0)
+
+
+class CommandSpec(NamedTuple):
+    """内置命令定义，字段顺序与 CLICommand 的构造参数一致"""
+    name: str
+    description: str
+    usage: str
+    examples: List[str]
+    aliases: Tuple[str, ...]
+    handler: CommandHandler
+
+
+# 内置命令表（help 需要访问注册器，单独由 HelpCommand 实现）
+_COMMAND_SPECS: Tuple[CommandSpec, ...] = (
+    CommandSpec("new", "创建新的聊天会话", "/new [session_name]",
+                ["/new", "/new 工作助手", "/new 学习笔记"],
+                ("create",), _new_session),
+    CommandSpec("switch", "切换到指定的聊天会话", "/switch <session_id|session_name>",
+                ["/switch 1", "/switch 工作助手"],
+                ("use",), _switch_session),
+    CommandSpec("list", "列出所有聊天会话", "/list",
+                ["/list", "/sessions"],
+                ("sessions",), _list_sessions),
+    CommandSpec("history", "显示聊天历史记录", "/history [count]",
+                ["/history", "/history 10", "/history 50"],
+                ("hist",), _show_history),
+    CommandSpec("clear", "清空当前会话的消息历史", "/clear",
+                ["/clear", "/cls"],
+                ("cls",), _clear_session),
+    CommandSpec("delete", "删除指定的聊天会话", "/delete <session_id|session_name>",
+                ["/delete 1", "/delete 旧的会话"],
+                ("rm", "del"), _delete_session),
+    CommandSpec("export", "导出当前会话到文件", "/export [file_path]",
+                ["/export", "/export chat_backup.json", "/export /path/to/export.json"],
+                ("save",), _export_session),
+    CommandSpec("config", "查看或修改配置", "/config [key] [value] | /config save",
+                ["/config", "/config debug_mode", "/config debug_mode true", "/config max_steps 15",
+                 "/config save"],
+                ("cfg", "settings"), _config),
+    CommandSpec("stats", "显示使用统计信息", "/stats",
+                ["/stats", "/statistics"],
+                ("statistics", "info"), _show_stats),
+    CommandSpec("quit", "退出程序", "/quit",
+                ["/quit", "/exit", "/q"],
+                ("exit", "q"), _quit),
+)
 
 
 class CommandRegistry:
     """命令注册器"""
     def __init__(self):
+        # 名称和别名 -> 命令，用于精确分发
         self.commands: Dict[str, CLICommand] = {}
+        # 命令名 -> 命令（不含别名），用于列出命令
+        self._canonical: Dict[str, CLICommand] = {}
+        # 排序的名称和别名，用于前缀补全
+        self._names: List[str] = []
+        # 每次注册命令时递增，供依赖命令列表的缓存判断是否失效
+        self._version = 0
+        # 按名称排序的命令（不含别名），注册时插入到位，列出命令时无需再排序
+        self._sorted: List[CLICommand] = []
         self._register_default_commands()
 
     def _register_default_commands(self):
         """注册默认命令"""
-        default_commands = [
-            HelpCommand(self),
-            NewCommand(),
-            SwitchCommand(),
-            ListCommand(),
-            HistoryCommand(),
-            ClearCommand(),
-            DeleteCommand(),
-            ExportCommand(),
-            ConfigCommand(),
-            StatsCommand(),
-            QuitCommand(),
-        ]
-
-        for command in default_commands:
-            self.register_command(command)
+        self.register_command(HelpCommand(self))
+        for spec in _COMMAND_SPECS:
+            self.register_command(CLICommand(*spec))
 
     def register_command(self, command: CLICommand):
         """注册命令"""
-        self.commands[command.name] = command
-
-        # 注册别名
-        for alias in command.aliases:
-            self.commands[alias] = command
+        # 驻留名称和别名：解析出的命令名同样驻留，字典查找时按对象身份即可命中
+        command.name = sys.intern(command.name)
+        command.aliases = frozenset(sys.intern(alias) for alias in command.aliases)
+        replaced = self._canonical.get(command.name)
+        if replaced is not None:
+            self._sorted.remove(replaced)
+        insort(self._sorted, command, key=lambda c: c.name)
+        self._canonical[command.name] = command
+        self._version += 1
+
+        # 注册名称和别名
+        for name in (command.name, *command.aliases):
+            if name not in self.commands:
+                insort(self._names, name)
+            self.commands[name] = command
 
     def get_command(self, name: str) -> Optional[CLICommand]:
         """获取命令"""
         return self.commands.get(name)
 
-    def is_command(self, text: str) -> bool:
-        """检查是否为命令"""
-        if not text.startswith('/'):
-            return False
+    @staticmethod
+    def _parse(text: str) -> Optional[Tuple[str, str]]:
+        """解析命令文本为 (命令名, 参数文本)，不是命令格式时返回 None
 
-        parts = text[1:].split()
-        command_name = parts[0] if parts else ""
+        参数文本不做拆分，需要逐个参数的命令自行调用 split() 或 first_arg()。
+        """
+        if not text or text[0] != '/':
+            return None
 
-        return command_name in self.commands
+        parts = text[1:].split(None, 1)
+        if not parts:
+            return "", ""
+        return sys.intern(parts[0]), parts[1].rstrip() if len(parts) > 1 else ""
+
+    def is_command(self, text: str) -> bool:
+        """检查是否为命令"""
+        parsed = self._parse(text)
+        return parsed is not None and parsed[0] in self.commands
 
     def execute_command(self, text: str, chat_manager: ChatManager) -> CommandResult:
         """执行命令"""
-        if not text.startswith('/'):
+        parsed = self._parse(text)
+        if parsed is None:
             return CommandResult(False, "不是有效的命令格式")
 
-        parts = text[1:].split()
-        command_name = parts[0] if parts else ""
-        args = parts[1:] if len(parts) > 1 else []
-
+        command_name, args = parsed
         command = self.get_command(command_name)
         if not command:
             return CommandResult(False, f"未知命令: {command_name}")
@@ -473,21 +415,21 @@ class CommandRegistry:
             return CommandResult(False, f"命令执行失败: {str(e)}")
 
     def get_all_commands(self) -> List[CLICommand]:
-        """获取所有命令"""
-        # 去重（因为有别名）
-        seen = set()
-        unique_commands = []
-        for command in self.commands.values():
-            if command.name not in seen:
-                seen.add(command.name)
-                unique_commands.append(command)
+        """获取所有命令（不含别名重复项，按名称排序）"""
+        return list(self._sorted)
 
-        return sorted(unique_commands, key=lambda c: c.name)
+    def complete(self, prefix: str) -> List[str]:
+        """返回以 prefix 开头的命令名和别名（已排序）"""
+        names = self._names
+        start = bisect_left(names, prefix)
+        end = start
+        while end < len(names) and names[end].startswith(prefix):
+            end += 1
+        return names[start:end]
 
 
 if __name__ == "__main__":
     # 测试命令系统
-    console = Console()
     console.print("🧪 测试命令系统", style="bold blue")
 
     # 创建命令注册器
@@ -4,18 +4,162 @@ CLI 应用配置管理
 提供应用程序的配置管理功能，包括默认配置、环境变量处理、配置文件管理等。
 """
 
+import atexit
 import os
 import json
-import yaml
-from typing import Dict, Any, Optional
+import dataclasses
+import importlib.util
+import sys
+import threading
+from typing import Dict, Any, Optional, Tuple
 from pathlib import Path
-from pydantic import BaseModel, Field
-from rich.console import Console
+from pydantic import BaseModel, Field, PrivateAttr
+
+from ..console import console
 
 # 项目根目录
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 
-console = Console()
+
+
+# 布尔配置值的文本写法（环境变量和 /config 命令共用）
+TRUE_VALUES = frozenset(('true', '1', 'yes', 'on'))
+FALSE_VALUES = frozenset(('false', '0', 'no', 'off'))
+
+# 环境变量映射
+_ENV_MAPPING = {
+    'AI_ASSISTANT_DEBUG': 'debug_mode',
+    'AI_ASSISTANT_AGENT_ID': 'agent_id',
+    'AI_ASSISTANT_MAX_STEPS': 'max_steps',
+    'AI_ASSISTANT_AI_PROVIDER': 'ai_provider',
+    'AI_ASSISTANT_MAX_HISTORY': 'max_history_length',
+    'AI_ASSISTANT_AUTO_SAVE': 'auto_save_history',
+    'AI_ASSISTANT_SHOW_THINKING': 'show_thinking_process',
+    'AI_ASSISTANT_SHOW_TOOLS': 'show_tool_calls',
+    'AI_ASSISTANT_SHOW_TRACE': 'show_execution_trace',
+    'AI_ASSISTANT_CONFIG_DIR': 'config_dir',
+    'AI_ASSISTANT_BATCH_CONCURRENCY': 'batch_concurrency',
+}
+
+# 设置了其中任一环境变量时，get_config 不再回退到配置文件
+_ENV_OVERRIDE_KEYS = frozenset(('AI_ASSISTANT_DEBUG', 'AI_ASSISTANT_AGENT_ID'))
+
+
+def _read_env() -> Dict[str, str]:
+    """一次性读取已设置的配置相关环境变量"""
+    env = os.environ
+    return {key: env[key] for key in _ENV_MAPPING.keys() & env.keys()}
+
+
+def _to_bool(value: str) -> bool:
+    return value.lower() in TRUE_VALUES
+
+
+# 环境变量值的类型转换，未列出的配置项保持字符串
+_ENV_CONVERTERS = {
+    'debug_mode': _to_bool,
+    'auto_save_history': _to_bool,
+    'show_thinking_process': _to_bool,
+    'show_tool_calls': _to_bool,
+    'show_execution_trace': _to_bool,
+    'max_steps': int,
+    'max_history_length': int,
+    'request_timeout': int,
+    'max_retries': int,
+    'batch_concurrency': int,
+    'retry_delay': float,
+}
+
+# 配置以 JSON 保存：优先使用 orjson，未安装时回退到标准库
+try:
+    import orjson
+
+    def _json_dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def _yaml_codec():
+    """导入 yaml 并返回 (yaml, Loader, Dumper)
+
+    只有读写 YAML 配置文件时才需要，推迟导入以缩短启动时间。
+    PyYAML 带 libyaml 时使用 C 实现的安全加载/输出器，否则回退到纯 Python 实现。
+    """
+    import yaml
+
+    try:
+        from yaml import CSafeDumper as Dumper, CSafeLoader as Loader
+    except ImportError:
+        from yaml import SafeDumper as Dumper, SafeLoader as Loader
+    return yaml, Loader, Dumper
+
+
+def _compiled_path(file_path: Path) -> Path:
+    """YAML 配置文件对应的编译模块（config.yaml -> config.yaml.py，不会与普通模块重名）"""
+    return file_path.with_name(file_path.name + ".py")
+
+
+def _exec_config_module(module_path: Path) -> Dict[str, Any]:
+    """执行编译生成的配置模块并返回其中的 CONFIG 字典（字节码由 __pycache__ 缓存）"""
+    spec = importlib.util.spec_from_file_location("_compiled_cli_config", module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.CONFIG
+
+
+def _read_compiled(file_path: Path) -> Optional[Dict[str, Any]]:
+    """YAML 文件旁存在不旧于它的编译模块时返回其中的配置，否则返回 None"""
+    module_path = _compiled_path(file_path)
+    try:
+        if module_path.stat().st_mtime_ns < file_path.stat().st_mtime_ns:
+            return None
+    except OSError:
+        return None
+    return _exec_config_module(module_path)
+
+
+def _is_yaml(file_path) -> bool:
+    """按扩展名判断是否为 YAML 配置文件"""
+    return Path(file_path).suffix.lower() in ('.yaml', '.yml')
+
+
+# load_from_file 的进程内缓存：(绝对路径, 修改时间, 大小) -> 已验证的配置
+_loaded_configs: Dict[Tuple[str, int, int], "CLIConfig"] = {}
+_loaded_configs_lock = threading.Lock()
+
+# 已确保存在的 (展开后的配置目录, sessions_dir, logs_dir) 组合
+_ensured_directories = set()
+
+
+def _parse_cache_path(file_path: Path) -> Path:
+    """配置文件对应的解析缓存文件"""
+    return file_path.with_name(file_path.name + ".cache.json")
+
+
+def _read_parse_cache(file_path: Path) -> Optional[Dict[str, Any]]:
+    """读取解析缓存；配置文件的修改时间或大小与缓存记录不一致时返回 None"""
+    try:
+        stat = file_path.stat()
+        with open(_parse_cache_path(file_path), 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache["mtime_ns"] == stat.st_mtime_ns and cache["size"] == stat.st_size:
+            return cache["config"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def _write_parse_cache(file_path: Path, config_data: Any):
+    """写入解析缓存（以配置文件当前的修改时间和大小为键），失败时忽略"""
+    try:
+        stat = file_path.stat()
+        cache = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "config": config_data}
+        with open(_parse_cache_path(file_path), 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False)
+    except (OSError, TypeError, ValueError):
+        pass
 
 
 class CLIConfig(BaseModel):
@@ -51,26 +195,32 @@ class CLIConfig(BaseModel):
     request_timeout: int = 30
     max_retries: int = 3
     retry_delay: float = 1.0
+    batch_concurrency: int = 4
+
+    # get_dict 的缓存结果，修改任一配置项时失效
+    _cached_dict: Optional[Dict[str, Any]] = PrivateAttr(default=None)
 
     def __init__(self, **data):
         super().__init__(**data)
         # 确保目录存在
         self._ensure_directories()
 
+    def __setattr__(self, name: str, value: Any):
+        super().__setattr__(name, value)
+        if name in CONFIG_FIELDS:
+            self._cached_dict = None
+
     def _ensure_directories(self):
-        """确保配置目录存在"""
-        # 展开用户目录
+        """确保配置目录存在（同一组目录在进程内只创建一次）"""
         config_dir = Path(self.config_dir).expanduser()
+        key = (config_dir, self.sessions_dir, self.logs_dir)
+        if key in _ensured_directories:
+            return
 
-        # 创建必要的目录
-        directories = [
-            config_dir,
-            config_dir / self.sessions_dir,
-            config_dir / self.logs_dir,
-        ]
-
-        for directory in directories:
-            directory.mkdir(parents=True, exist_ok=True)
+        # parents=True 会一并创建配置目录本身
+        for sub_dir in (self.sessions_dir, self.logs_dir):
+            (config_dir / sub_dir).mkdir(parents=True, exist_ok=True)
+        _ensured_directories.add(key)
 
     @property
     def config_dir_path(self) -> Path:
@@ -95,6 +245,11 @@ class CLIConfig(BaseModel):
     @property
     def config_file_path(self) -> Path:
         """配置文件路径"""
+        return self.config_dir_path / "config.json"
+
+    @property
+    def legacy_config_file_path(self) -> Path:
+        """旧版 YAML 配置文件路径（config.json 不存在时读取）"""
         return self.config_dir_path / "config.yaml"
 
     def save_to_file(self, file_path: Optional[str] = None):
@@ -102,37 +257,86 @@ class CLIConfig(BaseModel):
         if file_path is None:
             file_path = self.config_file_path
 
-        config_data = self.model_dump(exclude_none=True)
-
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                yaml.dump(config_data, f, default_flow_style=False, allow_unicode=True)
-
+            self._write_file(file_path)
             console.print(f"✅ 配置已保存到: {file_path}", style="green")
 
         except Exception as e:
             console.print(f"❌ 保存配置失败: {e}", style="red")
             raise
 
+    def _write_file(self, file_path):
+        """把配置写入文件：.yaml/.yml 写 YAML 并刷新解析缓存，其余写 JSON"""
+        config_data = self.get_dict()
+        # 文件即将改变，之前缓存的加载结果不再有效
+        self.invalidate_cache()
+        if not _is_yaml(file_path):
+            with open(file_path, 'wb') as f:
+                f.write(_json_dumps(config_data))
+            return
+
+        yaml, _, dumper = _yaml_codec()
+        with open(file_path, 'w', encoding='utf-8') as f:
+            yaml.dump(config_data, f, Dumper=dumper, default_flow_style=False, allow_unicode=True)
+
+        # 刚写入的内容就是解析结果，直接刷新解析缓存
+        _write_parse_cache(Path(file_path), config_data)
+
+    @staticmethod
+    def invalidate_cache():
+        """清空 load_from_file 的进程内配置缓存"""
+        with _loaded_configs_lock:
+            _loaded_configs.clear()
+
     @classmethod
-    def load_from_file(cls, file_path: Optional[str] = None) -> "CLIConfig":
-        """从文件加载配置"""
+    def load_from_file(cls, file_path: Optional[str] = None, use_compiled: bool = False) -> "CLIConfig":
+        """
+        从文件加载配置
+
+        use_compiled 为 True 时，YAML 文件旁存在 compile 生成的模块则直接执行该模块。
+        加载模块会执行其中的代码，只应对自己生成的配置开启，默认不使用。
+        """
         if file_path is None:
             config = cls()
             file_path = config.config_file_path
+            if not file_path.exists() and config.legacy_config_file_path.exists():
+                file_path = config.legacy_config_file_path
 
-        if not Path(file_path).exists():
+        try:
+            stat = os.stat(file_path)
+        except OSError:
             console.print(f"📝 配置文件不存在，使用默认配置: {file_path}", style="yellow")
             return cls()
 
+        # 同一文件内容未变化时直接复用已验证的配置（返回副本，调用方修改不影响缓存）
+        cache_key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+        with _loaded_configs_lock:
+            cached = _loaded_configs.get(cache_key)
+        if cached is not None:
+            console.print(f"✅ 配置已加载: {file_path}", style="green")
+            return cached.model_copy()
+
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                config_data = yaml.safe_load(f)
+            if not _is_yaml(file_path):
+                with open(file_path, 'rb') as f:
+                    config_data = json.loads(f.read())
+            else:
+                # 显式开启时优先使用 compile 生成的模块，其次是解析缓存，都不可用时才解析 YAML
+                config_data = _read_compiled(Path(file_path)) if use_compiled else None
+                if config_data is None:
+                    config_data = _read_parse_cache(Path(file_path))
+                if config_data is None:
+                    yaml, loader, _ = _yaml_codec()
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        config_data = yaml.load(f, Loader=loader)
+                    _write_parse_cache(Path(file_path), config_data)
 
             if config_data:
                 config = cls(**config_data)
+                with _loaded_configs_lock:
+                    _loaded_configs[cache_key] = config
                 console.print(f"✅ 配置已加载: {file_path}", style="green")
-                return config
+                return config.model_copy()
             else:
                 return cls()
 
@@ -140,39 +344,27 @@ class CLIConfig(BaseModel):
             console.print(f"❌ 加载配置失败: {e}，使用默认配置", style="red")
             return cls()
 
+    def compile_to_module(self, file_path):
+        """把配置写成只含 CONFIG 字典字面量的 Python 模块，加载时无需解析 YAML"""
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write('"""由 CLIConfig.compile_to_module 生成，请勿手动修改"""\n\n')
+            f.write(f"CONFIG = {self.get_dict()!r}\n")
+
     @classmethod
-    def load_from_env(cls) -> "CLIConfig":
-        """从环境变量加载配置"""
-        env_config = {}
+    def load_compiled(cls, file_path) -> "CLIConfig":
+        """从 compile_to_module 生成的模块加载配置"""
+        return cls(**_exec_config_module(Path(file_path)))
+
+    @classmethod
+    def load_from_env(cls, env: Optional[Dict[str, str]] = None) -> "CLIConfig":
+        """从环境变量加载配置（env 为 _read_env 读取的快照，缺省时现读）"""
+        if env is None:
+            env = _read_env()
 
-        # 环境变量映射
-        env_mapping = {
-            'AI_ASSISTANT_DEBUG': 'debug_mode',
-            'AI_ASSISTANT_AGENT_ID': 'agent_id',
-            'AI_ASSISTANT_MAX_STEPS': 'max_steps',
-            'AI_ASSISTANT_AI_PROVIDER': 'ai_provider',
-            'AI_ASSISTANT_MAX_HISTORY': 'max_history_length',
-            'AI_ASSISTANT_AUTO_SAVE': 'auto_save_history',
-            'AI_ASSISTANT_SHOW_THINKING': 'show_thinking_process',
-            'AI_ASSISTANT_SHOW_TOOLS': 'show_tool_calls',
-            'AI_ASSISTANT_SHOW_TRACE': 'show_execution_trace',
-            'AI_ASSISTANT_CONFIG_DIR': 'config_dir',
-        }
-
-        for env_var, config_key in env_mapping.items():
-            value = os.getenv(env_var)
-            if value is not None:
-                # 类型转换
-                if config_key in ['debug_mode', 'auto_save_history', 'show_thinking_process',
-                                'show_tool_calls', 'show_execution_trace']:
-                    env_config[config_key] = value.lower() in ('true', '1', 'yes', 'on')
-                elif config_key in ['max_steps', 'max_history_length', 'request_timeout',
-                                 'max_retries']:
-                    env_config[config_key] = int(value)
-                elif config_key == 'retry_delay':
-                    env_config[config_key] = float(value)
-                else:
-                    env_config[config_key] = value
+        env_config = {}
+        for env_var, value in env.items():
+            config_key = _ENV_MAPPING[env_var]
+            env_config[config_key] = _ENV_CONVERTERS.get(config_key, str)(value)
 
         if env_config:
             console.print("✅ 从环境变量加载配置", style="green")
@@ -182,28 +374,90 @@ class CLIConfig(BaseModel):
     def update(self, **kwargs):
         """更新配置"""
         for key, value in kwargs.items():
-            if hasattr(self, key):
+            if key in CONFIG_FIELDS:
                 setattr(self, key, value)
             else:
                 console.print(f"⚠️ 未知配置项: {key}", style="yellow")
 
+    def freeze(self) -> "FrozenConfig":
+        """生成只读快照：slots 数据类，读取字段只是一次槽位访问，且可安全地在线程间共享"""
+        return FrozenConfig(**{name: getattr(self, name) for name in CONFIG_FIELDS})
+
     def get_dict(self) -> Dict[str, Any]:
-        """获取配置字典"""
-        return self.model_dump(exclude_none=True)
+        """获取配置字典（返回副本，配置未修改时不重复序列化）"""
+        if self._cached_dict is None:
+            self._cached_dict = self.model_dump(exclude_none=True)
+        return dict(self._cached_dict)
 
     def display(self):
         """显示当前配置"""
-        console.print("📋 当前配置:", style="bold blue")
-        console.print("=" * 50, style="blue")
+        from rich.console import Group
+        from rich.text import Text
 
-        config_dict = self.get_dict()
-
-        for key, value in config_dict.items():
+        # 所有行组合成一个 Group 一次性输出，只经过一次渲染和终端写入；
+        # 配置值按纯文本输出，不经过标记解析和高亮
+        lines = [Text("📋 当前配置:", style="bold blue"), Text("=" * 50, style="blue")]
+        for key, value in self.get_dict().items():
             if isinstance(value, bool):
-                status = "✅" if value else "❌"
-                console.print(f"  {key}: {status}")
-            else:
-                console.print(f"  {key}: {value}")
+                value = "✅" if value else "❌"
+            lines.append(Text(f"  {key}: {value}"))
+
+        console.print(Group(*lines))
+
+
+# 所有配置项名称，用于判断配置项是否存在
+CONFIG_FIELDS = frozenset(CLIConfig.model_fields)
+
+# CLIConfig 的只读快照类型，字段与 CLIConfig 一一对应
+FrozenConfig = dataclasses.make_dataclass(
+    "FrozenConfig",
+    [(name, field.annotation) for name, field in CLIConfig.model_fields.items()],
+    frozen=True,
+    slots=True,
+)
+
+
+# 延迟保存：连续修改配置时只在最后一次修改 CONFIG_SAVE_DEBOUNCE_SECONDS 后写一次文件
+CONFIG_SAVE_DEBOUNCE_SECONDS = 1.0
+_save_lock = threading.Lock()
+_pending_save: Optional[Tuple[CLIConfig, Path]] = None
+_save_timer: Optional[threading.Timer] = None
+
+
+def schedule_config_save(config: CLIConfig, file_path: Optional[str] = None):
+    """标记配置待保存，每次调用都会重新计时（调用 flush_config_save 立即写入）"""
+    global _pending_save, _save_timer
+    if file_path is None:
+        file_path = config.config_file_path
+
+    with _save_lock:
+        _pending_save = (config, Path(file_path))
+        if _save_timer is not None:
+            _save_timer.cancel()
+        _save_timer = threading.Timer(CONFIG_SAVE_DEBOUNCE_SECONDS, flush_config_save)
+        _save_timer.daemon = True
+        _save_timer.start()
+
+
+def flush_config_save():
+    """立即写入待保存的配置"""
+    global _pending_save, _save_timer
+    with _save_lock:
+        pending, _pending_save = _pending_save, None
+        timer, _save_timer = _save_timer, None
+    if timer is not None:
+        timer.cancel()
+
+    if pending is None:
+        return
+    config, file_path = pending
+    try:
+        config._write_file(file_path)
+    except Exception as e:
+        console.print(f"❌ 保存配置失败: {e}", style="red")
+
+
+atexit.register(flush_config_save)
 
 
 # 全局配置实例
@@ -215,8 +469,9 @@ def get_config() -> CLIConfig:
     global _config
     if _config is None:
         # 加载顺序：环境变量 -> 配置文件 -> 默认配置
-        _config = CLIConfig.load_from_env()
-        if not any(os.getenv(key) for key in ['AI_ASSISTANT_DEBUG', 'AI_ASSISTANT_AGENT_ID']):
+        env = _read_env()
+        _config = CLIConfig.load_from_env(env)
+        if not any(env[key] for key in env.keys() & _ENV_OVERRIDE_KEYS):
             # 如果没有环境变量，尝试加载配置文件
             file_config = CLIConfig.load_from_file()
             if file_config.get_dict():
@@ -230,7 +485,20 @@ def set_config(config: CLIConfig):
     _config = config
 
 
-if __name__ == "__main__":
+def _compile_main(yaml_path: str):
+    """python -m src.day4_cli.config compile <yaml>：把 YAML 配置编译为 Python 模块"""
+    module_path = _compiled_path(Path(yaml_path))
+    CLIConfig.load_from_file(yaml_path).compile_to_module(module_path)
+    console.print(f"✅ 配置已编译到: {module_path}", style="green")
+
+
+if __name__ == "__main__" and sys.argv[1:2] == ["compile"]:
+    if len(sys.argv) != 3:
+        console.print("用法: python -m src.day4_cli.config compile <config.yaml>", style="yellow")
+        sys.exit(1)
+    _compile_main(sys.argv[2])
+
+elif __name__ == "__main__":
     # 测试配置管理
     console.print("🧪 测试配置管理", style="bold blue")
 
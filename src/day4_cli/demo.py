@@ -7,22 +7,19 @@ Day 4 CLI 聊天应用演示程序
 
 import os
 import sys
-import tempfile
 from pathlib import Path
 
 # 添加项目根目录到 Python 路径
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
-from rich.console import Console
-from rich.panel import Panel
-from rich.table import Table
-from rich.layout import Layout
+# 各演示共用同一个 Console，终端检测只做一次
+from src.console import console
 
 # 导入我们的模块
 try:
     from src.day4_cli.config import CLIConfig, get_config
     from src.day4_cli.chat_manager import ChatManager, ChatSession, ChatMessage
-    from src.day4_cli.commands import CommandRegistry, HelpCommand, NewCommand
+    from src.day4_cli.commands import CommandRegistry, HelpCommand
     from src.day4_cli.cli_interface import CLIInterface
     from src.day4_cli.app import AssistantApp
     IMPORTS_AVAILABLE = True
@@ -34,7 +31,7 @@ except ImportError as e:
 
 def demo_config():
     """演示配置管理"""
-    console = Console()
+    import tempfile
 
     if not IMPORTS_AVAILABLE:
         console.print("❌ 无法运行配置演示，请检查依赖安装", style="bold red")
@@ -63,8 +60,8 @@ def demo_config():
         config.save_to_file(config_file)
         console.print(f"✅ 配置已保存到临时文件")
 
-        # 加载配置
-        loaded_config = CLIConfig.load_from_file(config_file)
+        # 加载配置（存在 compile 生成的模块时跳过 YAML 解析）
+        loaded_config = CLIConfig.load_from_file(config_file, use_compiled=True)
         console.print("✅ 从文件加载配置成功")
         console.print(f"📋 调试模式: {loaded_config.debug_mode}")
         console.print(f"📋 最大步数: {loaded_config.max_steps}")
@@ -76,8 +73,6 @@ def demo_config():
 
 def demo_chat_manager():
     """演示聊天管理"""
-    console = Console()
-
     if not IMPORTS_AVAILABLE:
         console.print("❌ 无法运行聊天管理演示，请检查依赖安装", style="bold red")
         return
@@ -113,7 +108,7 @@ def demo_chat_manager():
 
 def demo_command_system():
     """演示命令系统"""
-    console = Console()
+    from rich.table import Table
 
     if not IMPORTS_AVAILABLE:
         console.print("❌ 无法运行命令系统演示，请检查依赖安装", style="bold red")
@@ -161,8 +156,6 @@ def demo_command_system():
 
 def demo_cli_interface():
     """演示 CLI 界面"""
-    console = Console()
-
     if not IMPORTS_AVAILABLE:
         console.print("❌ 无法运行 CLI 界面演示，请检查依赖安装", style="bold red")
         return
@@ -208,7 +201,7 @@ def demo_cli_interface():
 
 def demo_integration():
     """演示完整集成"""
-    console = Console()
+    import tempfile
 
     if not IMPORTS_AVAILABLE:
         console.print("❌ 无法运行集成演示，请检查依赖安装", style="bold red")
@@ -257,8 +250,6 @@ def demo_integration():
 
 def main():
     """主演示函数"""
-    console = Console()
-
     console.print("🎯 Day 4 CLI 聊天应用完整演示", style="bold blue", justify="center")
     console.print("=" * 80, style="blue")
     console.print("展示基于 ReAct 模式的 AI 助手 CLI 应用的完整功能", style="italic")
@@ -5,22 +5,38 @@ Day 4 CLI 聊天应用测试套件
 全面测试 CLI 应用的各个组件和功能。
 """
 
+import io
 import os
+import signal
+import subprocess
 import sys
+import threading
 import unittest
 import tempfile
 import json
+from datetime import datetime
 from pathlib import Path
+from typing import Optional
 from unittest.mock import Mock, patch, MagicMock
 
 # 添加项目根目录到 Python 路径
-sys.path.append(str(Path(__file__).parent.parent.parent))
+PROJECT_ROOT = str(Path(__file__).parent.parent.parent)
+sys.path.append(PROJECT_ROOT)
 
 # 导入测试目标
 from src.day4_cli.config import CLIConfig, get_config
 from src.day4_cli.chat_manager import ChatManager, ChatSession, ChatMessage
-from src.day4_cli.commands import CommandRegistry, HelpCommand, NewCommand, CLICommand, CommandResult
+from src.day4_cli.commands import CommandRegistry, HelpCommand, CLICommand, CommandResult, first_arg
 from src.day4_cli.cli_interface import CLIInterface
+from src.day4_cli import chat_manager as chat_manager_module
+from src.day4_cli import config as config_module
+from src.day4_cli import app as app_module
+from src.day4_cli.app import AssistantApp
+from rich.console import Console
+from rich.panel import Panel
+
+# 测试用的临时目录优先建在内存文件系统 /dev/shm 上，会话和配置读写不落到物理磁盘
+_TEMP_ROOT = "/dev/shm" if os.access("/dev/shm", os.W_OK) else None
 
 
 class TestCLIConfig(unittest.TestCase):
@@ -28,7 +44,7 @@ class TestCLIConfig(unittest.TestCase):
 
     def setUp(self):
         """测试前准备"""
-        self.temp_dir = tempfile.mkdtemp()
+        self.temp_dir = tempfile.mkdtemp(dir=_TEMP_ROOT)
         self.config_file = os.path.join(self.temp_dir, "test_config.yaml")
 
     def tearDown(self):
@@ -44,6 +60,17 @@ class TestCLIConfig(unittest.TestCase):
         self.assertTrue(config.debug_mode)
         self.assertEqual(config.max_steps, 5)
 
+    def test_config_directories_created_once(self):
+        """测试配置目录只在首次构造时创建"""
+        config_dir = os.path.join(self.temp_dir, "app")
+        config = CLIConfig(config_dir=config_dir)
+        self.assertTrue(config.sessions_dir_path.is_dir())
+        self.assertTrue(config.logs_dir_path.is_dir())
+
+        with patch.object(Path, 'mkdir') as mock_mkdir:
+            CLIConfig(config_dir=config_dir, max_steps=3)
+        mock_mkdir.assert_not_called()
+
     def test_config_save_and_load(self):
         """测试配置保存和加载"""
         # 创建配置
@@ -64,6 +91,119 @@ class TestCLIConfig(unittest.TestCase):
         self.assertEqual(loaded_config.max_steps, 8)
         self.assertEqual(loaded_config.show_thinking_process, False)
 
+    def test_config_json_save_and_load(self):
+        """测试非 YAML 扩展名的配置以 JSON 保存和加载"""
+        json_file = os.path.join(self.temp_dir, "config.json")
+        CLIConfig(debug_mode=True, retry_delay=2.5).save_to_file(json_file)
+
+        with open(json_file, 'r', encoding='utf-8') as f:
+            self.assertEqual(json.load(f)["retry_delay"], 2.5)
+
+        loaded_config = CLIConfig.load_from_file(json_file)
+        self.assertTrue(loaded_config.debug_mode)
+        self.assertEqual(loaded_config.retry_delay, 2.5)
+
+    def test_config_load_cached_per_file_version(self):
+        """测试同一配置文件未变化时只解析一次，且返回的配置互不影响"""
+        json_file = os.path.join(self.temp_dir, "cached.json")
+        CLIConfig(max_steps=3).save_to_file(json_file)
+
+        with patch('src.day4_cli.config.json.loads', wraps=json.loads) as mock_loads:
+            first = CLIConfig.load_from_file(json_file)
+            first.max_steps = 50
+            second = CLIConfig.load_from_file(json_file)
+        self.assertEqual(mock_loads.call_count, 1)
+        self.assertEqual(second.max_steps, 3)
+
+        # 保存后缓存失效
+        CLIConfig(max_steps=4).save_to_file(json_file)
+        self.assertEqual(CLIConfig.load_from_file(json_file).max_steps, 4)
+
+    def test_config_default_file_prefers_json(self):
+        """测试默认配置文件优先读取 config.json，不存在时回退到 config.yaml"""
+        with patch.dict(os.environ, {'HOME': self.temp_dir}):
+            config = CLIConfig()
+            CLIConfig(max_steps=4).save_to_file(config.legacy_config_file_path)
+            self.assertEqual(CLIConfig.load_from_file().max_steps, 4)
+
+            CLIConfig(max_steps=6).save_to_file()
+            self.assertTrue(config.config_file_path.exists())
+            self.assertEqual(CLIConfig.load_from_file().max_steps, 6)
+
+    def test_config_parse_cache(self):
+        """测试配置文件未变化时复用解析缓存"""
+        CLIConfig(max_steps=8).save_to_file(self.config_file)
+
+        with patch('yaml.load') as mock_load:
+            loaded_config = CLIConfig.load_from_file(self.config_file)
+            mock_load.assert_not_called()
+        self.assertEqual(loaded_config.max_steps, 8)
+
+        # 文件内容变化后缓存失效，重新解析
+        with open(self.config_file, 'a', encoding='utf-8') as f:
+            f.write("max_steps: 12\n")
+        loaded_config = CLIConfig.load_from_file(self.config_file)
+        self.assertEqual(loaded_config.max_steps, 12)
+
+    def test_config_compiled_module(self):
+        """测试 YAML 配置编译为 Python 模块后加载时跳过 YAML 解析"""
+        CLIConfig(max_steps=5, app_name="编译测试").save_to_file(self.config_file)
+        os.remove(self.config_file + ".cache.json")
+        subprocess.run(
+            [sys.executable, "-m", "src.day4_cli.config", "compile", self.config_file],
+            cwd=PROJECT_ROOT, check=True, capture_output=True,
+        )
+        self.assertTrue(os.path.exists(self.config_file + ".py"))
+
+        # 未显式开启时不执行旁边的模块
+        with patch('src.day4_cli.config._exec_config_module') as mock_exec:
+            self.assertEqual(CLIConfig.load_from_file(self.config_file).max_steps, 5)
+            CLIConfig.invalidate_cache()
+            CLIConfig.load_from_file(self.config_file)
+        mock_exec.assert_not_called()
+
+        CLIConfig.invalidate_cache()
+        with patch('yaml.load') as mock_load:
+            loaded_config = CLIConfig.load_from_file(self.config_file, use_compiled=True)
+            mock_load.assert_not_called()
+        self.assertEqual(loaded_config.max_steps, 5)
+        self.assertEqual(loaded_config.app_name, "编译测试")
+        self.assertEqual(CLIConfig.load_compiled(self.config_file + ".py").max_steps, 5)
+
+        # YAML 比编译模块新时不再使用编译模块
+        CLIConfig(max_steps=9).save_to_file(self.config_file)
+        os.utime(self.config_file + ".py", ns=(0, 0))
+        self.assertEqual(CLIConfig.load_from_file(self.config_file, use_compiled=True).max_steps, 9)
+
+    def test_config_load_from_env(self):
+        """测试从环境变量加载配置并转换类型"""
+        env = {
+            'AI_ASSISTANT_DEBUG': 'Yes',
+            'AI_ASSISTANT_SHOW_TOOLS': 'off',
+            'AI_ASSISTANT_MAX_STEPS': '7',
+            'AI_ASSISTANT_AI_PROVIDER': 'openai',
+            'AI_ASSISTANT_CONFIG_DIR': self.temp_dir,
+        }
+        with patch.dict(os.environ, env):
+            config = CLIConfig.load_from_env()
+
+        self.assertIs(config.debug_mode, True)
+        self.assertIs(config.show_tool_calls, False)
+        self.assertEqual(config.max_steps, 7)
+        self.assertEqual(config.ai_provider, "openai")
+        self.assertEqual(config.config_dir, self.temp_dir)
+
+    def test_get_config_env_skips_file(self):
+        """测试设置了调试环境变量时 get_config 不读取配置文件"""
+        env = {'AI_ASSISTANT_DEBUG': 'true', 'AI_ASSISTANT_CONFIG_DIR': self.temp_dir}
+        with patch.dict(os.environ, env), \
+             patch('src.day4_cli.config._config', None), \
+             patch.object(CLIConfig, 'load_from_file') as mock_load_file:
+            config = get_config()
+
+        mock_load_file.assert_not_called()
+        self.assertTrue(config.debug_mode)
+
     def test_config_update(self):
         """测试配置更新"""
         config = CLIConfig()
@@ -85,6 +225,66 @@ class TestCLIConfig(unittest.TestCase):
         self.assertTrue(config_dict["debug_mode"])
         self.assertEqual(config_dict["max_steps"], 10)
 
+    def test_config_dict_cached_until_update(self):
+        """测试配置字典在修改配置前复用缓存"""
+        config = CLIConfig(max_steps=10)
+        with patch.object(CLIConfig, 'model_dump', wraps=config.model_dump) as mock_dump:
+            config.get_dict()
+            config.get_dict()["max_steps"] = 99
+            self.assertEqual(config.get_dict()["max_steps"], 10)
+            self.assertEqual(mock_dump.call_count, 1)
+
+            config.max_steps = 12
+            self.assertEqual(config.get_dict()["max_steps"], 12)
+            self.assertEqual(mock_dump.call_count, 2)
+
+    def test_config_freeze(self):
+        """测试配置只读快照"""
+        config = CLIConfig(debug_mode=True, max_steps=6)
+        frozen = config.freeze()
+
+        self.assertTrue(frozen.debug_mode)
+        self.assertEqual(frozen.max_steps, 6)
+        self.assertFalse(hasattr(frozen, "__dict__"))
+        with self.assertRaises(AttributeError):
+            frozen.max_steps = 7
+
+        # 快照不随原配置变化
+        config.max_steps = 9
+        self.assertEqual(frozen.max_steps, 6)
+
+    def test_config_save_debounced(self):
+        """测试连续修改配置只写一次文件"""
+        config = CLIConfig()
+        with patch.object(CLIConfig, '_write_file') as mock_write:
+            for steps in (11, 12, 13):
+                config.max_steps = steps
+                config_module.schedule_config_save(config, self.config_file)
+            mock_write.assert_not_called()
+
+            config_module.flush_config_save()
+            mock_write.assert_called_once_with(Path(self.config_file))
+
+            config_module.flush_config_save()
+            mock_write.assert_called_once()
+
+    def test_config_display_single_print(self):
+        """测试显示配置只调用一次输出"""
+        config = CLIConfig(debug_mode=True)
+        with patch('src.day4_cli.config.console') as mock_console:
+            config.display()
+
+        mock_console.print.assert_called_once()
+
+    def test_config_display_plain_values(self):
+        """测试配置值按原文输出，不被当作 Rich 标记解析"""
+        config = CLIConfig(agent_id="[bold]agent[/bold]")
+        output = io.StringIO()
+        with patch('src.day4_cli.config.console', Console(file=output, width=120, color_system=None)):
+            config.display()
+
+        self.assertIn("agent_id: [bold]agent[/bold]", output.getvalue())
+
 
 class TestChatMessage(unittest.TestCase):
     """测试聊天消息"""
@@ -114,6 +314,61 @@ class TestChatMessage(unittest.TestCase):
         self.assertEqual(restored_message.content, message.content)
         self.assertEqual(restored_message.id, message.id)
 
+    def test_message_ids_are_unique_hex(self):
+        """测试消息 ID 为 32 位十六进制且互不重复"""
+        ids = {ChatMessage(role="user", content="x").id for _ in range(1000)}
+
+        self.assertEqual(len(ids), 1000)
+        for message_id in list(ids)[:10]:
+            self.assertRegex(message_id, r"^[0-9a-f]{32}$")
+
+    def test_message_ids_increase_within_process(self):
+        """测试同一进程内消息 ID 按创建顺序递增，会话 ID 前缀互不相同"""
+        first = ChatMessage(role="user", content="a").id
+        second = ChatMessage(role="user", content="b").id
+
+        self.assertEqual(first[:16], second[:16])
+        self.assertLess(first, second)
+        self.assertNotEqual(ChatSession(name="a").id[:8], ChatSession(name="b").id[:8])
+
+    @unittest.skipUnless(hasattr(os, "fork"), "需要 os.fork")
+    def test_forked_child_generates_different_ids(self):
+        """测试 fork 出的子进程生成的会话 ID 和消息 ID 与父进程不同"""
+        # 在单线程的独立解释器里 fork，避免在多线程的测试进程中 fork
+        code = (
+            "import os, sys\n"
+            "from src.day4_cli.chat_manager import ChatSession, ChatMessage\n"
+            "def ids():\n"
+            "    return ChatSession(name='s').id + ChatMessage(role='user', content='m').id[:16]\n"
+            "r, w = os.pipe()\n"
+            "if os.fork() == 0:\n"
+            "    os.write(w, ids().encode())\n"
+            "    os._exit(0)\n"
+            "os.close(w)\n"
+            "child = os.read(r, 64).decode()\n"
+            "os.wait()\n"
+            "parent = ids()\n"
+            "sys.exit(child[:32] == parent[:32] or child[32:] == parent[32:])\n"
+        )
+        result = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT)
+
+        self.assertEqual(result.returncode, 0)
+
+    def test_message_time_hms(self):
+        """测试消息时间格式化结果"""
+        message = ChatMessage(role="user", content="Hello", timestamp=datetime(2024, 1, 1, 9, 5, 7))
+
+        self.assertEqual(message.time_hms, "09:05:07")
+        self.assertIs(message.time_hms, message.time_hms)
+        self.assertNotIn("_ts_hms", message.to_dict())
+
+    def test_message_uses_slots(self):
+        """测试消息对象使用 slots，不带实例字典"""
+        message = ChatMessage(role="user", content="Hello")
+
+        self.assertFalse(hasattr(message, "__dict__"))
+        self.assertIsNot(message.metadata, ChatMessage(role="user", content="x").metadata)
+
 
 class TestChatSession(unittest.TestCase):
     """测试聊天会话"""
@@ -157,13 +412,37 @@ class TestChatSession(unittest.TestCase):
         self.session.clear_messages()
         self.assertEqual(len(self.session.messages), 0)
 
+    def test_consecutive_duplicate_not_appended(self):
+        """测试与上一条完全相同的短消息不重复追加"""
+        first = self.session.add_message("assistant", "工具调用失败: 超时")
+        self.assertIs(self.session.add_message("assistant", "工具调用失败: 超时"), first)
+        self.assertEqual(len(self.session.messages), 1)
+
+        # 角色不同、不相邻或内容过长时照常追加
+        self.session.add_message("user", "工具调用失败: 超时")
+        self.session.add_message("assistant", "工具调用失败: 超时")
+        long_content = "长" * 200
+        self.session.add_message("user", long_content)
+        self.session.add_message("user", long_content)
+        self.assertEqual(len(self.session.messages), 5)
+
+    def test_session_roundtrip_and_slots(self):
+        """测试会话序列化往返，且会话对象不带实例字典"""
+        self.session.add_message("user", "Hello", {"k": 1})
+
+        restored = ChatSession.from_dict(self.session.to_dict())
+
+        self.assertEqual(restored, self.session)
+        self.assertFalse(hasattr(restored, "__dict__"))
+        self.assertNotIn("messages", self.session.to_dict(with_messages=False))
+
 
 class TestChatManager(unittest.TestCase):
     """测试聊天管理器"""
 
     def setUp(self):
         """测试前准备"""
-        self.temp_dir = tempfile.mkdtemp()
+        self.temp_dir = tempfile.mkdtemp(dir=_TEMP_ROOT)
 
         # 模拟配置
         with patch('src.day4_cli.chat_manager.get_config') as mock_get_config:
@@ -176,6 +455,7 @@ class TestChatManager(unittest.TestCase):
     def tearDown(self):
         """测试后清理"""
         import shutil
+        self.chat_manager.flush_saves()
         shutil.rmtree(self.temp_dir, ignore_errors=True)
 
     def test_create_session(self):
@@ -219,6 +499,40 @@ class TestChatManager(unittest.TestCase):
         self.assertTrue(result)
         self.assertEqual(self.chat_manager.current_session_id, session2.id)
 
+    def test_current_session_follows_switch_and_delete(self):
+        """测试当前会话引用随创建、切换、删除更新"""
+        first = self.chat_manager.create_session("First")
+        second = self.chat_manager.create_session("Second")
+        self.assertIs(self.chat_manager.get_current_session(), second)
+
+        self.chat_manager.switch_session(first.id)
+        self.assertIs(self.chat_manager.get_current_session(), first)
+        self.assertEqual(self.chat_manager.current_session_id, first.id)
+
+        self.chat_manager.delete_session(first.id)
+        self.assertIs(self.chat_manager.get_current_session(), second)
+
+        self.chat_manager.current_session_id = None
+        created = self.chat_manager.get_current_session()
+        self.assertNotIn(created, (first, second))
+
+    def test_find_session(self):
+        """测试按 ID 前缀或名称查找会话"""
+        first = self.chat_manager.create_session("工作")
+        second = self.chat_manager.create_session("学习")
+
+        self.assertIs(self.chat_manager.find_session(first.id), first)
+        self.assertIs(self.chat_manager.find_session(second.id[:12]), second)
+        self.assertIs(self.chat_manager.find_session("学习"), second)
+        self.assertIsNone(self.chat_manager.find_session("不存在"))
+
+        self.chat_manager.delete_session(first.id)
+        self.assertIsNone(self.chat_manager.find_session(first.id))
+        self.assertIsNone(self.chat_manager.find_session("工作"))
+
+        restored = self._reload_manager()
+        self.assertEqual(restored.find_session("学习").id, second.id)
+
     def test_delete_session(self):
         """测试删除会话"""
         session = self.chat_manager.create_session("To Delete")
@@ -228,6 +542,324 @@ class TestChatManager(unittest.TestCase):
         self.assertTrue(result)
         self.assertNotIn(session_id, self.chat_manager.sessions)
 
+    def _reload_manager(self) -> ChatManager:
+        """用同一会话目录重新创建聊天管理器"""
+        with patch('src.day4_cli.chat_manager.get_config') as mock_get_config:
+            mock_config = Mock()
+            mock_config.sessions_dir_path = Path(self.temp_dir)
+            mock_get_config.return_value = mock_config
+            return ChatManager()
+
+    def _reload_session(self, session_id: str) -> ChatSession:
+        """重新加载会话目录，返回消息已加载的指定会话"""
+        session = self._reload_manager().sessions[session_id]
+        session.ensure_loaded()
+        return session
+
+    def test_session_persistence_roundtrip(self):
+        """测试会话保存后可以重新加载"""
+        session = self.chat_manager.create_session("Persisted")
+        self.chat_manager.add_user_message("你好，介绍一下你自己")
+        self.chat_manager.add_assistant_message("我是 AI 助手", {"total_steps": 2})
+
+        restored = self._reload_session(session.id)
+
+        self.assertEqual(restored.name, "Persisted")
+        self.assertEqual([m.content for m in restored.messages], ["你好，介绍一下你自己", "我是 AI 助手"])
+        self.assertEqual(restored.messages[1].metadata, {"total_steps": 2})
+        self.assertEqual(restored.messages[0].timestamp, session.messages[0].timestamp)
+
+    def test_save_is_written_in_background(self):
+        """测试会话在后台写入，flush_saves 后文件内容为最新状态"""
+        session = self.chat_manager.create_session("Async")
+        for i in range(5):
+            self.chat_manager.add_user_message(f"msg {i}")
+
+        self.chat_manager.flush_saves()
+
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir, f"{session.id}.json")))
+        self.assertEqual(list(Path(self.temp_dir).glob("*.tmp")), [])
+        restored = self._reload_session(session.id)
+        self.assertEqual(len(restored.messages), 5)
+
+    def test_new_messages_are_appended_to_journal(self):
+        """测试消息追加到消息日志，会话头只记录消息数"""
+        session = self.chat_manager.create_session("Journal")
+        self.chat_manager.flush_saves()
+
+        self.chat_manager.add_user_message("第一条")
+        self.chat_manager.flush_saves()
+        self.chat_manager.add_assistant_message("第二条")
+        self.chat_manager.flush_saves()
+
+        header = json.loads((Path(self.temp_dir) / f"{session.id}.json").read_bytes())
+        self.assertNotIn("messages", header)
+        self.assertEqual(header["message_count"], 2)
+        journal = Path(self.temp_dir) / f"{session.id}.log"
+        lines = journal.read_bytes().splitlines()
+        self.assertEqual([json.loads(line)["content"] for line in lines], ["第一条", "第二条"])
+
+    def test_snapshot_is_compact(self):
+        """测试会话头以紧凑格式写入"""
+        session = self.chat_manager.create_session("Compact snapshot")
+        self.chat_manager.flush_saves()
+
+        data = (Path(self.temp_dir) / f"{session.id}.json").read_bytes()
+        self.assertEqual(data.count(b"\n"), 1)
+        self.assertEqual(json.loads(data)["name"], "Compact snapshot")
+
+    def test_messages_load_lazily(self):
+        """测试启动时只读会话头，消息在首次访问时加载"""
+        session = self.chat_manager.create_session("Lazy")
+        self.chat_manager.add_user_message("Hello, who are you?")
+        self.chat_manager.add_assistant_message("I am an assistant")
+        self.chat_manager.flush_saves()
+
+        manager = self._reload_manager()
+        restored = manager.sessions[session.id]
+        self.assertEqual(restored.messages, [])
+        self.assertEqual(restored.message_count, 2)
+        self.assertEqual(manager.get_statistics()["total_messages"], 2)
+
+        history = manager.get_session_history(session.id)
+        self.assertEqual([m.content for m in history], ["Hello, who are you?", "I am an assistant"])
+        self.assertEqual(restored.message_count, 2)
+
+    def test_switch_session_submits_pending_saves(self):
+        """测试切换会话时待保存的会话立即提交写入，不等待定时器"""
+        first = self.chat_manager.create_session("First")
+        second = self.chat_manager.create_session("Second")
+        self.chat_manager.add_user_message("切换前的消息")
+        self.assertIn(second.id, self.chat_manager._dirty)
+
+        self.chat_manager.switch_session(first.id)
+        self.assertEqual(self.chat_manager._dirty, {})
+        self.assertIsNone(self.chat_manager._flush_timer)
+
+        chat_manager_module._get_session_writer().flush()
+        self.assertEqual(self._reload_manager().sessions[second.id].message_count, 1)
+
+    def test_low_signal_messages_not_persisted(self):
+        """测试问候、致谢等低信息量消息只保留在内存中"""
+        session = self.chat_manager.create_session("Greeting")
+        self.chat_manager.add_user_message("你好！")
+        self.chat_manager.add_assistant_message("你好，有什么可以帮你？")
+        self.chat_manager.add_user_message(" OK ")
+        self.chat_manager.add_user_message("ok, 查一下北京天气")
+
+        self.assertEqual(len(session.messages), 4)
+        history = [m.content for m in self.chat_manager.get_session_history(count=10)]
+        self.assertIn("你好！", history)
+
+        manager = self._reload_manager()
+        restored = manager.sessions[session.id]
+        self.assertEqual(restored.message_count, 2)
+        restored.ensure_loaded()
+        self.assertEqual([m.content for m in restored.messages], ["你好，有什么可以帮你？", "ok, 查一下北京天气"])
+
+    def test_append_after_reload(self):
+        """测试重新加载后追加消息不会丢失之前的消息"""
+        session = self.chat_manager.create_session("Reloaded")
+        self.chat_manager.add_user_message("加载前")
+        self.chat_manager.flush_saves()
+
+        manager = self._reload_manager()
+        manager.current_session_id = session.id
+        manager.add_user_message("加载后")
+        manager.flush_saves()
+
+        restored = self._reload_session(session.id)
+        self.assertEqual([m.content for m in restored.messages], ["加载前", "加载后"])
+
+    def test_migrate_snapshot_with_journal(self):
+        """测试内含消息的旧快照加追加日志可以加载，保存后迁移为新格式"""
+        snapshot = {
+            "id": "old-format", "name": "Old",
+            "created_at": "2024-01-01T10:00:00", "updated_at": "2024-01-01T10:00:00",
+            "messages": [{"id": "m1", "timestamp": "2024-01-01T10:01:00",
+                          "role": "user", "content": "快照消息", "metadata": {}}],
+            "metadata": {}
+        }
+        journal_line = {"id": "m2", "timestamp": "2024-01-01T10:02:00",
+                        "role": "assistant", "content": "日志消息", "metadata": {}}
+        Path(self.temp_dir, "old-format.json").write_text(json.dumps(snapshot), encoding='utf-8')
+        Path(self.temp_dir, "old-format.log").write_text(
+            json.dumps(snapshot["messages"][0]) + "\n" + json.dumps(journal_line) + "\n", encoding='utf-8')
+
+        manager = self._reload_manager()
+        manager.switch_session("old-format")
+        manager.add_user_message("新消息")
+        manager.flush_saves()
+
+        header = json.loads(Path(self.temp_dir, "old-format.json").read_bytes())
+        self.assertNotIn("messages", header)
+        restored = self._reload_session("old-format")
+        self.assertEqual([m.content for m in restored.messages], ["快照消息", "日志消息", "新消息"])
+
+    def test_clear_session_rewrites_journal(self):
+        """测试清空会话后重新加载不会重放旧日志"""
+        session = self.chat_manager.create_session("Clear")
+        self.chat_manager.add_user_message("Hello")
+        self.chat_manager.flush_saves()
+
+        self.chat_manager.clear_current_session()
+        self.chat_manager.add_user_message("After clear")
+
+        restored = self._reload_session(session.id)
+        self.assertEqual([m.content for m in restored.messages], ["After clear"])
+
+    def test_truncated_journal_line_is_skipped(self):
+        """测试日志末尾不完整的记录被跳过"""
+        session = self.chat_manager.create_session("Truncated")
+        self.chat_manager.add_user_message("完整消息")
+        self.chat_manager.flush_saves()
+
+        with open(os.path.join(self.temp_dir, f"{session.id}.log"), 'ab') as f:
+            f.write(b'{"id": "partial", "timest')
+
+        restored = self._reload_session(session.id)
+        self.assertEqual([m.content for m in restored.messages], ["完整消息"])
+
+    def test_saves_are_debounced(self):
+        """测试时间窗口内的多次修改合并为一次写入"""
+        with patch.object(chat_manager_module, "SAVE_DEBOUNCE_SECONDS", 60):
+            session = self.chat_manager.create_session("Debounced")
+            for i in range(5):
+                self.chat_manager.add_user_message(f"msg {i}")
+
+            session_file = Path(self.temp_dir) / f"{session.id}.json"
+            self.assertFalse(session_file.exists())
+
+            with patch.object(chat_manager_module._SessionWriter, "submit",
+                              autospec=True,
+                              side_effect=chat_manager_module._SessionWriter.submit) as submit:
+                self.chat_manager.flush_saves()
+
+        self.assertEqual(submit.call_count, 1)
+        self.assertEqual(json.loads(session_file.read_bytes())["message_count"], 5)
+
+    def test_delete_session_after_pending_save(self):
+        """测试删除会话不会被排队中的写入写回"""
+        session = self.chat_manager.create_session("Pending")
+        self.chat_manager.add_user_message("Hello")
+
+        self.chat_manager.delete_session(session.id)
+        self.chat_manager.flush_saves()
+
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, f"{session.id}.json")))
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, f"{session.id}.log")))
+
+    def test_load_legacy_session_file(self):
+        """测试加载以 isoformat 字符串保存时间的旧会话文件"""
+        legacy = {
+            "id": "legacy-session",
+            "name": "Legacy",
+            "created_at": "2024-01-01T10:00:00",
+            "updated_at": "2024-01-01T10:05:00",
+            "messages": [{
+                "id": "m1", "timestamp": "2024-01-01T10:01:00",
+                "role": "user", "content": "旧消息", "metadata": {}
+            }],
+            "metadata": {}
+        }
+        with open(os.path.join(self.temp_dir, "legacy-session.json"), 'w', encoding='utf-8') as f:
+            json.dump(legacy, f, ensure_ascii=False)
+
+        restored = self._reload_session("legacy-session")
+
+        self.assertEqual(restored.messages[0].content, "旧消息")
+        self.assertEqual(restored.created_at.year, 2024)
+
+    def test_list_sessions_most_recent_first(self):
+        """测试会话列表按最近更新排序"""
+        first = self.chat_manager.create_session("First")
+        second = self.chat_manager.create_session("Second")
+        self.assertEqual(self.chat_manager.list_sessions(), [second, first])
+
+        self.chat_manager.switch_session(first.id)
+        self.chat_manager.add_user_message("bump")
+        self.assertEqual(self.chat_manager.list_sessions(), [first, second])
+
+        self.chat_manager.delete_session(first.id)
+        self.assertEqual(self.chat_manager.list_sessions(), [second])
+
+        self.chat_manager.flush_saves()
+        restored = self._reload_manager().list_sessions()
+        self.assertEqual([s.id for s in restored], [second.id])
+
+    def test_load_many_sessions_skips_broken_file(self):
+        """测试并发加载多个会话时，损坏的文件不影响其他会话"""
+        ids = [self.chat_manager.create_session(f"S{i}").id for i in range(5)]
+        self.chat_manager.flush_saves()
+        Path(self.temp_dir, "broken.json").write_text("{not json", encoding='utf-8')
+
+        manager = self._reload_manager()
+
+        self.assertEqual(set(manager.sessions), set(ids))
+
+    def test_display_session_history_single_print(self):
+        """测试会话历史一次性输出，消息内容不按 Rich 标记解析"""
+        self.chat_manager.create_session("History")
+        self.chat_manager.add_user_message("看看 [bold]原文[/bold]")
+        self.chat_manager.add_assistant_message("好的")
+
+        output = io.StringIO()
+        self.chat_manager.console = Console(file=output, width=120, color_system=None)
+        with patch.object(self.chat_manager.console, "print",
+                          wraps=self.chat_manager.console.print) as print_mock:
+            self.chat_manager.display_session_history()
+
+        self.assertEqual(print_mock.call_count, 1)
+        text = output.getvalue()
+        self.assertIn("💬 会话: History", text)
+        self.assertIn("👤 用户: 看看 [bold]原文[/bold]", text)
+        self.assertIn("🤖 助手: 好的", text)
+
+    def test_export_session(self):
+        """测试导出会话为合法 JSON，每条消息占一行"""
+        self.chat_manager.create_session("Export")
+        self.chat_manager.add_user_message("你好")
+        self.chat_manager.add_assistant_message("Hi", {"total_steps": 1})
+        export_file = os.path.join(self.temp_dir, "export.json")
+
+        self.chat_manager.export_session(file_path=export_file)
+
+        with open(export_file, encoding='utf-8') as f:
+            content = f.read()
+        data = json.loads(content)
+        self.assertEqual(data["session"]["name"], "Export")
+        self.assertEqual([m["content"] for m in data["session"]["messages"]], ["你好", "Hi"])
+        self.assertEqual(data["session"]["messages"][1]["metadata"], {"total_steps": 1})
+        self.assertEqual(data["app_version"], "1.0.0")
+        self.assertIn("exported_at", data)
+        self.assertEqual(content.count("\n"), 4)
+
+    def test_export_empty_session(self):
+        """测试导出没有消息的会话"""
+        self.chat_manager.create_session("Empty")
+        export_file = os.path.join(self.temp_dir, "empty.json")
+
+        self.chat_manager.export_session(file_path=export_file)
+
+        with open(export_file, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)["session"]["messages"], [])
+
+    def test_assistant_stream(self):
+        """测试流式助手回复结束时保存为一条消息"""
+        session = self.chat_manager.create_session("Stream")
+        append, finish = self.chat_manager.begin_assistant_stream()
+
+        for chunk in ["你", "好", "，", "world"]:
+            append(chunk)
+        other = self.chat_manager.create_session("Other")
+        message = finish({"total_steps": 1})
+
+        self.assertEqual(message.content, "你好，world")
+        self.assertEqual(message.role, "assistant")
+        self.assertEqual(session.messages, [message])
+        self.assertEqual(other.messages, [])
+        self.assertEqual(self._reload_session(session.id).messages[0].content, "你好，world")
+
     def test_get_statistics(self):
         """测试获取统计信息"""
         self.chat_manager.create_session("Session 1")
@@ -240,13 +872,37 @@ class TestChatManager(unittest.TestCase):
         self.assertEqual(stats["total_messages"], 2)
         self.assertEqual(stats["current_session_messages"], 2)
 
+    def test_statistics_track_clear_delete_and_reload(self):
+        """测试消息总数随清空、删除和重新加载保持一致"""
+        first = self.chat_manager.create_session("Session 1")
+        self.chat_manager.add_user_message("第一个问题")
+        self.chat_manager.add_assistant_message("第一个回答")
+        second = self.chat_manager.create_session("Session 2")
+        for i in range(3):
+            self.chat_manager.add_user_message(f"问题 {i}")
+        self.assertEqual(self.chat_manager.get_statistics()["total_messages"], 5)
+        self.chat_manager.add_user_message("问题 2")
+        self.assertEqual(self.chat_manager.get_statistics()["total_messages"], 5)
+
+        self.chat_manager.clear_current_session()
+        self.assertEqual(self.chat_manager.get_statistics()["total_messages"], 2)
+
+        self.chat_manager.add_user_message("清空后的问题")
+        self.chat_manager.flush_saves()
+        self.assertEqual(self._reload_manager().get_statistics()["total_messages"], 3)
+
+        self.chat_manager.delete_session(first.id)
+        stats = self.chat_manager.get_statistics()
+        self.assertEqual(stats["total_sessions"], 1)
+        self.assertEqual(stats["total_messages"], second.message_count)
+
 
 class TestCommandSystem(unittest.TestCase):
     """测试命令系统"""
 
     def setUp(self):
         """测试前准备"""
-        self.temp_dir = tempfile.mkdtemp()
+        self.temp_dir = tempfile.mkdtemp(dir=_TEMP_ROOT)
 
         # 模拟聊天管理器
         with patch('src.day4_cli.chat_manager.get_config') as mock_get_config:
@@ -260,6 +916,7 @@ class TestCommandSystem(unittest.TestCase):
     def tearDown(self):
         """测试后清理"""
         import shutil
+        self.chat_manager.flush_saves()
         shutil.rmtree(self.temp_dir, ignore_errors=True)
 
     def test_command_registration(self):
@@ -269,12 +926,76 @@ class TestCommandSystem(unittest.TestCase):
         self.assertIsNotNone(help_command)
         self.assertEqual(help_command.name, "help")
 
+    def test_get_all_commands_unique(self):
+        """测试命令列表不包含别名重复项"""
+        names = [command.name for command in self.registry.get_all_commands()]
+
+        self.assertEqual(names, sorted(set(names)))
+        self.assertIn("quit", names)
+        self.assertNotIn("q", names)
+
+    def test_help_table_rebuilt_after_register(self):
+        """测试帮助表格在注册新命令后重新构建"""
+        help_command = self.registry.get_command("help")
+        help_command.execute("", self.chat_manager)
+        cached_table = help_command._table_cache[1]
+
+        help_command.execute("", self.chat_manager)
+        self.assertIs(help_command._table_cache[1], cached_table)
+
+        self.registry.register_command(CLICommand("zzz", "测试命令"))
+        help_command.execute("", self.chat_manager)
+        self.assertIsNot(help_command._table_cache[1], cached_table)
+        self.assertEqual(self.registry.get_all_commands()[-1].name, "zzz")
+
+    def test_command_aliases(self):
+        """测试命令别名为不可变集合，帮助信息按字母顺序展示"""
+        command = self.registry.get_command("rm")
+
+        self.assertEqual(command.name, "delete")
+        self.assertEqual(command.aliases, frozenset({"rm", "del"}))
+        self.assertIn("别名: del, rm", command.get_help())
+
+    def test_register_command_keeps_sorted_order(self):
+        """测试注册和覆盖命令后命令列表仍有序且不重复"""
+        self.registry.register_command(CLICommand("aaa", "测试命令"))
+        replacement = CLICommand("new", "替换的新建命令")
+        self.registry.register_command(replacement)
+
+        commands = self.registry.get_all_commands()
+        names = [command.name for command in commands]
+        self.assertEqual(names, sorted(set(names)))
+        self.assertEqual(names[0], "aaa")
+        self.assertIn(replacement, commands)
+
+    def test_complete_command_prefix(self):
+        """测试命令前缀补全包含名称和别名"""
+        self.assertEqual(self.registry.complete("hi"), ["hist", "history"])
+        self.assertIn("q", self.registry.complete("q"))
+        self.assertEqual(self.registry.complete("zz"), [])
+
     def test_is_command(self):
         """测试命令识别"""
         self.assertTrue(self.registry.is_command("/help"))
         self.assertTrue(self.registry.is_command("/new"))
         self.assertFalse(self.registry.is_command("Hello world"))
         self.assertFalse(self.registry.is_command(""))
+        self.assertFalse(self.registry.is_command("/"))
+        self.assertFalse(self.registry.is_command("/unknown"))
+
+    def test_parse_command(self):
+        """测试命令文本解析"""
+        self.assertEqual(self.registry._parse("/new  My   Session "), ("new", "My   Session"))
+        self.assertEqual(self.registry._parse("/help"), ("help", ""))
+        self.assertEqual(self.registry._parse("/"), ("", ""))
+        self.assertIsNone(self.registry._parse("hello /help"))
+        self.assertEqual(first_arg("  abc def"), "abc")
+        self.assertEqual(first_arg(""), "")
+
+        # 解析出的命令名与注册的名称是同一个驻留字符串
+        name, _ = self.registry._parse("/" + "".join(["hi", "st"]))
+        self.assertIn(name, self.registry.commands)
+        self.assertIs(name, next(iter(self.registry.get_command("history").aliases)))
 
     def test_help_command(self):
         """测试帮助命令"""
@@ -292,6 +1013,72 @@ class TestCommandSystem(unittest.TestCase):
         result = self.registry.execute_command("/list", self.chat_manager)
         self.assertTrue(result.success)
 
+    def test_stats_command_single_print(self):
+        """测试统计命令只调用一次输出"""
+        with patch('src.day4_cli.commands.console') as mock_console:
+            result = self.registry.execute_command("/stats", self.chat_manager)
+
+        self.assertTrue(result.success)
+        mock_console.print.assert_called_once()
+
+    def test_config_command_known_fields_only(self):
+        """测试配置命令只接受配置项名称"""
+        result = self.registry.execute_command("/config max_steps", self.chat_manager)
+        self.assertTrue(result.success)
+        self.assertTrue(result.message.startswith("max_steps: "))
+
+        # 方法和属性不是配置项
+        for key in ("display", "config_dir_path"):
+            result = self.registry.execute_command(f"/config {key}", self.chat_manager)
+            self.assertFalse(result.success)
+
+    def test_config_command_set_value(self):
+        """测试配置命令修改配置项，值取键名之后的原始文本"""
+        config = CLIConfig()
+        with patch('src.day4_cli.commands.get_config', return_value=config), \
+             patch('src.day4_cli.commands.schedule_config_save') as mock_save:
+            result = self.registry.execute_command("/config app_name  My  App ", self.chat_manager)
+            self.assertTrue(result.success)
+            self.assertEqual(config.app_name, "My  App")
+            # 保存是延迟的，提示中说明如何立即保存
+            self.assertIn("/config save", result.message)
+
+            result = self.registry.execute_command("/config debug_mode on", self.chat_manager)
+            self.assertTrue(result.success)
+            self.assertIs(config.debug_mode, True)
+
+            result = self.registry.execute_command("/config max_steps many", self.chat_manager)
+            self.assertFalse(result.success)
+            self.assertEqual(config.max_steps, 10)
+
+        self.assertEqual(mock_save.call_count, 2)
+
+    def test_config_save_command_flushes_pending_save(self):
+        """测试 /config save 立即写入延迟保存的配置"""
+        with patch('src.day4_cli.commands.flush_config_save') as mock_flush:
+            result = self.registry.execute_command("/config save", self.chat_manager)
+
+        self.assertTrue(result.success)
+        self.assertEqual(result.message, "配置已保存")
+        mock_flush.assert_called_once_with()
+
+    def test_switch_and_delete_commands(self):
+        """测试按名称和 ID 前缀切换、删除会话"""
+        first = self.chat_manager.create_session("First")
+        self.chat_manager.create_session("Second")
+
+        result = self.registry.execute_command("/switch First", self.chat_manager)
+        self.assertTrue(result.success)
+        self.assertIs(self.chat_manager.get_current_session(), first)
+
+        result = self.registry.execute_command(f"/delete {first.id[:12]}", self.chat_manager)
+        self.assertTrue(result.success)
+        self.assertNotIn(first.id, self.chat_manager.sessions)
+
+        result = self.registry.execute_command("/switch First", self.chat_manager)
+        self.assertFalse(result.success)
+        self.assertIn("找不到会话", result.message)
+
     def test_unknown_command(self):
         """测试未知命令"""
         result = self.registry.execute_command("/unknown", self.chat_manager)
@@ -304,7 +1091,7 @@ class TestCLIInterface(unittest.TestCase):
 
     def setUp(self):
         """测试前准备"""
-        self.temp_dir = tempfile.mkdtemp()
+        self.temp_dir = tempfile.mkdtemp(dir=_TEMP_ROOT)
 
         # 模拟配置
         with patch('src.day4_cli.cli_interface.get_config') as mock_get_config:
@@ -321,6 +1108,20 @@ class TestCLIInterface(unittest.TestCase):
         import shutil
         shutil.rmtree(self.temp_dir, ignore_errors=True)
 
+    def test_command_completion(self):
+        """测试命令补全按前缀返回候选"""
+        options = []
+        state = 0
+        while (option := self.cli._complete("/h", state)) is not None:
+            options.append(option)
+            state += 1
+
+        self.assertIn("/help", options)
+        self.assertIn("/history", options)
+        self.assertTrue(all(option.startswith("/h") for option in options))
+        self.assertEqual(options, sorted(options))
+        self.assertIsNone(self.cli._complete("/zzz", 0))
+
     def test_display_user_message(self):
         """测试显示用户消息"""
         # 这个测试主要确保方法不会抛出异常
@@ -337,6 +1138,21 @@ class TestCLIInterface(unittest.TestCase):
         except Exception as e:
             self.fail(f"display_assistant_message 抛出异常: {e}")
 
+    def test_message_panels_keep_style(self):
+        """测试消息面板保留标题和边框样式"""
+        with patch.object(self.cli.console, "print") as print_mock:
+            self.cli.display_user_message("Hello")
+            self.cli.display_assistant_message("Hi")
+
+        user_panel, assistant_panel = (call.args[0] for call in print_mock.call_args_list
+                                       if isinstance(call.args[0], Panel))
+        session_name = self.cli.chat_manager.get_current_session().name
+        self.assertEqual(user_panel.title, f"👤 用户 ({session_name})")
+        self.assertEqual(user_panel.border_style, "green")
+        self.assertEqual(assistant_panel.title, "🤖 AI 助手")
+        self.assertEqual(assistant_panel.border_style, "cyan")
+        self.assertEqual(assistant_panel.renderable, "Hi")
+
     def test_display_error(self):
         """测试显示错误"""
         try:
@@ -352,14 +1168,234 @@ class TestCLIInterface(unittest.TestCase):
             self.fail(f"display_success 抛出异常: {e}")
 
 
+class TestAssistantApp(unittest.TestCase):
+    """测试应用消息处理"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp(dir=_TEMP_ROOT)
+
+        # 跳过完整初始化，只装配消息处理需要的组件
+        self.app = AssistantApp.__new__(AssistantApp)
+        self.app.config = CLIConfig(config_dir=self.temp_dir, show_tool_calls=False, debug_mode=False)
+        self.app.console = Console(file=io.StringIO())
+        self.app.react_agent = Mock()
+        self.app.react_agent.process_query.return_value = "回复"
+        self.app.cli_interface = Mock()
+        self.app.chat_manager = Mock()
+
+    def tearDown(self):
+        """测试后清理"""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_module_import_defers_agent_stack(self):
+        """测试导入应用模块不会加载 Agent 和 LLM SDK"""
+        code = ("import sys; import src.day4_cli.app; "
+                "sys.exit('src.day3_core.react_agent' in sys.modules or 'openai' in sys.modules)")
+        result = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT)
+
+        self.assertEqual(result.returncode, 0)
+
+    def test_get_app_reuses_instance_per_agent_config(self):
+        """测试相同 Agent 配置复用应用实例"""
+        with patch.dict(app_module._APP_CACHE, clear=True), \
+                patch.object(AssistantApp, '__init__', return_value=None) as mock_init:
+            first = app_module._get_app(self.app.config)
+            second = app_module._get_app(self.app.config)
+            other = app_module._get_app(CLIConfig(config_dir=self.temp_dir, max_steps=3))
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+        self.assertEqual(mock_init.call_count, 2)
+
+    def test_get_app_hit_uses_new_config(self):
+        """测试复用应用实例时采用本次传入的配置"""
+        updated = CLIConfig(config_dir=self.temp_dir, show_tool_calls=True, debug_mode=False)
+        with patch.dict(app_module._APP_CACHE, clear=True):
+            app_module._APP_CACHE[(None, updated.ai_provider, updated.max_steps, False)] = self.app
+            self.assertIs(app_module._get_app(updated), self.app)
+        self.assertIs(self.app.config, updated)
+
+    def test_cleanup_allows_app_to_run_again(self):
+        """测试清理后再次处理消息时重新创建查询线程"""
+        first_executor = self.app._query_executor
+        with patch.object(CLIConfig, 'save_to_file'):
+            self.app._cleanup()
+        self.assertNotIn("_query_executor", self.app.__dict__)
+        self.app.react_agent.close.assert_called_once_with()
+
+        self.app._handle_user_message("你好")
+        self.assertIsNot(self.app._query_executor, first_executor)
+        self.app.react_agent.process_query.assert_called_once_with("你好")
+        self.app._query_executor.shutdown()
+
+    def test_metadata_skipped_when_hidden(self):
+        """测试不显示工具调用且非调试模式时不收集元数据"""
+        self.app._handle_user_message("你好")
+
+        self.app.react_agent.snapshot.assert_not_called()
+        self.app.cli_interface.display_assistant_message.assert_called_once_with("回复", None)
+        self.app.chat_manager.add_assistant_message.assert_called_once_with("回复", None)
+
+    def test_ctrl_c_cancels_turn_without_exiting(self):
+        """测试处理中按 Ctrl+C 只放弃本轮回答"""
+        release = threading.Event()
+        self.app.react_agent.process_query.side_effect = lambda query: release.wait(5) and "迟到的回复"
+        interrupter = threading.Timer(0.2, signal.pthread_kill, (threading.main_thread().ident, signal.SIGINT))
+
+        interrupter.start()
+        try:
+            self.app._handle_user_message("你好")
+        finally:
+            release.set()
+            interrupter.join()
+
+        self.app.chat_manager.add_assistant_message.assert_not_called()
+        self.assertIn("已取消本轮回答", self.app.console.file.getvalue())
+
+    def test_metadata_collected_when_shown(self):
+        """测试显示工具调用时收集元数据"""
+        self.app.config.show_tool_calls = True
+
+        with patch.object(AssistantApp, '_get_response_metadata', return_value={"total_steps": 1}):
+            self.app._handle_user_message("你好")
+
+        self.app.cli_interface.display_assistant_message.assert_called_once_with("回复", {"total_steps": 1})
+
+
+class TestBatchMode(unittest.TestCase):
+    """测试批处理模式"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp(dir=_TEMP_ROOT)
+        self.input_file = os.path.join(self.temp_dir, "input.txt")
+        self.output_file = os.path.join(self.temp_dir, "output.json")
+
+        with open(self.input_file, 'w', encoding='utf-8') as f:
+            f.write("q1\nboom\n\nq3\nq4\n")
+
+        # 跳过完整初始化，只装配批处理需要的组件
+        self.app = AssistantApp.__new__(AssistantApp)
+        self.app.config = CLIConfig(config_dir=self.temp_dir, batch_concurrency=3)
+        self.app.console = Console(file=io.StringIO())
+        self.app.react_agent = self._make_agent()
+
+    def tearDown(self):
+        """测试后清理"""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    @staticmethod
+    def _make_agent(*args, **kwargs):
+        def process_query(query):
+            if query == "boom":
+                raise RuntimeError("模拟失败")
+            return f"answer:{query}"
+
+        agent = Mock()
+        agent.process_query.side_effect = process_query
+        return agent
+
+    def _read_output(self):
+        with open(self.output_file, encoding='utf-8') as f:
+            return json.load(f)
+
+    def test_concurrent_batch_keeps_input_order(self):
+        """测试并发批处理按输入顺序输出，每个线程使用独立的 Agent"""
+        with patch('src.day3_core.react_agent.create_react_agent', side_effect=self._make_agent) as mock_create:
+            self.app.run_batch_mode(self.input_file, self.output_file)
+
+        results = self._read_output()
+        self.assertEqual([r["input"] for r in results], ["q1", "boom", "q3", "q4"])
+        self.assertEqual([r["success"] for r in results], [True, False, True, True])
+        self.assertEqual(results[0]["output"], "answer:q1")
+        self.assertIn("模拟失败", results[1]["output"])
+        self.assertLessEqual(mock_create.call_count, 3)
+        self.app.react_agent.process_query.assert_not_called()
+
+    def test_concurrent_batch_more_lines_than_in_flight(self):
+        """测试输入行数超过在途上限时仍完整且按序输出"""
+        self.app.config.batch_concurrency = 2
+        with open(self.input_file, 'w', encoding='utf-8') as f:
+            f.write("\n".join(f"q{i}" for i in range(1, 13)))
+
+        agents = []
+
+        def make_agent(*args, **kwargs):
+            agents.append(self._make_agent())
+            return agents[-1]
+
+        with patch('src.day3_core.react_agent.create_react_agent', side_effect=make_agent):
+            self.app.run_batch_mode(self.input_file, self.output_file)
+
+        self.assertEqual([r["output"] for r in self._read_output()], [f"answer:q{i}" for i in range(1, 13)])
+        # 批处理结束后释放每个工作线程 Agent 的工具执行线程
+        for agent in agents:
+            agent.close.assert_called_once_with()
+
+    def test_empty_batch_input(self):
+        """测试空输入文件不产生输出"""
+        with open(self.input_file, 'w', encoding='utf-8') as f:
+            f.write("\n  \n")
+
+        self.app.run_batch_mode(self.input_file, self.output_file)
+
+        self.assertFalse(os.path.exists(self.output_file))
+        self.assertIn("输入文件为空", self.app.console.file.getvalue())
+
+    def test_jsonl_batch_streams_records(self):
+        """测试 JSON Lines 输出每行一条记录，带行号"""
+        with patch('src.day3_core.react_agent.create_react_agent', side_effect=self._make_agent):
+            self.app.run_batch_mode(self.input_file, self.output_file, jsonl=True)
+
+        with open(self.output_file, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+
+        by_line = {r["line"]: r for r in records}
+        self.assertEqual(sorted(by_line), [1, 2, 3, 4])
+        self.assertEqual(by_line[4]["output"], "answer:q4")
+        self.assertFalse(by_line[2]["success"])
+
+    def test_serial_batch_uses_app_agent(self):
+        """测试并发数为 1 时顺序使用应用自身的 Agent"""
+        self.app.config.batch_concurrency = 1
+
+        with patch('src.day3_core.react_agent.create_react_agent') as mock_create:
+            self.app.run_batch_mode(self.input_file, self.output_file)
+
+        mock_create.assert_not_called()
+        self.assertEqual(self.app.react_agent.process_query.call_count, 4)
+        self.assertEqual([r["success"] for r in self._read_output()], [True, False, True, True])
+
+
+def _run_with_pytest_xdist() -> Optional[bool]:
+    """
+    安装了 pytest-xdist 时交给 pytest 多进程并行运行本文件
+
+    各测试类互不共享状态（每个用例使用自己的临时目录），可以安全地分到不同工作进程。
+    未安装时返回 None，由调用方回退到 unittest 串行运行。
+    """
+    try:
+        import pytest
+        import xdist  # noqa: F401
+    except ImportError:
+        return None
+    return pytest.main([__file__, "-n", "auto", "-q"]) == pytest.ExitCode.OK
+
+
 def run_comprehensive_test():
     """运行综合测试"""
-    from rich.console import Console
+    from src.console import console
 
-    console = Console()
     console.print("🧪 开始 CLI 应用综合测试", style="bold blue")
     console.print("=" * 60, style="blue")
 
+    parallel_result = _run_with_pytest_xdist()
+    if parallel_result is not None:
+        return parallel_result
+
     # 创建测试套件
     loader = unittest.TestLoader()
     suite = unittest.TestSuite()
@@ -372,6 +1408,8 @@ def run_comprehensive_test():
         TestChatManager,
         TestCommandSystem,
         TestCLIInterface,
+        TestAssistantApp,
+        TestBatchMode,
     ]
 
     for test_class in test_classes: